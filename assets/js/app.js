@@ -11,6 +11,9 @@ class MtMathApp {
       searchQuery: '',
       currentView: 'dashboard',
       articles: [],
+      totalArticles: 0,
+      feedOnly: false,
+      loadedFeeds: new Set(),
       currentCategory: 'all',
       notifications: [],
       user: null
@@ -31,6 +34,7 @@ class MtMathApp {
     
     // Load data
     await this.loadArticles();
+    this.loadTrending();
     
     // Initialize animations
     this.initAnimations();
@@ -149,8 +153,9 @@ class MtMathApp {
     });
   }
 
-  performSearch(query) {
+  async performSearch(query) {
     this.state.searchQuery = query.toLowerCase();
+    if (query) await this.ensureAllArticles();
     
     if (!query) {
       this.displayArticles(this.state.articles);
@@ -229,26 +234,19 @@ class MtMathApp {
       // Wait for Firebase
       await this.waitForFirebase();
       
-      const { db, collection, query, where, orderBy, getDocs } = window.firebase;
-      
-      const articlesQuery = query(
-        collection(db, 'articles'),
-        where('status', '==', 'published'),
-        orderBy('created_at', 'desc')
-      );
-      
-      const querySnapshot = await getDocs(articlesQuery);
-      this.state.articles = [];
-      
-      querySnapshot.forEach((doc) => {
-        this.state.articles.push({
-          id: doc.id,
-          ...doc.data()
-        });
-      });
+      // Prefer the feed document (one read for the newest articles)
+      const feed = await this.loadFeed('home');
+      if (feed) {
+        this.state.articles = feed.cards;
+        this.state.totalArticles = feed.total;
+        this.state.feedOnly = feed.cards.length < feed.total;
+        console.log(`✅ Loaded ${feed.cards.length} of ${feed.total} articles from feed`);
+      } else {
+        await this.loadAllArticles();
+      }
       
-      console.log(`✅ Loaded ${this.state.articles.length} articles`);
       this.displayArticles(this.state.articles);
+      this.updateLoadMoreButton();
       this.updateStats();
       
     } catch (error) {
@@ -257,6 +255,93 @@ class MtMathApp {
     }
   }
 
+  async loadAllArticles() {
+    const { db, collection, query, where, orderBy, getDocs } = window.firebase;
+    
+    const articlesQuery = query(
+      collection(db, 'articles'),
+      where('status', '==', 'published'),
+      orderBy('created_at', 'desc')
+    );
+    
+    const querySnapshot = await getDocs(articlesQuery);
+    this.state.articles = [];
+    
+    querySnapshot.forEach((doc) => {
+      this.state.articles.push({
+        id: doc.id,
+        ...doc.data()
+      });
+    });
+    
+    this.state.totalArticles = this.state.articles.length;
+    this.state.feedOnly = false;
+    console.log(`✅ Loaded ${this.state.articles.length} articles`);
+  }
+
+  // Feed documents (feeds/home, feeds/category_{category}); null if missing
+  async loadFeed(feedId) {
+    try {
+      const { db, doc, getDoc } = window.firebase;
+      const snapshot = await getDoc(doc(db, 'feeds', feedId));
+      if (!snapshot.exists()) return null;
+      this.state.loadedFeeds.add(feedId);
+      const data = snapshot.data();
+      return {
+        cards: (data.cards || []).map(card => ({ id: card.slug, ...card })),
+        total: data.total || 0
+      };
+    } catch (error) {
+      console.warn('Error loading feed:', error);
+      return null;
+    }
+  }
+
+  // Trending ranking (feeds/trending, written by scripts/rollup_view_counts.py)
+  async loadTrending() {
+    const list = document.getElementById('trending-list');
+    if (!list) return;
+    try {
+      const { db, doc, getDoc } = window.firebase;
+      const snapshot = await getDoc(doc(db, 'feeds', 'trending'));
+      const cards = snapshot.exists() ? (snapshot.data().cards || []) : [];
+      if (cards.length === 0) return;
+      list.innerHTML = cards.map(card => `
+        <li><a href="article.html?slug=${card.slug}">${card.title}</a>
+          <span class="muted" style="font-size:0.8rem;">${this.getCategoryName(card.category)}</span></li>
+      `).join('');
+      document.getElementById('trending-card').style.display = '';
+    } catch (error) {
+      console.warn('Error loading trending articles:', error);
+    }
+  }
+
+  // Load every published article once the feed is not enough
+  async ensureAllArticles() {
+    if (!this.state.feedOnly) return;
+    try {
+      await this.loadAllArticles();
+      this.updateLoadMoreButton();
+    } catch (error) {
+      console.error('Error loading articles:', error);
+    }
+  }
+
+  mergeArticles(articles) {
+    const known = new Set(this.state.articles.map(article => article.id));
+    const time = (article) => article.created_at && article.created_at.toMillis ? article.created_at.toMillis() : 0;
+    this.state.articles = this.state.articles
+      .concat(articles.filter(article => !known.has(article.id)))
+      .sort((a, b) => time(b) - time(a));
+  }
+
+  updateLoadMoreButton() {
+    const loadMoreBtn = document.getElementById('load-more-btn');
+    if (loadMoreBtn) {
+      loadMoreBtn.style.display = this.state.feedOnly ? 'inline-flex' : 'none';
+    }
+  }
+
   async waitForFirebase() {
     return new Promise((resolve) => {
       const checkFirebase = () => {
@@ -343,7 +428,7 @@ class MtMathApp {
     // Update sidebar article count (統計情報セクション)
     const sidebarArticleCount = document.getElementById('sidebar-article-count');
     if (sidebarArticleCount) {
-      this.animateNumber(sidebarArticleCount, 0, this.state.articles.length, 1000);
+      this.animateNumber(sidebarArticleCount, 0, this.state.totalArticles || this.state.articles.length, 1000);
     }
     
     // Update other stats
@@ -470,9 +555,16 @@ class MtMathApp {
     });
   }
 
-  filterByCategory(category) {
+  async filterByCategory(category) {
     this.state.currentCategory = category;
     
+    // Articles missing from the home feed come from the category feed
+    const feedId = `category_${category}`;
+    if (this.state.feedOnly && category !== 'all' && !this.state.loadedFeeds.has(feedId)) {
+      const feed = await this.loadFeed(feedId);
+      if (feed) this.mergeArticles(feed.cards);
+    }
+    
     if (category === 'all') {
       this.displayArticles(this.state.articles);
     } else {
@@ -481,9 +573,9 @@ class MtMathApp {
     }
   }
 
-  loadMoreArticles() {
-    // Implementation for pagination
-    console.log('Loading more articles...');
+  async loadMoreArticles() {
+    await this.ensureAllArticles();
+    this.filterByCategory(this.state.currentCategory);
   }
 
   handleResize() {
@@ -68,7 +68,9 @@ class ArticleLoader {
             
             if (docSnap.exists()) {
                 const articleData = docSnap.data();
+                articleData.content_html = await this.resolveContentHtml(articleData);
                 this.displayArticle(articleData);
+                this.recordView(slug);
                 
                 // 関連記事読み込み
                 await this.loadRelatedArticles(articleData.category, articleData.tags);
@@ -83,6 +85,68 @@ class ArticleLoader {
         }
     }
 
+    /**
+     * 閲覧数を加算（ランダムなシャードに加算し、scripts/rollup_view_counts.py が記事にまとめる）
+     */
+    async recordView(slug) {
+        // config.py の VIEW_COUNTER_SHARDS と揃える
+        const VIEW_COUNTER_SHARDS = 10;
+        try {
+            const { db, doc, setDoc, increment } = window.firebase;
+            const shard = Math.floor(Math.random() * VIEW_COUNTER_SHARDS);
+            await setDoc(doc(db, 'view_counter_shards', `${slug}:${shard}`),
+                         { count: increment(1) }, { merge: true });
+        } catch (error) {
+            console.warn('閲覧数の記録エラー:', error);
+        }
+    }
+
+    /**
+     * 本文HTMLを取得（圧縮保存された記事は展開）
+     */
+    async resolveContentHtml(article) {
+        if (article.body_layout === 'split') {
+            return await this.loadArticleBody(article.slug, article.body_chunks || 1);
+        }
+        if (article.content_encoding === 'zlib' && article.content_compressed) {
+            return await this.inflate([article.content_compressed.toUint8Array()]);
+        }
+        return article.content_html || '';
+    }
+
+    /**
+     * article_bodies から本文を取得（分割保存された本文はチャンクを結合）
+     */
+    async loadArticleBody(slug, chunkCount) {
+        const { db, doc, getDoc } = window.firebase;
+        const bodySnap = await getDoc(doc(db, 'article_bodies', slug));
+        if (!bodySnap.exists()) {
+            return '';
+        }
+        const body = bodySnap.data();
+        if ((body.chunk_count || 1) <= 1) {
+            return await this.resolveContentHtml(body);
+        }
+
+        const chunkSnaps = await Promise.all(
+            Array.from({ length: Math.max(chunkCount, body.chunk_count) - 1 }, (_, i) =>
+                getDoc(doc(db, 'article_bodies', slug, 'chunks', String(i + 1)))));
+        const parts = [body.content_chunk.toUint8Array()].concat(
+            chunkSnaps.filter(snap => snap.exists()).map(snap => snap.data().content_chunk.toUint8Array()));
+        if (body.content_encoding === 'zlib') {
+            return await this.inflate(parts);
+        }
+        return await new Blob(parts).text();
+    }
+
+    /**
+     * zlib 圧縮されたバイト列を展開
+     */
+    async inflate(parts) {
+        const stream = new Blob(parts).stream().pipeThrough(new DecompressionStream('deflate'));
+        return await new Response(stream).text();
+    }
+
     /**
      * 記事を表示
      */
@@ -10,6 +10,10 @@ class ModernHomePage {
         this.currentPage = 1;
         this.allArticles = [];
         this.searchQuery = '';
+        // フィード（feeds/home）だけを読み込んだ状態か・公開記事の総数
+        this.feedOnly = false;
+        this.totalArticles = 0;
+        this.loadedFeeds = new Set();
         this.init();
     }
 
@@ -70,9 +74,10 @@ class ModernHomePage {
         // 検索バー
         const searchInput = document.getElementById('search-input');
         if (searchInput) {
-            searchInput.addEventListener('input', (e) => {
+            searchInput.addEventListener('input', async (e) => {
                 this.searchQuery = (e.target.value || '').trim().toLowerCase();
                 this.currentPage = 1;
+                if (this.searchQuery) await this.ensureAllArticles();
                 this.displayArticles();
             });
         }
@@ -116,29 +121,20 @@ class ModernHomePage {
     }
 
     /**
-     * 記事読み込み
+     * 記事読み込み（フィードがあれば1ドキュメントの読み取りで最新記事を表示）
      */
     async loadArticles() {
         try {
-            const { db, collection, query, where, orderBy, getDocs } = window.firebase;
-            
-            const articlesQuery = query(
-                collection(db, 'articles'),
-                where('status', '==', 'published'),
-                orderBy('created_at', 'desc')
-            );
-
-            const querySnapshot = await getDocs(articlesQuery);
-            this.allArticles = [];
-
-            querySnapshot.forEach((doc) => {
-                this.allArticles.push({
-                    id: doc.id,
-                    ...doc.data()
-                });
-            });
-
-            console.log(`✅ ${this.allArticles.length}件の記事を読み込みました`);
+            const feed = await this.loadFeed('home');
+            if (feed) {
+                this.allArticles = feed.cards;
+                this.totalArticles = feed.total;
+                this.feedOnly = feed.cards.length < feed.total;
+                console.log(`✅ フィードから${this.allArticles.length}件の記事を読み込みました`);
+                this.displayArticles();
+                return;
+            }
+            await this.loadAllArticles();
             this.displayArticles();
 
         } catch (error) {
@@ -147,6 +143,65 @@ class ModernHomePage {
         }
     }
 
+    /**
+     * フィードドキュメント（feeds/{id}）の読み込み（無ければ null）
+     */
+    async loadFeed(feedId) {
+        try {
+            const { db, doc, getDoc } = window.firebase;
+            const snapshot = await getDoc(doc(db, 'feeds', feedId));
+            if (!snapshot.exists()) return null;
+            this.loadedFeeds.add(feedId);
+            const data = snapshot.data();
+            return {
+                cards: (data.cards || []).map(card => ({ id: card.slug, ...card })),
+                total: data.total || 0
+            };
+        } catch (error) {
+            console.warn('フィード読み込みエラー:', error);
+            return null;
+        }
+    }
+
+    /**
+     * フィードに入りきらない記事が必要になったら全件を読み込む
+     */
+    async ensureAllArticles() {
+        if (!this.feedOnly) return;
+        try {
+            await this.loadAllArticles();
+        } catch (error) {
+            console.error('記事読み込みエラー:', error);
+        }
+    }
+
+    /**
+     * 公開済み記事を全件読み込み
+     */
+    async loadAllArticles() {
+        const { db, collection, query, where, orderBy, getDocs } = window.firebase;
+        
+        const articlesQuery = query(
+            collection(db, 'articles'),
+            where('status', '==', 'published'),
+            orderBy('created_at', 'desc')
+        );
+
+        const querySnapshot = await getDocs(articlesQuery);
+        this.allArticles = [];
+
+        querySnapshot.forEach((doc) => {
+            this.allArticles.push({
+                id: doc.id,
+                ...doc.data()
+            });
+        });
+
+        this.totalArticles = this.allArticles.length;
+        this.feedOnly = false;
+        console.log(`✅ ${this.allArticles.length}件の記事を読み込みました`);
+    }
+
     /**
      * 記事表示
      */
@@ -216,7 +271,7 @@ class ModernHomePage {
     /**
      * カテゴリフィルタリング
      */
-    filterByCategory(category) {
+    async filterByCategory(category) {
         this.currentCategory = category;
         this.currentPage = 1;
 
@@ -226,10 +281,27 @@ class ModernHomePage {
         });
         document.querySelector(`[data-category="${category}"]`).classList.add('active');
 
+        // ホームのフィードに無いカテゴリの記事はカテゴリのフィードから補う
+        if (this.feedOnly && category !== 'all' && !this.loadedFeeds.has(`category_${category}`)) {
+            const feed = await this.loadFeed(`category_${category}`);
+            if (feed) this.mergeArticles(feed.cards);
+        }
+
         // 記事再表示
         this.displayArticles();
     }
 
+    /**
+     * 記事を重複なく追加し作成日時の新しい順に並べ直す
+     */
+    mergeArticles(articles) {
+        const known = new Set(this.allArticles.map(article => article.id));
+        const time = (article) => article.created_at && article.created_at.toMillis ? article.created_at.toMillis() : 0;
+        this.allArticles = this.allArticles
+            .concat(articles.filter(article => !known.has(article.id)))
+            .sort((a, b) => time(b) - time(a));
+    }
+
     /**
      * フィルタリングされた記事取得
      */
@@ -249,8 +321,11 @@ class ModernHomePage {
     /**
      * さらに記事読み込み
      */
-    loadMoreArticles() {
+    async loadMoreArticles() {
         this.currentPage++;
+        if (this.currentPage * this.articlesPerPage > this.getFilteredArticles().length) {
+            await this.ensureAllArticles();
+        }
         this.displayArticles();
     }
 
@@ -259,6 +334,12 @@ class ModernHomePage {
      */
     updateLoadMoreButton(totalArticles) {
         const loadMoreBtn = document.getElementById('load-more-btn');
+        // フィードだけを読み込んだ状態では、残りの記事がある限りボタンを表示する
+        if (this.feedOnly && !this.searchQuery) {
+            const category = this.currentCategory;
+            if (category === 'all') totalArticles = this.totalArticles;
+            else if (!this.loadedFeeds.has(`category_${category}`)) totalArticles = Infinity;
+        }
         const currentlyShowing = this.currentPage * this.articlesPerPage;
 
         if (currentlyShowing >= totalArticles) {
@@ -274,7 +355,7 @@ class ModernHomePage {
     updateArticleCount() {
         const countElement = document.getElementById('article-count');
         if (countElement) {
-            countElement.textContent = this.allArticles.length;
+            countElement.textContent = this.totalArticles || this.allArticles.length;
         }
     }
 
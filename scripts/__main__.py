@@ -0,0 +1,10 @@
+"""
+Mt.MATH - `python -m scripts` エントリーポイント
+"""
+
+import sys
+
+from scripts.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Mt.MATH - 記事の列指向フレーム
+articles コレクションをフィールド射影付きでページ単位に読み込み、列ごとの NumPy 配列に格納する
+
+MathArticle を1件ずつ生成せずに、カテゴリ別件数・ヒストグラム・絞り込みなどの
+コーパス全体の集計をベクトル演算で行う。
+
+    frame = ArticleFrame.load(filters=[("status", "==", "published")])
+    frame.value_counts("category")
+    frame.where(category="algebra").histogram("niche_score", bins=10)
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from scripts.storage_backends import DocumentRecord, Filter
+
+# 記事ドキュメントから読み込むフィールド（content_html は読まない）
+FRAME_FIELDS = ("category", "status", "difficulty_level", "niche_score",
+                "created_at", "content_length", "tags")
+
+# カテゴリ値として符号化する列
+CATEGORICAL_COLUMNS = ("category", "status")
+NUMERIC_COLUMNS = ("difficulty_level", "niche_score", "content_length", "created_at")
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    if not isinstance(value, datetime):
+        return np.datetime64("NaT")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "us")
+
+def _encode(values: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """文字列リストを (コード配列, 語彙) に符号化"""
+    vocabulary, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+    return codes.astype(np.int32), list(vocabulary)
+
+class ArticleFrame:
+    """記事メタデータの列指向コンテナ
+
+    category / status はコード配列と語彙、tags は CSR 形式（tag_codes と tag_offsets）で保持する。
+    content_length が保存されていない古い記事は -1 になる。
+    """
+
+    def __init__(self, slugs: np.ndarray, columns: Dict[str, np.ndarray],
+                 vocabularies: Dict[str, List[str]], tag_codes: np.ndarray,
+                 tag_offsets: np.ndarray, tag_vocabulary: List[str]):
+        self.slugs = slugs
+        self.columns = columns
+        self.vocabularies = vocabularies
+        self.tag_codes = tag_codes
+        self.tag_offsets = tag_offsets
+        self.tag_vocabulary = tag_vocabulary
+
+    # === 構築 ===
+
+    @classmethod
+    def from_records(cls, records: Iterable[DocumentRecord]) -> 'ArticleFrame':
+        """(ID, データ) の列から直接フレームを構築"""
+        slugs: List[str] = []
+        raw: Dict[str, list] = {name: [] for name in FRAME_FIELDS if name != "tags"}
+        tags: List[str] = []
+        tag_lengths: List[int] = []
+
+        for doc_id, data in records:
+            slugs.append(doc_id)
+            raw["category"].append(data.get("category") or "")
+            raw["status"].append(data.get("status") or "")
+            raw["difficulty_level"].append(data.get("difficulty_level") or 0)
+            raw["niche_score"].append(data.get("niche_score") or 0)
+            raw["created_at"].append(_to_datetime64(data.get("created_at")))
+            length = data.get("content_length")
+            if length is None and "content_html" in data:
+                length = len(data["content_html"])
+            raw["content_length"].append(-1 if length is None else length)
+            doc_tags = data.get("tags") or []
+            tags.extend(doc_tags)
+            tag_lengths.append(len(doc_tags))
+
+        columns: Dict[str, np.ndarray] = {}
+        vocabularies: Dict[str, List[str]] = {}
+        for name in CATEGORICAL_COLUMNS:
+            columns[name], vocabularies[name] = _encode(raw[name])
+        columns["difficulty_level"] = np.asarray(raw["difficulty_level"], dtype=np.int16)
+        columns["niche_score"] = np.asarray(raw["niche_score"], dtype=np.int16)
+        columns["content_length"] = np.asarray(raw["content_length"], dtype=np.int64)
+        columns["created_at"] = np.asarray(raw["created_at"], dtype="datetime64[us]")
+
+        tag_codes, tag_vocabulary = _encode(tags)
+        tag_offsets = np.zeros(len(slugs) + 1, dtype=np.int64)
+        np.cumsum(tag_lengths, out=tag_offsets[1:])
+
+        return cls(np.asarray(slugs, dtype=object), columns, vocabularies,
+                   tag_codes, tag_offsets, tag_vocabulary)
+
+    @classmethod
+    def load(cls, manager=None, filters: Iterable[Filter] = ()) -> 'ArticleFrame':
+        """articles コレクションをフィールド射影付きで読み込む"""
+        if manager is None:
+            from scripts.firestore_manager import firestore_manager as manager
+        return cls.from_records(manager.iter_articles(filters, fields=FRAME_FIELDS))
+
+    # === 参照 ===
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+    def column(self, name: str) -> np.ndarray:
+        """列を取得（カテゴリ列は文字列配列に復号）"""
+        if name == "slug":
+            return self.slugs
+        if name in self.vocabularies:
+            return np.asarray(self.vocabularies[name], dtype=object)[self.columns[name]]
+        return self.columns[name]
+
+    def tags_of(self, index: int) -> List[str]:
+        start, end = self.tag_offsets[index], self.tag_offsets[index + 1]
+        return [self.tag_vocabulary[c] for c in self.tag_codes[start:end]]
+
+    # === 絞り込み ===
+
+    def filter(self, mask: np.ndarray) -> 'ArticleFrame':
+        """真偽値マスクで行を絞り込んだ新しいフレームを返す"""
+        mask = np.asarray(mask, dtype=bool)
+        lengths = np.diff(self.tag_offsets)
+        tag_offsets = np.zeros(int(mask.sum()) + 1, dtype=np.int64)
+        np.cumsum(lengths[mask], out=tag_offsets[1:])
+        return ArticleFrame(
+            self.slugs[mask],
+            {name: values[mask] for name, values in self.columns.items()},
+            self.vocabularies,
+            self.tag_codes[np.repeat(mask, lengths)],
+            tag_offsets,
+            self.tag_vocabulary,
+        )
+
+    def mask_for(self, name: str, value: str) -> np.ndarray:
+        """カテゴリ列が value に一致する行のマスク"""
+        vocabulary = self.vocabularies[name]
+        if value not in vocabulary:
+            return np.zeros(len(self), dtype=bool)
+        return self.columns[name] == vocabulary.index(value)
+
+    def where(self, category: str = None, status: str = None, tag: str = None,
+              min_difficulty: int = None, max_difficulty: int = None,
+              since: datetime = None) -> 'ArticleFrame':
+        """よく使う条件で絞り込む"""
+        mask = np.ones(len(self), dtype=bool)
+        if category is not None:
+            mask &= self.mask_for("category", category)
+        if status is not None:
+            mask &= self.mask_for("status", status)
+        if min_difficulty is not None:
+            mask &= self.columns["difficulty_level"] >= min_difficulty
+        if max_difficulty is not None:
+            mask &= self.columns["difficulty_level"] <= max_difficulty
+        if since is not None:
+            mask &= self.columns["created_at"] >= _to_datetime64(since)
+        if tag is not None:
+            mask &= self._tag_mask(tag)
+        return self.filter(mask)
+
+    def _tag_mask(self, tag: str) -> np.ndarray:
+        if tag not in self.tag_vocabulary:
+            return np.zeros(len(self), dtype=bool)
+        hits = self.tag_codes == self.tag_vocabulary.index(tag)
+        rows = np.repeat(np.arange(len(self)), np.diff(self.tag_offsets))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows[hits]] = True
+        return mask
+
+    # === 集計 ===
+
+    def value_counts(self, name: str) -> Dict[str, int]:
+        """カテゴリ列の値ごとの件数"""
+        vocabulary = self.vocabularies[name]
+        counts = np.bincount(self.columns[name], minlength=len(vocabulary))
+        return {value: int(count) for value, count in zip(vocabulary, counts) if count}
+
+    def group_by(self, by: str, column: str, how: str = "mean") -> Dict[str, float]:
+        """カテゴリ列 by ごとに数値列 column を集計（sum / mean / count）"""
+        vocabulary = self.vocabularies[by]
+        codes = self.columns[by]
+        counts = np.bincount(codes, minlength=len(vocabulary))
+        if how == "count":
+            values = counts.astype(float)
+        else:
+            values = np.bincount(codes, weights=self.columns[column].astype(float),
+                                 minlength=len(vocabulary))
+            if how == "mean":
+                values = np.divide(values, counts, out=np.zeros_like(values), where=counts > 0)
+            elif how != "sum":
+                raise ValueError(f"未対応の集計方法です: {how}")
+        return {value: float(v) for value, v, n in zip(vocabulary, values, counts) if n}
+
+    def histogram(self, name: str, bins=10, range: Optional[Tuple[float, float]] = None):
+        """数値列のヒストグラム（np.histogram と同じ (件数, 境界) を返す）"""
+        values = self.columns[name]
+        if name == "created_at":
+            values = values[~np.isnat(values)].astype("int64")
+        elif name == "content_length":
+            values = values[values >= 0]
+        return np.histogram(values, bins=bins, range=range)
+
+    def tag_counts(self, top: int = None) -> Dict[str, int]:
+        """タグごとの件数（多い順）"""
+        counts = np.bincount(self.tag_codes, minlength=len(self.tag_vocabulary))
+        order = np.argsort(-counts, kind="stable")
+        if top is not None:
+            order = order[:top]
+        return {self.tag_vocabulary[i]: int(counts[i]) for i in order if counts[i]}
+
+    def to_pandas(self):
+        """pandas.DataFrame に変換（tags はリスト列）"""
+        import pandas as pd
+
+        data = {"slug": self.slugs}
+        for name in self.columns:
+            data[name] = (pd.Categorical.from_codes(self.columns[name], self.vocabularies[name])
+                          if name in self.vocabularies else self.columns[name])
+        data["tags"] = [self.tags_of(i) for i in np.arange(len(self))]
+        return pd.DataFrame(data)
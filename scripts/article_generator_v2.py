@@ -154,7 +154,7 @@ HTMLコンテンツのみ出力："""
     
 
 
-def main():
+def main(argv=None):
     """メイン実行関数"""
     
     parser = argparse.ArgumentParser(description='高品質数学記事自動生成ツール')
@@ -174,7 +174,7 @@ def main():
     parser.add_argument('--publish', action='store_true',
                        help='即座に公開する')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     try:
         # 記事生成
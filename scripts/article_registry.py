@@ -0,0 +1,240 @@
+"""
+Mt.MATH - 記事スラッグ/タイトル登録簿
+保存前の存在確認で Firestore を読まずに済ませるためのローカルキャッシュ
+
+- スラッグ: ブルームフィルタ + 完全集合。フィルタが「含まない」と言えば読み取り不要。
+- タイトル: カテゴリ別のソート済みリスト。check_topic_exists の前方一致を bisect で判定。
+  一致しなければ水位線以降の記事を取り込み直してから答える（他のプロセスが保存した記事を見落とさない）。
+
+初回は slug/title/category/updated_at だけを射影して全件スキャンし、
+以後は save_article ごとに差分で更新する。キャッシュファイルがあれば読み込み、
+updated_at の水位線より新しい記事だけを追加で取得する。
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_FIELDS = ("title", "category", "updated_at")
+
+class BloomFilter:
+    """ダブルハッシュ方式のブルームフィルタ"""
+
+    def __init__(self, capacity: int = 10_000, error_rate: float = 0.001, bits: bytearray = None):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "error_rate": self.error_rate, "count": self.count,
+                "bits": base64.b64encode(bytes(self.bits)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BloomFilter':
+        bloom = cls(data["capacity"], data["error_rate"],
+                    bytearray(base64.b64decode(data["bits"])))
+        bloom.count = data["count"]
+        return bloom
+
+class ArticleRegistry:
+    """記事のスラッグ・タイトル登録簿"""
+
+    def __init__(self, backend, collection: str, cache_path: str = None,
+                 error_rate: float = 0.001):
+        self.backend = backend
+        self.collection = collection
+        self.cache_path = cache_path
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(error_rate=error_rate)
+        self.slugs: Dict[str, List[str]] = {}            # slug -> [title, category]
+        self.titles: Dict[str, List[str]] = {}           # category -> ソート済みタイトル
+        self.watermark: Optional[datetime] = None        # 取り込み済みの最大 updated_at
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    # === 構築 ===
+
+    def ensure_loaded(self):
+        """未構築ならキャッシュファイル + 差分スキャン、または全件スキャンで構築"""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            filters = []
+            if self._load_cache():
+                filters = [("updated_at", ">", self.watermark)]
+            scanned = self._scan(filters)
+            self.loaded = True
+            logger.info(f"記事登録簿を構築しました: {len(self.slugs)}件 (スキャン {scanned}件)")
+            self.save_cache()
+
+    def refresh(self) -> int:
+        """水位線以降に更新された記事を取り込む（水位線が無ければ全件スキャン。スキャンした件数を返す）
+
+        同じ updated_at の記事を取りこぼさないよう >= で読む（取り込み済みの記事は上書きになる）。
+        """
+        self.ensure_loaded()
+        with self._lock:
+            return self._scan([("updated_at", ">=", self.watermark)] if self.watermark else [])
+
+    def _scan(self, filters: list) -> int:
+        scanned = 0
+        for doc in self.backend.paginate(self.collection, filters=filters, fields=REGISTRY_FIELDS):
+            self._add(doc.id, doc.data.get("title", ""), doc.data.get("category", ""),
+                      doc.data.get("updated_at"))
+            scanned += 1
+        return scanned
+
+    def _load_cache(self) -> bool:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.bloom = BloomFilter.from_dict(data["bloom"])
+            self.slugs = data["slugs"]
+            if not all(isinstance(entry, list) for entry in self.slugs.values()):
+                raise ValueError("カテゴリを持たない旧形式のキャッシュです")
+            self.titles = {cat: sorted(titles) for cat, titles in data["titles"].items()}
+            self.watermark = datetime.fromisoformat(data["watermark"]) if data.get("watermark") else None
+            return self.watermark is not None
+        except Exception as e:
+            logger.warning(f"記事登録簿キャッシュを読み込めませんでした（全件スキャンします）: {e}")
+            self.bloom = BloomFilter(error_rate=self.error_rate)
+            self.slugs, self.titles, self.watermark = {}, {}, None
+            return False
+
+    def save_cache(self):
+        """登録簿をキャッシュファイルに書き出す"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = {
+                "bloom": self.bloom.to_dict(),
+                "slugs": self.slugs,
+                "titles": self.titles,
+                "watermark": self.watermark.isoformat() if self.watermark else None,
+            }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"記事登録簿キャッシュの保存エラー: {e}")
+
+    # === 更新 ===
+
+    def _add(self, slug: str, title: str, category: str, updated_at=None):
+        if slug not in self.slugs:
+            if self.bloom.count >= self.bloom.capacity:
+                self._grow()
+            self.bloom.add(slug)
+        else:
+            self._remove_title(*self.slugs[slug])
+        self.slugs[slug] = [title, category]
+        bisect.insort(self.titles.setdefault(category, []), title)
+        if isinstance(updated_at, datetime):
+            try:
+                if self.watermark is None or updated_at > self.watermark:
+                    self.watermark = updated_at
+            except TypeError:
+                pass  # タイムゾーン有無の異なる日時は水位線に使わない
+
+    def _remove_title(self, title: str, category: str):
+        """カテゴリのタイトル一覧から1件外す（同じタイトルの別カテゴリの記事には触れない）"""
+        titles = self.titles.get(category, [])
+        index = bisect.bisect_left(titles, title)
+        if index < len(titles) and titles[index] == title:
+            del titles[index]
+
+    def _grow(self):
+        """容量超過時は2倍の容量で作り直す（偽陽性率を維持）"""
+        bloom = BloomFilter(self.bloom.capacity * 2, self.error_rate)
+        for slug in self.slugs:
+            bloom.add(slug)
+        self.bloom = bloom
+
+    def add(self, slug: str, title: str, category: str, updated_at=None):
+        """保存した記事を登録（構築前なら何もしない。構築時に取り込まれる）"""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._add(slug, title, category, updated_at)
+
+    def discard(self, slug: str):
+        """削除した記事を完全集合から外す（ブルームフィルタには残る）"""
+        with self._lock:
+            entry = self.slugs.pop(slug, None)
+            if entry is not None:
+                self._remove_title(*entry)
+
+    # === 判定 ===
+
+    def may_contain_slug(self, slug: str) -> bool:
+        """スラッグが存在する可能性があるか
+
+        False なら確実に存在しない（Firestore を読む必要がない）。
+        True の場合は実際に読んで確認する。
+        """
+        self.ensure_loaded()
+        if slug not in self.bloom:
+            return False
+        # ブルームフィルタの偽陽性は完全集合で除外する
+        return slug in self.slugs
+
+    def has_title_prefix(self, category: str, prefix: str) -> bool:
+        """カテゴリ内に prefix で始まるタイトルがあるか
+
+        登録簿に無ければ、他のプロセスが保存した記事を取り込み直してから False を返す。
+        """
+        self.ensure_loaded()
+        if self._has_title_prefix(category, prefix):
+            return True
+        self.refresh()
+        return self._has_title_prefix(category, prefix)
+
+    def _has_title_prefix(self, category: str, prefix: str) -> bool:
+        with self._lock:
+            titles = self.titles.get(category, [])
+            index = bisect.bisect_left(titles, prefix)
+            return index < len(titles) and titles[index].startswith(prefix)
+
+    def __len__(self) -> int:
+        return len(self.slugs)
+
+def registry_cache_path(cache_dir: str, backend, collection: str) -> Optional[str]:
+    """バックエンドとコレクションごとのキャッシュファイルパス（永続化しないバックエンドは None）"""
+    cache_key = getattr(backend, "cache_key", None)
+    if not cache_dir or not cache_key:
+        return None
+    return os.path.join(cache_dir, f"article_registry-{cache_key}-{collection}.json")
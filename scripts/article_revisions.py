@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - 記事の版履歴
+上書き保存（save_article(allow_overwrite=True) など）で置き換えられる前の記事を版として残す
+
+保存形式（article_revisions/{スラッグ}/revisions/{版番号}）:
+    kind:        "delta"（次の版の本文との差分）または "keyframe"（本文全体）
+    content:     zlib 圧縮した差分（JSON）または本文
+    content_hash: この版の本文の SHA-256
+    base_hash:   差分の基準（次の版の本文）の SHA-256
+    article:     本文以外のフィールド（タイトル・概要・タグ・状態など）
+版番号が REVISION_KEYFRAME_INTERVAL の倍数の版と、差分が本文全体より大きくなる版は keyframe にする。
+古い版は新しい版（最新の版は現在の記事）との差分なので、版の復元は新しい方の keyframe から差分を順にあてる
+（読み込むのは高々 REVISION_KEYFRAME_INTERVAL 件）。REVISION_RETENTION を超えた古い版から削除する。
+
+差分は本文を HTML タグの終わり・改行ごとの断片に分け、次の版の断片の範囲のコピーと挿入の列で表す。
+
+使い方:
+    python -m scripts.article_revisions list <スラッグ>
+    python -m scripts.article_revisions show <スラッグ> <版番号>
+    python -m scripts.article_revisions rollback <スラッグ> <版番号>
+"""
+
+import argparse
+import difflib
+import json
+import logging
+import re
+import zlib
+from typing import Any, Dict, List
+
+from scripts.content_codec import ZLIB_LEVEL
+
+logger = logging.getLogger(__name__)
+
+REVISION_DELTA = "delta"
+REVISION_KEYFRAME = "keyframe"
+
+_SEGMENT_RE = re.compile(r'(?<=[>\n])')
+
+def split_segments(text: str) -> List[str]:
+    """本文を HTML タグの終わり・改行ごとの断片に分ける"""
+    return [segment for segment in _SEGMENT_RE.split(text) if segment]
+
+def make_delta(old: str, new: str) -> List[list]:
+    """new から old を組み立てる差分（["c", 開始, 終了]: new の断片のコピー / ["i", 文字列]: 挿入）"""
+    old_segments, new_segments = split_segments(old), split_segments(new)
+    delta: List[list] = []
+    matcher = difflib.SequenceMatcher(None, old_segments, new_segments, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append(["c", j1, j2])
+        elif i2 > i1:
+            delta.append(["i", "".join(old_segments[i1:i2])])
+    return delta
+
+def apply_delta(delta: List[list], new: str) -> str:
+    """make_delta() の差分を new にあてて old を復元"""
+    new_segments = split_segments(new)
+    return "".join("".join(new_segments[op[1]:op[2]]) if op[0] == "c" else op[1] for op in delta)
+
+def encode_revision(old: str, new: str, keyframe: bool) -> Dict[str, Any]:
+    """版の本文を保存用フィールドに変換（差分の方が大きければ keyframe にする）"""
+    full = zlib.compress(old.encode('utf-8'), ZLIB_LEVEL)
+    if not keyframe:
+        delta = zlib.compress(json.dumps(make_delta(old, new), ensure_ascii=False,
+                                         separators=(',', ':')).encode('utf-8'), ZLIB_LEVEL)
+        if len(delta) < len(full):
+            return {"kind": REVISION_DELTA, "content": delta}
+    return {"kind": REVISION_KEYFRAME, "content": full}
+
+def decode_revision(data: Dict[str, Any], successor: str = None) -> str:
+    """版の本文を復元（delta の場合は次の版の本文 successor が必要）"""
+    payload = zlib.decompress(bytes(data["content"])).decode('utf-8')
+    if data["kind"] == REVISION_KEYFRAME:
+        return payload
+    return apply_delta(json.loads(payload), successor)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH 記事の版履歴')
+    parser.add_argument('action', choices=['list', 'show', 'rollback'],
+                       help='list: 版の一覧 / show: 版の本文を表示 / rollback: 版の内容に戻す')
+    parser.add_argument('slug', help='記事のスラッグ')
+    parser.add_argument('revision', nargs='?', type=int, help='版番号（show / rollback）')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from scripts.firestore_manager import firestore_manager
+
+    if not firestore_manager.backend:
+        print("❌ ストレージに接続できません")
+        return False
+    if args.action != 'list' and args.revision is None:
+        parser.error(f"{args.action} には版番号が必要です")
+
+    if args.action == 'list':
+        revisions = firestore_manager.list_revisions(args.slug)
+        print(f"📜 {args.slug} の版履歴: {len(revisions)}件")
+        print("=" * 60)
+        for info in revisions:
+            print(f"  #{info['revision']:<4} {info['saved_at']:%Y-%m-%d %H:%M}  {info['kind']:<8} "
+                  f"{info['size']:>7} bytes  {info['title']}")
+        return
+
+    try:
+        article = firestore_manager.get_revision(args.slug, args.revision)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    if article is None:
+        print(f"❌ 版が見つかりません: {args.slug} #{args.revision}")
+        return False
+
+    if args.action == 'show':
+        print(f"📄 {article.title} (#{args.revision}, {article.status})")
+        print("=" * 60)
+        print(article.content_html)
+        return
+
+    firestore_manager.rollback_article(args.slug, args.revision)
+    print(f"✅ {args.slug} を版 #{args.revision} の内容に戻しました（現在の内容は新しい版として残っています）")
+
+if __name__ == "__main__":
+    main()
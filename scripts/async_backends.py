@@ -0,0 +1,191 @@
+"""
+Mt.MATH - 非同期ストレージバックエンド
+AsyncFirestoreManager から使う、StorageBackend と同じ操作の async 版
+
+- firestore: google.cloud.firestore.AsyncClient（config.async_db）
+- memory / sqlite: 同期バックエンドをスレッドで実行（asyncio.to_thread）
+
+書き込み計画（storage_backends.run_plan）も同期版と同じものを実行できる。
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from scripts.storage_backends import (
+    DocumentExistsError, DocumentNotFoundError, DocumentRecord, Filter, FirestoreBackend,
+    OrderBy, Plan, StorageBackend, WriteOp, create_backend,
+)
+
+class AsyncFirestoreBackend:
+    """Firestore AsyncClient を使うバックエンド"""
+
+    name = "firestore"
+
+    # クエリの組み立てと書き込みの追加は self.db だけを使うため同期版と共用する
+    _build_query = FirestoreBackend._build_query
+    _add_write = FirestoreBackend._add_write
+
+    def __init__(self, db):
+        self.db = db
+
+    def new_id(self, collection: str) -> str:
+        return self.db.collection(collection).document().id
+
+    async def get(self, collection: str, doc_id: str,
+                  fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        doc_ref = self.db.collection(collection).document(doc_id)
+        doc = await doc_ref.get(field_paths=list(fields) if fields is not None else None)
+        return doc.to_dict() if doc.exists else None
+
+    async def get_many(self, collection: str, doc_ids: Iterable[str],
+                       fields: Optional[Iterable[str]] = None) -> List[Optional[Dict[str, Any]]]:
+        doc_ids = list(doc_ids)
+        col_ref = self.db.collection(collection)
+        refs = [col_ref.document(doc_id) for doc_id in dict.fromkeys(doc_ids)]
+        found: Dict[str, Dict[str, Any]] = {}
+        async for doc in self.db.get_all(refs, field_paths=list(fields) if fields is not None else None):
+            if doc.exists:
+                found[doc.id] = doc.to_dict()
+        return [dict(found[doc_id]) if doc_id in found else None for doc_id in doc_ids]
+
+    async def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        await self.db.collection(collection).document(doc_id).set(data)
+
+    async def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        from google.api_core.exceptions import AlreadyExists
+        try:
+            await self.db.collection(collection).document(doc_id).create(data)
+        except AlreadyExists as e:
+            raise DocumentExistsError(f"{collection}/{doc_id}") from e
+
+    async def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        from google.api_core.exceptions import NotFound
+        try:
+            await self.db.collection(collection).document(doc_id).update(data)
+        except NotFound as e:
+            raise DocumentNotFoundError(f"{collection}/{doc_id}") from e
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        await self.db.collection(collection).document(doc_id).delete()
+
+    async def query(self, collection: str, filters: Iterable[Filter] = (),
+                    order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+                    fields: Optional[Iterable[str]] = None) -> List[DocumentRecord]:
+        query = self._build_query(collection, filters, order_by, limit, fields)
+        return [DocumentRecord(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+    async def count(self, collection: str, filters: Iterable[Filter] = ()) -> int:
+        query = self._build_query(collection, filters, (), None)
+        result = await query.count(alias="count").get()
+        return int(result[0][0].value)
+
+    async def commit(self, ops: Iterable[WriteOp]) -> None:
+        from google.api_core.exceptions import AlreadyExists, NotFound
+
+        batch = self.db.batch()
+        for op in ops:
+            self._add_write(batch, op)
+        try:
+            await batch.commit()
+        except NotFound as e:
+            raise DocumentNotFoundError(str(e)) from e
+        except AlreadyExists as e:
+            raise DocumentExistsError(str(e)) from e
+
+    async def run_plan(self, make_plan: Callable[[], Plan], max_attempts: int = 5) -> Any:
+        """書き込み計画を AsyncTransaction 内で実行し、計画の戻り値を返す（StorageBackend.run_plan と同じ）"""
+        from google.api_core.exceptions import AlreadyExists, NotFound
+        from google.cloud.firestore_v1.async_transaction import async_transactional
+
+        plan = make_plan()
+        try:
+            first = next(plan)
+        except StopIteration as stop:
+            ops, result = stop.value
+            await self.commit(ops)
+            return result
+
+        started = [(plan, first)]
+
+        @async_transactional
+        async def run(transaction):
+            plan, request = started.pop() if started else (make_plan(), None)
+            try:
+                if request is None:
+                    request = next(plan)
+                while True:
+                    collection, doc_id, fields = request.args
+                    doc = await self.db.collection(collection).document(doc_id).get(
+                        field_paths=list(fields) if fields is not None else None, transaction=transaction)
+                    request = plan.send(doc.to_dict() if doc.exists else None)
+            except StopIteration as stop:
+                ops, result = stop.value
+            for op in ops:
+                self._add_write(transaction, op)
+            return result
+
+        try:
+            return await run(self.db.transaction(max_attempts=max_attempts))
+        except NotFound as e:
+            raise DocumentNotFoundError(str(e)) from e
+        except AlreadyExists as e:
+            raise DocumentExistsError(str(e)) from e
+
+class ThreadedAsyncBackend:
+    """同期バックエンドの各操作をワーカースレッドで実行するバックエンド"""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+
+    def new_id(self, collection: str) -> str:
+        return self.backend.new_id(collection)
+
+    async def _call(self, method: str, *args):
+        return await asyncio.to_thread(getattr(self.backend, method), *args)
+
+    async def get(self, collection, doc_id, fields=None):
+        return await self._call("get", collection, doc_id, fields)
+
+    async def get_many(self, collection, doc_ids, fields=None):
+        return await self._call("get_many", collection, list(doc_ids), fields)
+
+    async def set(self, collection, doc_id, data):
+        await self._call("set", collection, doc_id, data)
+
+    async def create(self, collection, doc_id, data):
+        await self._call("create", collection, doc_id, data)
+
+    async def update(self, collection, doc_id, data):
+        await self._call("update", collection, doc_id, data)
+
+    async def delete(self, collection, doc_id):
+        await self._call("delete", collection, doc_id)
+
+    async def query(self, collection, filters=(), order_by=(), limit=None, fields=None):
+        return await self._call("query", collection, list(filters), list(order_by), limit, fields)
+
+    async def count(self, collection, filters=()):
+        return await self._call("count", collection, list(filters))
+
+    async def commit(self, ops):
+        await self._call("commit", list(ops))
+
+    async def run_plan(self, make_plan, max_attempts=5):
+        return await self._call("run_plan", make_plan, max_attempts)
+
+def create_async_backend(kind: str = None):
+    """設定に応じた非同期バックエンドを生成（firestore で接続できなければ None）"""
+    from scripts.config import config
+
+    kind = (kind or config.storage_backend).lower()
+    if kind == "firestore":
+        return AsyncFirestoreBackend(config.async_db) if config.async_db is not None else None
+    return ThreadedAsyncBackend(create_backend(kind))
+
+def async_backend_for(backend: StorageBackend):
+    """同期バックエンドと同じデータを読み書きする非同期バックエンド（firestore で接続できなければ None）"""
+    if isinstance(backend, FirestoreBackend):
+        from scripts.config import config
+        return AsyncFirestoreBackend(config.async_db) if config.async_db is not None else None
+    return ThreadedAsyncBackend(backend)
@@ -0,0 +1,244 @@
+"""
+Mt.MATH - 非同期 Firestore 管理モジュール
+FirestoreManager と同じ操作（記事・トピックの保存/取得/更新、統計）の asyncio 版
+
+Gemini の呼び出しと Firestore の読み書きを1つのイベントループで重ねて実行するためのもの。
+同時に発行するリクエスト数は max_concurrency（既定: ASYNC_MAX_CONCURRENCY）で制限する。
+読み書きの手順は FirestoreManager の読み取り計画・書き込み計画を非同期バックエンドで実行して共用し、
+キャッシュ・記事登録簿・検索インデックス・フィード・ミラーも同じ FirestoreManager のものを使う。
+
+    manager = AsyncFirestoreManager()
+    results = await manager.save_articles(articles)
+    article = await manager.get_article(slug)
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional
+
+from scripts.config import config
+from scripts.data_models import MathArticle, MathTopic
+from scripts.firestore_manager import FirestoreManager, BulkResult, CachedRead, firestore_manager
+from scripts.read_cache import MISS
+from scripts.storage_backends import DocumentExistsError, Plan, Read, WriteOp
+from scripts.async_backends import async_backend_for
+
+logger = logging.getLogger(__name__)
+
+class AsyncFirestoreManager:
+    """Firestore データベース管理クラス（asyncio 版）"""
+
+    def __init__(self, backend=None, max_concurrency: int = None, manager: FirestoreManager = None):
+        """backend を省略すると manager のバックエンドと同じデータを読み書きする非同期バックエンドを使う
+
+        manager を省略するとグローバルの firestore_manager を共用する
+        （ThreadedAsyncBackend を渡した場合は、その同期バックエンドの FirestoreManager を作る）。
+        """
+        if manager is None:
+            wrapped = getattr(backend, "backend", None)
+            manager = FirestoreManager(wrapped) if wrapped is not None else firestore_manager
+        self.manager = manager
+        self._backend = backend
+        self.articles_collection = manager.articles_collection
+        self.topics_collection = manager.topics_collection
+        self.cache = manager.cache
+        self.max_concurrency = max_concurrency or config.async_max_concurrency
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @property
+    def backend(self):
+        """非同期ストレージバックエンド（初回アクセス時に生成）"""
+        if self._backend is None:
+            self._backend = async_backend_for(self.manager.backend)
+        return self._backend
+
+    async def _call(self, method: str, *args, **kwargs):
+        """同時実行数の上限内でバックエンドの操作を実行"""
+        async with self._semaphore:
+            return await getattr(self.backend, method)(*args, **kwargs)
+
+    async def _run_plan(self, make_plan: Callable[[], Plan]) -> Any:
+        """同時実行数の上限内で FirestoreManager の書き込み計画を実行"""
+        async with self._semaphore:
+            return await self.backend.run_plan(make_plan)
+
+    async def _read(self, plan: Generator[Any, Any, Any]) -> Any:
+        """FirestoreManager の読み取り計画を実行（リストで yield された読み取りは並行して発行する）"""
+        try:
+            request = next(plan)
+            while True:
+                if isinstance(request, list):
+                    result = await asyncio.gather(*(self._fetch(read) for read in request))
+                else:
+                    result = await self._fetch(request)
+                request = plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _fetch(self, read: Read) -> Any:
+        if read.mirror:
+            # ミラーはローカルの SQLite なのでスレッドで読む
+            return await asyncio.to_thread(getattr(self.manager.mirror, read.method), *read.args)
+        return await self._call(read.method, *read.args)
+
+    async def _read_cached(self, read: CachedRead) -> Any:
+        value = self.cache.get(read.key)
+        if value is MISS:
+            value = await self._read(read.make_plan())
+            self.cache.put(read.key, value, read.kind, read.tags)
+        return value
+
+    # === 記事管理 ===
+
+    async def save_article(self, article: MathArticle, allow_overwrite: bool = False) -> str:
+        """記事を保存（上書きしない場合は作成の前提条件で重複を検出する）"""
+        try:
+            await self._write_article(article, allow_overwrite)
+            logger.info(f"記事を保存しました: {article.title}")
+            return article.slug
+        except DocumentExistsError as e:
+            logger.error(f"記事保存エラー: 記事が既に存在します: {article.slug}")
+            raise ValueError(f"記事が既に存在します: {article.slug}") from e
+        except Exception as e:
+            logger.error(f"記事保存エラー: {e}")
+            raise
+
+    async def publish_generated_article(self, article: MathArticle, topic_id: Optional[str],
+                                        allow_overwrite: bool = False) -> str:
+        """記事の保存とトピックの生成済みマークを1回のバッチで書き込む"""
+        extra = []
+        if topic_id:
+            extra.append(WriteOp("update", self.topics_collection, topic_id,
+                                 {"article_generated": True, "article_slug": article.slug,
+                                  "lease_owner": None, "lease_expires_at": None}))
+        try:
+            await self._write_article(article, allow_overwrite, extra)
+            if topic_id:
+                self.cache.invalidate(f"topic:{topic_id}")
+            logger.info(f"記事を公開しトピックを生成済みにしました: {article.title} (トピック ID: {topic_id})")
+            return article.slug
+        except Exception as e:
+            logger.error(f"記事公開エラー: {e}")
+            raise
+
+    async def _write_article(self, article: MathArticle, allow_overwrite: bool,
+                             extra: Iterable[WriteOp] = ()):
+        """FirestoreManager._write_article の asyncio 版（書き込み計画と保存後の処理は同期版のもの）"""
+        manager = self.manager
+        extra = list(extra)
+        may_exist = await asyncio.to_thread(manager._slug_may_exist, article.slug)
+        try:
+            refill = await self._run_plan(
+                lambda: manager._save_plan(article, allow_overwrite and may_exist, extra))
+        except DocumentExistsError:
+            if not allow_overwrite or may_exist:
+                raise
+            logger.warning(f"記事登録簿に無い記事が既に存在します（読み直して上書きします）: {article.slug}")
+            refill = await self._run_plan(lambda: manager._save_plan(article, True, extra))
+        await asyncio.to_thread(manager._article_saved, article, refill)
+
+    async def save_articles(self, articles: Iterable[MathArticle],
+                            allow_overwrite: bool = False) -> List[BulkResult]:
+        """複数の記事を並行して保存し、記事ごとの結果を返す"""
+        articles = list(articles)
+        outcomes = await asyncio.gather(
+            *(self.save_article(article, allow_overwrite) for article in articles),
+            return_exceptions=True)
+        return [BulkResult(article.slug, str(outcome) if isinstance(outcome, Exception) else None)
+                for article, outcome in zip(articles, outcomes)]
+
+    async def delete_article(self, slug: str) -> bool:
+        """記事を削除（split レイアウトの本文・チャンクも削除）"""
+        manager = self.manager
+        try:
+            refill = await self._run_plan(lambda: manager._delete_plan(slug))
+            if refill is None:
+                return False
+            await asyncio.to_thread(manager._article_deleted, slug, refill)
+            logger.info(f"記事を削除しました: {slug}")
+            return True
+        except Exception as e:
+            logger.error(f"記事削除エラー: {e}")
+            raise
+
+    async def get_article(self, slug: str) -> Optional[MathArticle]:
+        """スラッグで記事を取得"""
+        try:
+            return await self._read_cached(self.manager._article_read(slug))
+        except Exception as e:
+            logger.error(f"記事取得エラー: {e}")
+            return None
+
+    async def get_articles(self, slugs: Iterable[str], fields: List[str] = None,
+                           include_body: bool = True) -> List[Optional[Any]]:
+        """複数の記事をスラッグでまとめて取得（入力と同じ順序、存在しない記事は None）"""
+        slugs = list(slugs)
+        try:
+            return await self._read(self.manager._articles_plan(slugs, fields, include_body))
+        except Exception as e:
+            logger.error(f"記事一括取得エラー: {e}")
+            return [None] * len(slugs)
+
+    async def get_articles_by_category(self, category: str, limit: int = 20,
+                                       include_body: bool = False) -> List[MathArticle]:
+        """カテゴリ別に記事を取得"""
+        try:
+            return list(await self._read_cached(self.manager._category_read(category, limit, include_body)))
+        except Exception as e:
+            logger.error(f"カテゴリ別記事取得エラー: {e}")
+            return []
+
+    async def get_all_published_articles(self, limit: int = 50,
+                                         include_body: bool = False) -> List[MathArticle]:
+        """公開済み記事を全て取得"""
+        try:
+            return list(await self._read_cached(self.manager._published_read(limit, include_body)))
+        except Exception as e:
+            logger.error(f"全記事取得エラー: {e}")
+            return []
+
+    # === トピック管理 ===
+
+    async def save_topic(self, topic: MathTopic) -> str:
+        """トピックを保存"""
+        try:
+            topic_id = self.backend.new_id(self.topics_collection)
+            topic.topic_id = topic_id
+            await self._call("commit", self.manager._new_topic_ops(topic))
+            logger.info(f"トピックを保存しました: {topic.name} (ID: {topic_id})")
+            return topic_id
+        except Exception as e:
+            logger.error(f"トピック保存エラー: {e}")
+            raise
+
+    async def get_ungenerated_topics(self, limit: int = 10) -> List[MathTopic]:
+        """未生成のトピックを取得（優先度順）"""
+        try:
+            return await self._read(self.manager._ungenerated_topics_plan(limit))
+        except Exception as e:
+            logger.error(f"未生成トピック取得エラー: {e}")
+            return []
+
+    async def update_topic_status(self, topic_id: str, generated: bool, article_slug: str = None):
+        """トピックの生成ステータスを更新"""
+        try:
+            await self._call("commit", self.manager._topic_status_ops(topic_id, generated, article_slug))
+            self.cache.invalidate(f"topic:{topic_id}")
+            logger.info(f"トピック ID '{topic_id}' のステータスを更新しました。")
+        except Exception as e:
+            logger.error(f"トピックステータス更新エラー (ID: {topic_id}): {e}")
+            raise
+
+    async def mark_topic_as_generated(self, topic_id: str, article_slug: str):
+        """トピックを生成済みとしてマーク"""
+        await self.update_topic_status(topic_id, True, article_slug)
+
+    # === 統計情報 ===
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """サイト統計情報を取得（カウンター、または集計クエリを並行実行）"""
+        try:
+            return await self._read(self.manager._stats_plan())
+        except Exception as e:
+            logger.error(f"統計情報取得エラー: {e}")
+            return {}
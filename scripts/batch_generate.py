@@ -12,7 +12,8 @@ import time
 
 from scripts.config import config
 from scripts.data_models import MathTopic, MathArticle, CATEGORY_MAP
-from scripts.firestore_manager import firestore_manager
+from scripts.firestore_manager import firestore_manager, default_worker_id
+from scripts.storage_backends import DocumentExistsError
 from scripts.topic_selector import TopicSelector
 from scripts.article_generator_v2 import ArticleGenerator
 
@@ -26,8 +27,10 @@ class BatchGenerator:
     def __init__(self):
         self.topic_selector = TopicSelector()
         self.article_generator = ArticleGenerator()
+        # 同時に動く他のバッチと同じトピックを処理しないよう、トピックはリースして使う
+        self.worker_id = default_worker_id()
         
-        if not config.db or not config.gemini_model:
+        if not firestore_manager.backend or not config.gemini_model:
             raise ValueError("Firebase または Gemini API の初期化に失敗しました")
     
     def run_full_workflow(self, total_articles: int = 3, 
@@ -48,6 +51,7 @@ class BatchGenerator:
             "articles_generated": 0,
             "successful_articles": [],
             "failed_articles": [],
+            "skipped_articles": [],
             "execution_time": 0,
             "errors": []
         }
@@ -73,19 +77,29 @@ class BatchGenerator:
             for i, topic in enumerate(topics_to_process, 1):
                 try:
                     print(f"\n--- 記事 {i}/{len(topics_to_process)} ---")
+                    # 生成前にリースを延長（失っていれば他のワーカーに任せる）
+                    if topic.topic_id and not firestore_manager.renew_leases(
+                            [topic.topic_id], self.worker_id).get(topic.topic_id):
+                        print(f"⏭️  他のワーカーが処理中のためスキップ: {topic.name}")
+                        continue
+                    # 記事のスラッグはトピックのタイトルで決まるため、Gemini を呼ぶ前に既存の記事を確認する
+                    slug = MathArticle.generate_slug(topic.title)
+                    existing = firestore_manager.get_articles([slug], fields=["title", "category"])[0]
+                    if existing is not None:
+                        self._skip_published(topic, slug, existing, results)
+                        continue
                     article = self._generate_article_from_topic(topic)
                     
                     if article:
-                        # Firestoreに保存
-                        firestore_manager.save_article(article, allow_overwrite=True)
-                        
-                        # トピックを生成済みとしてマーク
-                        topic_id = topic.topic_id or topic.name
-                        firestore_manager.update_topic_status(
-                            topic_id, 
-                            generated=True, 
-                            article_slug=article.slug
-                        )
+                        # 記事の保存とトピックの生成済みマークを1回のバッチで書き込む
+                        try:
+                            firestore_manager.publish_generated_article(article, topic.topic_id)
+                        except DocumentExistsError:
+                            # 生成中に他のワーカーが同じスラッグの記事を公開した
+                            existing = firestore_manager.get_articles(
+                                [article.slug], fields=["title", "category"])[0]
+                            self._skip_published(topic, article.slug, existing or {}, results)
+                            continue
                         
                         results["successful_articles"].append({
                             "topic": topic.name,
@@ -112,6 +126,8 @@ class BatchGenerator:
                         raise ValueError("記事生成に失敗しました")
                         
                 except Exception as e:
+                    if topic.topic_id:
+                        firestore_manager.release_topics([topic.topic_id], self.worker_id)
                     error_msg = f"記事生成エラー (トピック: {topic.name}): {e}"
                     logger.error(error_msg)
                     results["failed_articles"].append({
@@ -134,10 +150,25 @@ class BatchGenerator:
             print(f"\n❌ バッチ処理が中断されました: {e}")
             return results
     
+    def _skip_published(self, topic: MathTopic, slug: str, existing: Dict[str, Any],
+                        results: Dict[str, Any]):
+        """このトピックの記事が公開済みなら、トピックを生成済みにしてスキップする
+
+        同じスラッグでもタイトルかカテゴリが異なる記事は別のトピックのものなので、
+        トピックを生成済みにせず失敗として扱う（ValueError）。
+        """
+        if existing.get("title") != topic.title or existing.get("category") != topic.category:
+            raise ValueError(f"スラッグ '{slug}' は別の記事が使用しています: {existing.get('title')}")
+        # 生成済みのマークで、publish_generated_article と同じくリースも外れる
+        if topic.topic_id:
+            firestore_manager.update_topic_status(topic.topic_id, generated=True, article_slug=slug)
+        results["skipped_articles"].append({"topic": topic.name, "slug": slug})
+        print(f"⏭️  公開済みのためスキップ: {topic.title} ({slug})")
+
     def _get_ungenerated_topics(self, limit: int) -> List[MathTopic]:
-        """未生成トピックを取得"""
+        """未生成トピックをリースして取得"""
         try:
-            topics = firestore_manager.get_ungenerated_topics(limit)
+            topics = firestore_manager.claim_topics(self.worker_id, limit)
             if topics:
                 print(f"📋 既存未生成トピック: {len(topics)}個発見")
                 for topic in topics:
@@ -159,14 +190,21 @@ class BatchGenerator:
                 target_categories=target_categories
             )
             
-            # Firestoreに保存
-            for topic in topics:
-                firestore_manager.save_topic(topic)
+            # Firestoreに一括保存
+            results = firestore_manager.save_topics_bulk(topics)
+            saved = []
+            for topic, result in zip(topics, results):
+                if not result.ok:
+                    print(f"   ❌ トピック保存エラー: {topic.name} ({result.error})")
+                    continue
                 # generated_topics.jsonにも保存
                 self.topic_selector._save_new_topic(topic)
                 print(f"   ✅ トピック保存: {topic.name}")
+                saved.append(topic)
             
-            return topics
+            # 保存したトピックは他のワーカーに取られる前にリースする
+            return firestore_manager.claim_topics(
+                self.worker_id, topic_ids=[topic.topic_id for topic in saved])
             
         except Exception as e:
             logger.error(f"新規トピック生成エラー: {e}")
@@ -208,6 +246,7 @@ class BatchGenerator:
         print(f"⏱️  実行時間: {results['execution_time']:.1f}秒")
         print(f"📋 新規トピック生成: {results['topics_generated']}個")
         print(f"📖 記事生成成功: {results['articles_generated']}/{results['total_requested']}")
+        print(f"⏭️  公開済みでスキップ: {len(results['skipped_articles'])}個")
         print(f"❌ 失敗: {len(results['failed_articles'])}個")
         
         if results["successful_articles"]:
@@ -234,7 +273,7 @@ class BatchGenerator:
         
         print(f"\n🚀 デプロイ準備完了!")
 
-def main():
+def main(argv=None):
     """メイン実行関数"""
     
     parser = argparse.ArgumentParser(description='Mt.MATH 統合記事生成バッチ処理')
@@ -247,7 +286,7 @@ def main():
     parser.add_argument('--dry-run', action='store_true',
                        help='ドライラン（実際の生成は行わない）')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.dry_run:
         print("🧪 ドライランモード: 実際の生成は行いません")
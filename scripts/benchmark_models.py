@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - データモデルのマイクロベンチマーク
+MathArticle / MathTopic の1件あたりのエンコード・デコード時間と、
+大量（既定 100,000件）の記事オブジェクトを保持したときのメモリ量を計測する
+
+使い方:
+    python -m scripts.benchmark_models --count 100000
+"""
+
+import argparse
+import dataclasses
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from scripts.data_models import MathArticle, MathTopic
+
+def make_article(i: int) -> MathArticle:
+    return MathArticle(
+        title=f"テスト記事 {i}",
+        slug=f"test-article-{i}",
+        category="algebra",
+        content_html=f"<h2>見出し {i}</h2>" + "<p>本文の段落です。</p>" * 60,
+        summary="記事の要約です。" * 10,
+        difficulty_level=5,
+        niche_score=7,
+        tags=["代数学", "テスト", f"tag{i % 50}"],
+        meta_description="記事の説明です。",
+        created_at=datetime(2025, 1, 1),
+        updated_at=datetime(2025, 1, 2),
+        status="published",
+    )
+
+def make_topic(i: int) -> MathTopic:
+    return MathTopic(
+        name=f"トピック {i}",
+        category="analysis",
+        description="トピックの説明です。",
+        title=f"トピック {i} の完全解説",
+        summary="トピックの要約です。",
+        difficulty_level=5,
+        niche_score=8,
+        tags=["解析学", "テスト"],
+        created_at=datetime(2025, 1, 1),
+    )
+
+def per_call_us(func, items) -> float:
+    """items の各要素に func を適用したときの1件あたり時間（マイクロ秒）"""
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+    return elapsed / len(items) * 1e6
+
+def report_codec(label: str, objects: list, model) -> None:
+    dicts = [obj.to_dict() for obj in objects]
+    # Firestore のドキュメントには書き込み時の追加フィールドが含まれることがある
+    dicts_with_extra = [{**d, "content_length": 0, "lease_owner": None} for d in dicts]
+    kwargs_dicts = [dict(d) for d in dicts]
+
+    print(f"\n📦 {label} ({len(objects):,}件)")
+    print(f"  encode to_dict()             {per_call_us(model.to_dict, objects):7.2f} µs/件")
+    print(f"  encode dataclasses.asdict()  {per_call_us(dataclasses.asdict, objects):7.2f} µs/件  (旧実装)")
+    print(f"  decode from_dict()           {per_call_us(model.from_dict, dicts):7.2f} µs/件")
+    print(f"  decode from_dict(未知キー付) {per_call_us(model.from_dict, dicts_with_extra):7.2f} µs/件")
+    print(f"  decode cls(**data)           {per_call_us(lambda d: model(**d), kwargs_dicts):7.2f} µs/件  (旧実装)")
+
+def report_memory(count: int) -> None:
+    """記事オブジェクト本体（フィールド値を除く）のメモリ量を計測"""
+    contents = [f"<p>{i}</p>" for i in range(count)]
+    created = datetime(2025, 1, 1)
+    tags = ["代数学"]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    articles = [MathArticle.from_dict({
+        "title": "t", "slug": "s", "category": "algebra", "content_html": contents[i],
+        "summary": "", "difficulty_level": 5, "niche_score": 7, "tags": tags,
+        "related_topics": tags, "created_at": created, "updated_at": created,
+    }) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    total = after - before
+    print(f"\n🧠 メモリ ({count:,}件の MathArticle)")
+    print(f"  合計                         {total / 1024 / 1024:7.2f} MiB")
+    print(f"  1件あたり                    {total / count:7.1f} B")
+    print(f"  sys.getsizeof(article)       {sys.getsizeof(articles[0]):7d} B  (__dict__ なし)")
+    fields = {f.name: getattr(articles[0], f.name) for f in dataclasses.fields(MathArticle)}
+    print(f"  参考: 同じ属性の __dict__    {sys.getsizeof(fields):7d} B")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH データモデルのマイクロベンチマーク')
+    parser.add_argument('--count', type=int, default=100_000, help='件数 (デフォルト: 100000)')
+    args = parser.parse_args(argv)
+
+    print(f"⏱️  データモデル ベンチマーク (Python {sys.version.split()[0]})")
+    print("=" * 60)
+    report_codec("MathArticle", [make_article(i) for i in range(args.count)], MathArticle)
+    report_codec("MathTopic", [make_topic(i) for i in range(args.count)], MathTopic)
+    report_memory(args.count)
+
+if __name__ == "__main__":
+    main()
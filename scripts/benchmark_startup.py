@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - 起動時間ベンチマーク
+各モジュールの import にかかる時間を別プロセスで計測する
+
+使い方:
+    python -m scripts.benchmark_startup --repeat 5
+    python -m scripts.benchmark_startup --connect   # 初回接続時間も計測
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# 計測対象（ラベル, 実行コード）
+IMPORT_TARGETS = [
+    ("python 起動のみ", "pass"),
+    ("scripts.config", "import scripts.config"),
+    ("scripts.firestore_manager", "import scripts.firestore_manager"),
+    ("scripts.data_models", "import scripts.data_models"),
+    ("(参考) firebase_admin.firestore", "import firebase_admin.firestore"),
+    ("(参考) google.generativeai", "import google.generativeai"),
+]
+
+CONNECT_TARGETS = [
+    ("config.db 初回アクセス", "from scripts.config import config\nconfig.db"),
+    ("config.gemini_model 初回アクセス", "from scripts.config import config\nconfig.gemini_model"),
+]
+
+TIMER_TEMPLATE = """
+import time, warnings
+warnings.simplefilter('ignore')
+_t = time.perf_counter()
+{code}
+print(time.perf_counter() - _t)
+"""
+
+def measure(code: str, repeat: int) -> list:
+    """新しいインタプリタでコードを実行し、経過時間（秒）のリストを返す"""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER_TEMPLATE.format(code=code)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH 起動時間ベンチマーク')
+    parser.add_argument('--repeat', type=int, default=5, help='計測回数 (デフォルト: 5)')
+    parser.add_argument('--connect', action='store_true',
+                       help='Firebase / Gemini の初回接続時間も計測する')
+    args = parser.parse_args(argv)
+
+    targets = list(IMPORT_TARGETS)
+    if args.connect:
+        targets += CONNECT_TARGETS
+
+    print(f"⏱️  起動時間ベンチマーク (各 {args.repeat} 回, 中央値)")
+    print("=" * 60)
+    for label, code in targets:
+        try:
+            samples = measure(code, args.repeat)
+            median = statistics.median(samples) * 1000
+            print(f"  {label:<36} {median:8.1f} ms  (min {min(samples) * 1000:.1f} ms)")
+        except Exception as e:
+            print(f"  {label:<36} 計測失敗: {e}")
+
+if __name__ == "__main__":
+    main()
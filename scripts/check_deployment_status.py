@@ -28,14 +28,14 @@ def check_deployment_status():
     
     # 記事状況確認
     try:
-        articles_ref = config.db.collection(config.articles_collection)
-        articles = articles_ref.stream()
+        # 本文は読まずに一覧に必要なフィールドだけをページ単位で取得
+        articles = firestore_manager.iter_articles(fields=["title", "slug", "status"])
         article_count = 0
         published_count = 0
         
         print("\n📚 記事一覧:")
         for doc in articles:
-            data = doc.to_dict()
+            data = doc.data
             article_count += 1
             status = data.get('status', 'unknown')
             if status == 'published':
@@ -53,14 +53,14 @@ def check_deployment_status():
     
     # トピック状況確認
     try:
-        topics_ref = config.db.collection(config.math_topics_collection)
-        topics = topics_ref.stream()
+        # MIRROR_DB_PATH が設定されていればローカルミラーから読む
+        topics = firestore_manager.iter_topics(fields=["name", "title", "article_generated"])
         topic_count = 0
         generated_count = 0
         
         print(f"\n🎯 トピック一覧:")
         for doc in topics:
-            data = doc.to_dict()
+            data = doc.data
             topic_count += 1
             generated = data.get('article_generated', False)
             if generated:
@@ -4,10 +4,8 @@
 """
 
 import logging
-from scripts.config import config
 from scripts.firestore_manager import firestore_manager
 from scripts.article_generator_v2 import ArticleGenerator
-from scripts.data_models import MathTopic
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -36,13 +34,8 @@ def clean_and_regenerate_bad_articles():
         # Step 1: 問題記事を削除
         for slug in bad_article_slugs:
             try:
-                # 記事を削除
-                articles_ref = config.db.collection(config.articles_collection)
-                query = articles_ref.where("slug", "==", slug)
-                docs = list(query.stream())
-                
-                for doc in docs:
-                    doc.reference.delete()
+                # 記事を削除（分離保存された本文も削除）
+                if firestore_manager.delete_article(slug):
                     print(f"🗑️  削除完了: {slug}")
                     
             except Exception as e:
@@ -51,11 +44,8 @@ def clean_and_regenerate_bad_articles():
         # Step 2: 対応するトピックのステータスをリセット
         for topic_id in topic_ids:
             try:
-                doc_ref = config.db.collection(config.math_topics_collection).document(topic_id)
-                doc_ref.update({
-                    "article_generated": False,
-                    "article_slug": None
-                })
+                # キャッシュの無効化と同期マニフェストへの記録も FirestoreManager に任せる
+                firestore_manager.update_topic_status(topic_id, generated=False)
                 print(f"🔄 トピックステータスリセット: {topic_id}")
                 
             except Exception as e:
@@ -67,17 +57,12 @@ def clean_and_regenerate_bad_articles():
         generator = ArticleGenerator()
         regenerated_count = 0
         
-        for topic_id in topic_ids:
+        # トピック情報をまとめて取得
+        topics = firestore_manager.get_topics(topic_ids)
+        
+        for topic_id, topic in zip(topic_ids, topics):
             try:
-                # トピック情報を取得
-                doc_ref = config.db.collection(config.math_topics_collection).document(topic_id)
-                doc = doc_ref.get()
-                
-                if doc.exists:
-                    data = doc.to_dict()
-                    data['topic_id'] = doc.id
-                    topic = MathTopic(**data)
-                    
+                if topic is not None:
                     print(f"\n📝 再生成中: {topic.name}")
                     print(f"   タイトル: {topic.title}")
                     
@@ -0,0 +1,92 @@
+"""
+Mt.MATH - 統合コマンドライン
+`python -m scripts <コマンド> [引数...]` で各スクリプトを実行する
+
+--daemon を付けると、常駐デーモン（python -m scripts daemon）にジョブをソケット経由で
+渡し、温まった Firestore / Gemini クライアントで実行する。デーモンが起動していない場合や、
+作業ディレクトリ・環境変数がデーモンと異なり実行を拒否された場合は現在のプロセスで実行する。
+"""
+
+import argparse
+import importlib
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+class Command(NamedTuple):
+    """サブコマンド定義"""
+    module: str          # main() を持つモジュール
+    help: str            # 説明
+    takes_args: bool     # main(argv) が引数を受け取るか
+    daemon_ok: bool = True  # デーモンに委譲してよいか
+
+COMMANDS: Dict[str, Command] = {
+    "batch": Command("scripts.batch_generate", "トピック生成 → 記事生成の統合バッチ", True),
+    "article": Command("scripts.article_generator_v2", "単一記事の生成", True),
+    "topics": Command("scripts.topic_selector", "ニッチトピックの選定", True),
+    "clean": Command("scripts.clean_bad_articles", "問題記事のクリーンアップと再生成", False),
+    "status": Command("scripts.check_deployment_status", "デプロイメント状況の確認", False),
+    "inspect": Command("scripts.inspect_firestore_topics", "Firestore トピックの詳細調査", False),
+    "mirror": Command("scripts.firestore_mirror", "Firestore のローカル SQLite ミラーを同期", True, daemon_ok=False),
+    "sync": Command("scripts.merkle_sync", "マニフェストによる Firestore とローカルの差分同期", True),
+    "views": Command("scripts.rollup_view_counts", "閲覧数の集計と人気記事ランキングの更新", True, daemon_ok=False),
+    "report": Command("scripts.corpus_report", "記事コーパスの集計レポート", True),
+    "revisions": Command("scripts.article_revisions", "記事の版履歴の表示とロールバック", True),
+    "migrate-bodies": Command("scripts.migrate_article_bodies", "記事本文の保存レイアウト移行", True),
+    "bench-startup": Command("scripts.benchmark_startup", "起動時間ベンチマーク", True, daemon_ok=False),
+    "daemon": Command("scripts.daemon", "常駐ワーカーデーモンを起動", True, daemon_ok=False),
+}
+
+def exit_code_of(exc: SystemExit) -> int:
+    """SystemExit を終了コードに変換"""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+def run_command(name: str, argv: List[str]) -> int:
+    """現在のプロセスでサブコマンドを実行し、終了コードを返す"""
+    command = COMMANDS[name]
+    module = importlib.import_module(command.module)
+    try:
+        result = module.main(argv) if command.takes_args else module.main()
+    except SystemExit as e:
+        return exit_code_of(e)
+    # check_deployment_status.main() のように真偽値を返すものは終了コードに反映
+    return 1 if result is False else 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m scripts",
+        description="Mt.MATH 記事生成システム 統合コマンド",
+        epilog="\n".join(f"  {name:<14} {cmd.help}" for name, cmd in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--daemon', action='store_true',
+                       help='起動中のデーモンにジョブを委譲する')
+    parser.add_argument('--socket', default=None,
+                       help='デーモンの Unix ソケットパス (既定: MTMATH_DAEMON_SOCKET)')
+    parser.add_argument('command', choices=list(COMMANDS.keys()), metavar='command',
+                       help='実行するサブコマンド')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                       help='サブコマンドに渡す引数')
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    command = COMMANDS[args.command]
+
+    if args.command == "daemon" and args.socket:
+        args.args = ["--socket", args.socket] + args.args
+
+    if args.daemon and command.daemon_ok:
+        from scripts.daemon import DaemonRefused, DaemonUnavailable, submit_job
+        try:
+            return submit_job(args.command, args.args, socket_path=args.socket)
+        except DaemonRefused as e:
+            print(f"⚠️  デーモンが実行を拒否しました（{e}）。現在のプロセスで実行します", file=sys.stderr)
+        except DaemonUnavailable:
+            print("⚠️  デーモンが起動していません。現在のプロセスで実行します", file=sys.stderr)
+
+    return run_command(args.command, args.args)
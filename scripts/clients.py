@@ -0,0 +1,77 @@
+"""
+Mt.MATH - クライアントファクトリ
+プロセスごとに Firestore / Gemini クライアントを払い出す
+
+gRPC クライアントは fork を跨いで共有できないため、config と firestore_manager は
+現在のプロセスIDを記録し、子プロセスでの初回アクセス時にクライアントを作り直す。
+CPU負荷の高い処理は process_pool() / parallel_map() で全コアに分散できる。
+
+    from scripts.clients import get_firestore_manager, parallel_map
+
+    results = parallel_map(validate_article, articles)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from scripts.config import config, Config
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+def get_config() -> Config:
+    """現在のプロセスの設定オブジェクト"""
+    return config
+
+def get_db():
+    """現在のプロセス用の Firestore クライアント（接続失敗時は None）"""
+    return config.db
+
+def get_gemini_model():
+    """現在のプロセス用の Gemini モデル（接続失敗時は None）"""
+    return config.gemini_model
+
+def get_firestore_manager():
+    """現在のプロセス用の FirestoreManager"""
+    from scripts.firestore_manager import firestore_manager
+    return firestore_manager
+
+def reset_clients():
+    """現在のプロセスで保持しているクライアントを破棄（ワーカー初期化用）"""
+    config.reset_clients()
+
+def _worker_initializer(initializer: Optional[Callable], initargs: tuple):
+    reset_clients()
+    if initializer is not None:
+        initializer(*initargs)
+
+def process_pool(max_workers: int = None, start_method: str = None,
+                 initializer: Callable = None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    """クライアントをワーカーごとに初期化する ProcessPoolExecutor を生成
+
+    start_method を省略すると環境変数 WORKER_START_METHOD（既定: fork）を使う。
+    """
+    context = multiprocessing.get_context(start_method or config.worker_start_method)
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=context,
+        initializer=_worker_initializer,
+        initargs=(initializer, initargs),
+    )
+
+def parallel_map(func: Callable[[T], R], items: Iterable[T], max_workers: int = None,
+                 chunksize: int = 1) -> List[R]:
+    """func を全コアで並列に適用し、入力順の結果リストを返す
+
+    func はモジュールレベルの関数（pickle 可能）である必要がある。
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = min(max_workers or os.cpu_count() or 1, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+    with process_pool(max_workers=workers) as pool:
+        return list(pool.map(func, items, chunksize=chunksize))
@@ -1,63 +1,243 @@
 """
 Mt.MATH - 設定管理モジュール
 環境変数と Firebase 接続の設定
+
+Firebase / Gemini のクライアントは初回アクセス時に遅延初期化する。
+重い SDK（firebase_admin, google.generativeai）の import も初回アクセスまで行わない。
+クライアントはプロセスごとに保持し、fork 後の子プロセスでは作り直す。
 """
 
 import os
-import json
+import tempfile
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
-import google.generativeai as genai
 
 # 環境変数をロード
 load_dotenv()
 
+# gRPC チャネルを持ったまま fork しても子プロセスが固まらないようにする
+# （grpc の import より前に設定する必要がある）
+os.environ.setdefault('GRPC_ENABLE_FORK_SUPPORT', 'true')
+
 class Config:
     """アプリケーション設定クラス"""
-    
+
     def __init__(self):
-        self.gemini_api_key = os.getenv('GEMINI_API_KEY')
+        self.gemini_api_keys = self._parse_gemini_api_keys()
+        self.gemini_api_key = self.gemini_api_keys[0][1] if self.gemini_api_keys else None
+        self.gemini_model_name = os.getenv('GEMINI_MODEL_NAME', 'gemini-2.5-pro')
+        self.gemini_pool_strategy = os.getenv('GEMINI_POOL_STRATEGY', 'round_robin')
+        self.gemini_quarantine_seconds = float(os.getenv('GEMINI_QUARANTINE_SECONDS', '60'))
         self.firebase_project_id = os.getenv('FIREBASE_PROJECT_ID', 'math-52da7')
         self.service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH', './service-account-key.json')
         self.articles_collection = os.getenv('ARTICLES_COLLECTION', 'articles')
         self.math_topics_collection = os.getenv('MATH_TOPICS_COLLECTION', 'math_topics')
-        
-        # Firebase初期化
-        self._init_firebase()
-        
-        # Gemini初期化
-        self._init_gemini()
-    
+
+        # ストレージバックエンド（firestore / memory / sqlite）
+        self.storage_backend = os.getenv('STORAGE_BACKEND', 'firestore')
+        self.sqlite_path = os.getenv('SQLITE_DB_PATH', './mtmath.sqlite3')
+        # 一括書き込みの方式（batch: 500件ごとの WriteBatch / bulk_writer: Firestore BulkWriter）
+        self.bulk_write_mode = os.getenv('BULK_WRITE_MODE', 'batch')
+
+        # 記事本文の保存形式（none / zlib）
+        self.content_compression = os.getenv('CONTENT_COMPRESSION', 'none')
+
+        # 記事本文の保存レイアウト（inline: articles に同居 / split: article_bodies に分離）
+        self.article_body_layout = os.getenv('ARTICLE_BODY_LAYOUT', 'inline')
+        self.article_bodies_collection = os.getenv('ARTICLE_BODIES_COLLECTION', 'article_bodies')
+
+        # 記事の版履歴（true なら上書き保存・削除の前の記事を article_revisions に差分で残す。
+        # 上書き・削除のたびに記事全体と版の先頭を読むため既定は無効。
+        # REVISION_KEYFRAME_INTERVAL 版ごとに本文全体を保存し、REVISION_RETENTION 版より古い版は削除する）
+        self.article_revisions = os.getenv('ARTICLE_REVISIONS', 'false').lower() == 'true'
+        self.revisions_collection = os.getenv('REVISIONS_COLLECTION', 'article_revisions')
+        self.revision_keyframe_interval = int(os.getenv('REVISION_KEYFRAME_INTERVAL', '10'))
+        self.revision_retention = int(os.getenv('REVISION_RETENTION', '20'))
+
+        # 記事数カウンター（true なら書き込み時に stats コレクションのカウンターを更新。
+        # 有効にする前に firestore_manager.rebuild_article_counters() で初期化する）
+        self.article_counters = os.getenv('ARTICLE_COUNTERS', 'false').lower() == 'true'
+        self.stats_collection = os.getenv('STATS_COLLECTION', 'stats')
+
+        # 記事の閲覧数カウンター（記事ごとに VIEW_COUNTER_SHARDS 個のシャードへ分散して加算し、
+        # python -m scripts views で articles の view_count にまとめる。assets/js/article-loader.js のシャード数と揃える。
+        # firestore.rules はシャード番号を1桁に制限するため 10 以下にする）
+        self.view_counter_shards = int(os.getenv('VIEW_COUNTER_SHARDS', '10'))
+        self.view_shards_collection = os.getenv('VIEW_SHARDS_COLLECTION', 'view_counter_shards')
+
+        # 人気記事ランキング（閲覧数の集計ごとに指数減衰スコアを更新し、feeds/trending に上位を書き込む）
+        self.trending_half_life_hours = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+        self.trending_top_k = int(os.getenv('TRENDING_TOP_K', '10'))
+        # スコアを保持する記事数の上限（stats/trending を 1 MiB のドキュメント上限に収める。超えた分はスコアの低い順に捨てる）
+        self.trending_max_tracked = int(os.getenv('TRENDING_MAX_TRACKED', '5000'))
+
+        # 記事一覧のフィード（true なら記事の書き込みと同じトランザクションで feeds/home・
+        # feeds/category_{カテゴリ} の記事カードを更新する。有効にする前に rebuild_feeds() で初期化する）
+        self.article_feeds = os.getenv('ARTICLE_FEEDS', 'false').lower() == 'true'
+        self.feeds_collection = os.getenv('FEEDS_COLLECTION', 'feeds')
+        self.feed_size = int(os.getenv('FEED_SIZE', '50'))
+
+        # 読み取りキャッシュ（最大件数 0 で無効。TTL は "article=300,list=60" の形式で種別ごとに指定）
+        # キャッシュした記事は呼び出し側と共有され、他のプロセスの書き込みは TTL まで見えないため既定は無効
+        self.read_cache_max_entries = int(os.getenv('READ_CACHE_MAX_ENTRIES', '0'))
+        self.read_cache_ttl = float(os.getenv('READ_CACHE_TTL', '60'))
+        self.read_cache_ttls = os.getenv('READ_CACHE_TTLS', '')
+
+        # Firestore のローカル SQLite ミラー（設定すると読み取り専用クエリをミラーから返す）
+        self.mirror_db_path = os.getenv('MIRROR_DB_PATH', '')
+        # ミラーの許容遅れ（秒）。最後の同期からこれを過ぎたコレクションはバックエンドから読む（0 以下で無制限）
+        self.mirror_max_age_seconds = float(os.getenv('MIRROR_MAX_AGE_SECONDS', '300'))
+
+        # 差分同期のマニフェスト（true なら書き込み時に変更を記録する。
+        # 有効にする前に python -m scripts.merkle_sync init で作成する）
+        self.sync_manifest = os.getenv('SYNC_MANIFEST', 'false').lower() == 'true'
+        self.sync_manifest_collection = os.getenv('SYNC_MANIFEST_COLLECTION', 'sync_manifests')
+        self.sync_bucket_digits = int(os.getenv('SYNC_BUCKET_DIGITS', '2'))
+        self.sync_snapshot_path = os.getenv('SYNC_SNAPSHOT_PATH', './mtmath-snapshot.sqlite3')
+
+        # ローカルキャッシュ（記事登録簿など）の保存先
+        self.cache_dir = os.getenv('MTMATH_CACHE_DIR', './.cache')
+
+        # 常駐ワーカーデーモンの Unix ソケット
+        self.daemon_socket_path = os.getenv(
+            'MTMATH_DAEMON_SOCKET',
+            os.path.join(tempfile.gettempdir(), f'mtmath-{os.getuid()}.sock'))
+
+        # トピックのリース期間（秒）。期限切れのリースは他のワーカーが取り直す
+        self.topic_lease_seconds = int(os.getenv('TOPIC_LEASE_SECONDS', '900'))
+
+        # AsyncFirestoreManager の同時実行数の上限
+        self.async_max_concurrency = int(os.getenv('ASYNC_MAX_CONCURRENCY', '16'))
+
+        # 並列ワーカーの起動方式（fork / forkserver / spawn）
+        self.worker_start_method = os.getenv('WORKER_START_METHOD', 'fork')
+
+        # クライアントは初回アクセス時に初期化する
+        self.reset_clients()
+
+    def reset_clients(self):
+        """保持しているクライアントを破棄する（次回アクセス時に現在のプロセスで再接続）"""
+        self._pid = os.getpid()
+        self._db = None
+        self._async_db = None
+        self._gemini_model = None
+        self._firebase_initialized = False
+        self._gemini_initialized = False
+
+    def _ensure_current_process(self):
+        """fork 後の子プロセスなら親から引き継いだクライアントを捨てる"""
+        if self._pid != os.getpid():
+            self.reset_clients()
+
+    @property
+    def db(self):
+        """Firestore クライアント（初回アクセス時に接続）"""
+        self._ensure_current_process()
+        if not self._firebase_initialized:
+            self._init_firebase()
+        return self._db
+
+    @db.setter
+    def db(self, value):
+        self._ensure_current_process()
+        self._db = value
+        self._firebase_initialized = True
+
+    @property
+    def async_db(self):
+        """Firestore AsyncClient（同期クライアントと同じアプリを使う。接続できなければ None）"""
+        self._ensure_current_process()
+        if self._async_db is None and self.db is not None:
+            import firebase_admin
+            from firebase_admin import firestore_async
+
+            self._async_db = firestore_async.client(firebase_admin.get_app(f"mtmath-{os.getpid()}"))
+        return self._async_db
+
+    @property
+    def gemini_model(self):
+        """Gemini モデル（初回アクセス時に接続）"""
+        self._ensure_current_process()
+        if not self._gemini_initialized:
+            self._init_gemini()
+        return self._gemini_model
+
+    @gemini_model.setter
+    def gemini_model(self, value):
+        self._ensure_current_process()
+        self._gemini_model = value
+        self._gemini_initialized = True
+
+    @staticmethod
+    def _parse_gemini_api_keys():
+        """GEMINI_API_KEYS（カンマ区切り、"ラベル:キー" 形式も可）を解析
+
+        未設定の場合は GEMINI_API_KEY の1キーのみを使う。
+        """
+        from scripts.gemini_pool import mask_api_key
+
+        raw = os.getenv('GEMINI_API_KEYS') or os.getenv('GEMINI_API_KEY') or ''
+        keys = []
+        for entry in raw.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            label, sep, api_key = entry.partition(':')
+            if not sep:
+                label, api_key = mask_api_key(entry), entry
+            keys.append((label.strip(), api_key.strip()))
+        return keys
+
     def _init_firebase(self):
         """Firebase を初期化"""
+        self._firebase_initialized = True
         try:
-            if not firebase_admin._apps:  # アプリがまだ初期化されていない場合
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            # Firestore クライアントはアプリ単位でキャッシュされるため、プロセスごとにアプリを分ける
+            app_name = f"mtmath-{os.getpid()}"
+            if app_name in firebase_admin._apps:
+                app = firebase_admin.get_app(app_name)
+            else:  # このプロセスでアプリがまだ初期化されていない場合
                 cred = credentials.Certificate(self.service_account_path)
-                firebase_admin.initialize_app(cred, {
+                app = firebase_admin.initialize_app(cred, {
                     'projectId': self.firebase_project_id
-                })
-            
-            self.db = firestore.client()
+                }, name=app_name)
+
+            self._db = firestore.client(app)
             print("✅ Firebase 接続成功")
-            
+
         except Exception as e:
             print(f"❌ Firebase 初期化エラー: {e}")
-            self.db = None
-    
+            self._db = None
+
     def _init_gemini(self):
         """Gemini AI を初期化"""
+        self._gemini_initialized = True
         try:
-            if not self.gemini_api_key:
+            if not self.gemini_api_keys:
                 raise ValueError("GEMINI_API_KEY が設定されていません")
-            
+
+            if len(self.gemini_api_keys) > 1:
+                # 複数キー: クォータを分散するプールを使う
+                from scripts.gemini_pool import GeminiModelPool
+
+                self._gemini_model = GeminiModelPool.from_api_keys(
+                    self.gemini_api_keys, self.gemini_model_name,
+                    strategy=self.gemini_pool_strategy,
+                    quarantine_seconds=self.gemini_quarantine_seconds)
+                print(f"✅ Gemini AI 接続成功 ({len(self.gemini_api_keys)}キーのプール)")
+                return
+
+            import google.generativeai as genai
+
             genai.configure(api_key=self.gemini_api_key)
-            self.gemini_model = genai.GenerativeModel('gemini-2.5-pro')
+            self._gemini_model = genai.GenerativeModel(self.gemini_model_name)
             print("✅ Gemini AI 接続成功")
-            
+
         except Exception as e:
             print(f"❌ Gemini 初期化エラー: {e}")
-            self.gemini_model = None
+            self._gemini_model = None
 
-# グローバル設定インスタンス
-config = Config()
\ No newline at end of file
+# グローバル設定インスタンス（接続は遅延される）
+config = Config()
@@ -0,0 +1,94 @@
+"""
+Mt.MATH - 記事本文の圧縮とハッシュ
+content_html を圧縮して保存し、読み込み時に透過的に復元する
+
+保存形式（CONTENT_COMPRESSION=zlib の場合）:
+    content_encoding:   "zlib"
+    content_compressed: 圧縮済み本文（bytes）
+    content_hash:       本文（UTF-8）の SHA-256
+content_html フィールドは保存しない。圧縮しない場合も content_hash は付与する。
+
+本文を article_bodies コレクションに分ける場合（ARTICLE_BODY_LAYOUT=split）は
+encode_body() / decode_body() で 1 MiB の上限を超える本文をチャンクに分割する。
+
+ブラウザ側（article-loader.js）は DecompressionStream('deflate') で復元するため、
+対応する方式は zlib のみとしている（brotli はブラウザの DecompressionStream で扱えない）。
+"""
+
+import hashlib
+import zlib
+from typing import Any, Dict, List
+
+ENCODING_NONE = "none"
+ENCODING_ZLIB = "zlib"
+SUPPORTED_ENCODINGS = (ENCODING_NONE, ENCODING_ZLIB)
+
+# 圧縮レベル（日本語HTMLでは 6 以上で差がほとんど出ない）
+ZLIB_LEVEL = 6
+
+def content_hash(content_html: str) -> str:
+    """本文の SHA-256（変更検知用）"""
+    return hashlib.sha256(content_html.encode('utf-8')).hexdigest()
+
+def encode_content(content_html: str, encoding: str = ENCODING_NONE) -> Dict[str, Any]:
+    """本文を保存用フィールドに変換"""
+    fields = {"content_hash": content_hash(content_html)}
+    if encoding == ENCODING_NONE:
+        fields["content_html"] = content_html
+    elif encoding == ENCODING_ZLIB:
+        fields["content_encoding"] = ENCODING_ZLIB
+        fields["content_compressed"] = zlib.compress(content_html.encode('utf-8'), ZLIB_LEVEL)
+    else:
+        raise ValueError(f"未対応の圧縮方式です: {encoding} (対応: {', '.join(SUPPORTED_ENCODINGS)})")
+    return fields
+
+def decode_content(data: Dict[str, Any]) -> Dict[str, Any]:
+    """圧縮された本文を content_html に戻す（data をその場で書き換えて返す）"""
+    encoding = data.pop("content_encoding", ENCODING_NONE)
+    compressed = data.pop("content_compressed", None)
+    if encoding == ENCODING_ZLIB and compressed is not None:
+        data["content_html"] = zlib.decompress(bytes(compressed)).decode('utf-8')
+    elif encoding != ENCODING_NONE:
+        raise ValueError(f"未対応の圧縮方式です: {encoding}")
+    return data
+
+# === 本文ドキュメントの分割 ===
+
+# Firestore の1ドキュメント上限（1 MiB）に余裕を持たせたチャンクサイズ
+MAX_CHUNK_BYTES = 900 * 1024
+
+def encode_body(content_html: str, encoding: str = ENCODING_NONE,
+                max_chunk_bytes: int = MAX_CHUNK_BYTES) -> List[Dict[str, Any]]:
+    """本文を article_bodies 用のドキュメント列に変換
+
+    上限に収まる場合は encode_content() と同じフィールドの1ドキュメント。
+    収まらない場合は (圧縮済みまたは UTF-8 の) バイト列を content_chunk に分割し、
+    先頭ドキュメントに content_encoding と chunk_count を記録する。
+    """
+    fields = encode_content(content_html, encoding)
+    payload = fields.get("content_compressed")
+    if payload is None:
+        payload = content_html.encode('utf-8')
+    if len(payload) <= max_chunk_bytes:
+        fields["chunk_count"] = 1
+        return [fields]
+
+    chunks = [payload[i:i + max_chunk_bytes] for i in range(0, len(payload), max_chunk_bytes)]
+    head = {
+        "content_hash": fields["content_hash"],
+        "content_encoding": encoding,
+        "chunk_count": len(chunks),
+        "content_chunk": chunks[0],
+    }
+    return [head] + [{"content_chunk": chunk} for chunk in chunks[1:]]
+
+def decode_body(docs: List[Dict[str, Any]]) -> str:
+    """encode_body() のドキュメント列から本文を復元"""
+    head = docs[0]
+    if head.get("chunk_count", 1) <= 1:
+        return decode_content(dict(head)).get("content_html", "")
+
+    payload = b"".join(bytes(doc["content_chunk"]) for doc in docs)
+    if head.get("content_encoding") == ENCODING_ZLIB:
+        payload = zlib.decompress(payload)
+    return payload.decode('utf-8')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - 記事コーパスの集計レポート
+articles コレクションを ArticleFrame に読み込み、カテゴリ・状態別の件数、難易度とニッチ度の分布、
+カテゴリ別の平均値、よく使われるタグを表示する（本文は読まない）
+
+使い方:
+    python -m scripts.corpus_report                       # 全記事
+    python -m scripts.corpus_report --status published    # 公開済みのみ
+    python -m scripts.corpus_report --category algebra --tag 群論
+"""
+
+import argparse
+import logging
+from typing import Any, Dict
+
+from scripts.article_frame import ArticleFrame
+from scripts.data_models import CATEGORY_MAP
+from scripts.firestore_manager import firestore_manager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def build_report(frame: ArticleFrame, top_tags: int = 10) -> Dict[str, Any]:
+    """フレームから集計結果を作る"""
+    difficulty_counts, _ = frame.histogram("difficulty_level", bins=10, range=(0.5, 10.5))
+    niche_counts, _ = frame.histogram("niche_score", bins=10, range=(0.5, 10.5))
+    return {
+        "total": len(frame),
+        "status": frame.value_counts("status"),
+        "categories": frame.value_counts("category"),
+        "difficulty": {level: int(n) for level, n in enumerate(difficulty_counts, start=1)},
+        "niche": {level: int(n) for level, n in enumerate(niche_counts, start=1)},
+        "mean_difficulty": frame.group_by("category", "difficulty_level"),
+        "mean_niche": frame.group_by("category", "niche_score"),
+        "tags": frame.tag_counts(top_tags),
+    }
+
+def _bar(count: int, largest: int, width: int = 30) -> str:
+    return "█" * (round(count / largest * width) if largest else 0)
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n📊 記事数: {report['total']}")
+    print(f"  状態別: " + ", ".join(f"{s or '(未設定)'} {n}" for s, n in report["status"].items()))
+
+    print("\n📚 カテゴリ別（件数 / 平均難易度 / 平均ニッチ度）:")
+    for category, count in sorted(report["categories"].items(), key=lambda item: -item[1]):
+        name = CATEGORY_MAP.get(category, category or "(未設定)")
+        print(f"  • {name:<10} {count:>5}  "
+              f"{report['mean_difficulty'][category]:>4.1f}  {report['mean_niche'][category]:>4.1f}")
+
+    for key, title in (("difficulty", "難易度"), ("niche", "ニッチ度")):
+        largest = max(report[key].values(), default=0)
+        print(f"\n📈 {title}の分布:")
+        for level, count in report[key].items():
+            print(f"  {level:>2} | {_bar(count, largest)} {count}")
+
+    if report["tags"]:
+        print("\n🏷️  よく使われるタグ:")
+        for tag, count in report["tags"].items():
+            print(f"  • {tag} ({count})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH 記事コーパスの集計レポート')
+    parser.add_argument('--status', help='記事の状態で絞り込む（例: published）')
+    parser.add_argument('--category', choices=list(CATEGORY_MAP.keys()), help='カテゴリで絞り込む')
+    parser.add_argument('--tag', help='タグで絞り込む')
+    parser.add_argument('--top-tags', type=int, default=10, help='表示するタグの数（デフォルト: 10）')
+    args = parser.parse_args(argv)
+
+    if not firestore_manager.backend:
+        print("❌ ストレージに接続できません")
+        return False
+
+    print("🔍 Mt.MATH 記事コーパスの集計")
+    print("=" * 60)
+    # 状態はクエリで、カテゴリとタグは読み込んだフレーム上で絞り込む
+    filters = [("status", "==", args.status)] if args.status else []
+    frame = ArticleFrame.load(firestore_manager, filters).where(category=args.category, tag=args.tag)
+    print_report(build_report(frame, args.top_tags))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Mt.MATH - 常駐ワーカーデーモン
+Firestore / Gemini クライアントとトピック登録簿を温めたまま常駐し、
+Unix ソケット経由で受け取ったジョブ（統合CLIのサブコマンド）を実行する
+
+プロトコル（1行1JSON）:
+    クライアント → {"command": "batch", "args": ["--count", "3"], "cwd": "...", "env": {...}}
+    デーモン     → {"output": "..."} を複数回, 最後に {"exit_code": 0}
+                   （作業ディレクトリか環境変数がデーモンと異なる場合は {"refused": "理由"}）
+
+起動:
+    python -m scripts daemon
+以後 `python -m scripts --daemon <コマンド>` でジョブをデーモンへ委譲できる。
+ジョブはデーモンの作業ディレクトリと環境変数で実行されるため、呼び出し側と一致しない場合は
+デーモンが実行を拒否し、CLI は現在のプロセスで実行する。標準入力を読むジョブは失敗させる。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+class DaemonUnavailable(ConnectionError):
+    """デーモンに接続できない"""
+
+class DaemonRefused(DaemonUnavailable):
+    """デーモンがジョブの実行を拒否した（作業ディレクトリや環境変数が異なる）"""
+
+# シェルが自動で書き換える変数は環境の比較から除く
+_SHELL_ENV = frozenset({"PWD", "OLDPWD", "SHLVL", "_"})
+
+def job_environment() -> dict:
+    """ジョブの実行に影響する環境変数（.env の読み込みと設定の既定値を反映した後のもの）"""
+    import scripts.config  # noqa: F401  .env を読み込む
+    return {k: v for k, v in os.environ.items() if k not in _SHELL_ENV}
+
+def _default_socket_path() -> str:
+    from scripts.config import config
+    return config.daemon_socket_path
+
+# === クライアント ===
+
+def submit_job(command: str, args: List[str] = (), socket_path: str = None,
+               stream=None, cwd: str = None, env: dict = None) -> int:
+    """デーモンにジョブを送り、出力を stream に書き出して終了コードを返す
+
+    cwd / env を省略すると現在のプロセスのものを送る。デーモン側と一致しなければ
+    DaemonRefused を送出する。
+    """
+    socket_path = socket_path or _default_socket_path()
+    stream = stream or sys.stdout
+    cwd = cwd or os.getcwd()
+    env = job_environment() if env is None else env
+
+    if not os.path.exists(socket_path):
+        raise DaemonUnavailable(socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(socket_path) from e
+
+    with sock, sock.makefile('rwb') as conn:
+        request = {"command": command, "args": list(args), "cwd": cwd, "env": env}
+        conn.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b"\n")
+        conn.flush()
+
+        for line in conn:
+            message = json.loads(line)
+            if "refused" in message:
+                raise DaemonRefused(message["refused"])
+            if "output" in message:
+                stream.write(message["output"])
+                stream.flush()
+            if "exit_code" in message:
+                return message["exit_code"]
+
+    print("❌ デーモンとの接続が途中で切断されました", file=sys.stderr)
+    return 1
+
+# === サーバー ===
+
+class _SocketWriter:
+    """ジョブの標準出力をクライアントへ逐次転送するファイル風オブジェクト"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def write(self, text: str) -> int:
+        if text:
+            payload = json.dumps({"output": text}, ensure_ascii=False)
+            self._conn.write(payload.encode('utf-8') + b"\n")
+            self._conn.flush()
+        return len(text)
+
+    def flush(self):
+        pass
+
+class _NoStdin(io.TextIOBase):
+    """デーモンのジョブに渡す標準入力（読もうとするとジョブを失敗させる）"""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        raise OSError("デーモンのジョブは標準入力を読めません（--daemon を付けずに実行してください）")
+
+    readline = read
+
+@contextlib.contextmanager
+def _redirect_stdin(stream):
+    saved, sys.stdin = sys.stdin, stream
+    try:
+        yield
+    finally:
+        sys.stdin = saved
+
+class _JobHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            args = [str(a) for a in request.get("args", [])]
+            cwd = request.get("cwd")
+            env = request.get("env")
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply({"output": f"❌ 不正なリクエストです: {e}\n", "exit_code": 2})
+            return
+
+        if command not in ("ping", "shutdown"):
+            reason = self.server.daemon.mismatch(cwd, env)
+            if reason:
+                self._reply({"refused": reason})
+                return
+
+        exit_code = self.server.daemon.run_job(command, args, _SocketWriter(self.wfile))
+        self._reply({"exit_code": exit_code})
+
+    def _reply(self, message: dict):
+        try:
+            self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+        except BrokenPipeError:
+            pass
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class WorkerDaemon:
+    """温めたクライアントを保持してジョブを実行するデーモン"""
+
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or _default_socket_path()
+        self.started_at = time.time()
+        self.jobs_run = 0
+        # 標準出力の差し替えはプロセス全体に効くため、ジョブは1つずつ実行する
+        self._job_lock = threading.Lock()
+        self._server: Optional[_ThreadingUnixServer] = None
+
+    def mismatch(self, cwd: Optional[str], env: Optional[dict]) -> Optional[str]:
+        """呼び出し側の作業ディレクトリ・環境変数がデーモンと異なれば、その理由を返す"""
+        if cwd != os.getcwd():
+            return f"作業ディレクトリが異なります（デーモン: {os.getcwd()}）"
+        if not isinstance(env, dict):
+            return "環境変数が送られていません"
+        ours = job_environment()
+        differing = sorted(k for k in set(env) | set(ours) if env.get(k) != ours.get(k))
+        if differing:
+            return f"環境変数が異なります: {', '.join(differing[:5])}"
+        return None
+
+    def warm_up(self):
+        """クライアントとトピック登録簿を事前に初期化"""
+        from scripts.config import config
+        from scripts.firestore_manager import firestore_manager
+
+        started = time.perf_counter()
+        firestore_manager.backend
+        config.gemini_model
+        try:
+            # generated_topics.json を読み込みキャッシュに載せる
+            from scripts.topic_selector import TopicSelector
+            TopicSelector()
+        except Exception as e:
+            logger.warning(f"トピック登録簿の事前読み込みをスキップしました: {e}")
+        logger.info(f"ウォームアップ完了 ({time.perf_counter() - started:.2f}秒)")
+
+    def run_job(self, command: str, args: List[str], output) -> int:
+        """1件のジョブを実行し、終了コードを返す"""
+        from scripts.cli import COMMANDS, run_command
+
+        if command == "ping":
+            output.write(f"pong (pid={os.getpid()}, jobs={self.jobs_run}, "
+                         f"uptime={time.time() - self.started_at:.0f}s)\n")
+            return 0
+        if command == "shutdown":
+            output.write("👋 デーモンを停止します\n")
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return 0
+        if command not in COMMANDS or not COMMANDS[command].daemon_ok:
+            output.write(f"❌ デーモンで実行できないコマンドです: {command}\n")
+            return 2
+
+        with self._job_lock:
+            self.jobs_run += 1
+            logger.info(f"ジョブ開始: {command} {' '.join(args)}")
+            handler = logging.StreamHandler(output)
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            root = logging.getLogger()
+            root.addHandler(handler)
+            try:
+                with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output), \
+                        _redirect_stdin(_NoStdin()):
+                    exit_code = run_command(command, args)
+            except Exception as e:
+                output.write(f"❌ ジョブ実行エラー: {e}\n")
+                exit_code = 1
+            finally:
+                root.removeHandler(handler)
+            logger.info(f"ジョブ終了: {command} (exit={exit_code})")
+            return exit_code
+
+    def serve_forever(self):
+        """ソケットを開いてジョブを待ち受ける"""
+        if os.path.exists(self.socket_path):
+            try:
+                submit_job("ping", socket_path=self.socket_path, stream=io.StringIO())
+                raise RuntimeError(f"デーモンは既に起動しています: {self.socket_path}")
+            except DaemonUnavailable:
+                os.unlink(self.socket_path)  # 前回の残骸
+
+        self._server = _ThreadingUnixServer(self.socket_path, _JobHandler)
+        self._server.daemon = self
+        os.chmod(self.socket_path, 0o600)
+        print(f"🚀 Mt.MATH デーモン起動: {self.socket_path} (pid={os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            print("🛑 デーモンを停止しました")
+
+def main(argv=None):
+    """メイン実行関数"""
+
+    parser = argparse.ArgumentParser(description='Mt.MATH 常駐ワーカーデーモン')
+    parser.add_argument('--socket', default=None,
+                       help='待ち受ける Unix ソケットパス (既定: MTMATH_DAEMON_SOCKET)')
+    parser.add_argument('--no-warm-up', action='store_true',
+                       help='起動時のクライアント初期化を行わない')
+    parser.add_argument('--status', action='store_true',
+                       help='起動中のデーモンの状態を表示する')
+    parser.add_argument('--stop', action='store_true',
+                       help='起動中のデーモンを停止する')
+
+    args = parser.parse_args(argv)
+
+    if args.status or args.stop:
+        try:
+            sys.exit(submit_job("shutdown" if args.stop else "ping", socket_path=args.socket))
+        except DaemonUnavailable:
+            print("⚠️  デーモンは起動していません")
+            sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    daemon = WorkerDaemon(args.socket)
+    if not args.no_warm_up:
+        daemon.warm_up()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,33 @@
 """
 Mt.MATH - データモデル定義
 Firestore用の記事データ構造を定義
+
+モデルは __slots__ 付きの dataclass。to_dict() はフィールドを deepcopy しない浅い変換で、
+from_dict() は未知のキーを無視して復元する（未知のキーがある場合は __init__ を経由しない）。
 """
 
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from dataclasses import dataclass
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime
 import re
 
-@dataclass
+_MISSING = object()
+
+def _decode(cls, data: Dict[str, Any], required: Tuple[str, ...],
+            optional: Tuple[Tuple[str, Any], ...]):
+    """辞書からモデルを復元（未知のキーは無視、欠けた任意フィールドは既定値）"""
+    obj = object.__new__(cls)
+    try:
+        for name in required:
+            setattr(obj, name, data[name])
+    except KeyError as e:
+        raise TypeError(f"{cls.__name__}: 必須フィールド {e} がありません") from None
+    for name, default in optional:
+        value = data.get(name, _MISSING)
+        setattr(obj, name, default if value is _MISSING else value)
+    return obj
+
+@dataclass(slots=True)
 class MathArticle:
     """数学記事のデータモデル（簡素化版）"""
     
@@ -53,21 +72,49 @@ class MathArticle:
         return slug.strip('-')
     
     def to_dict(self) -> Dict:
-        """Firestore保存用の辞書形式に変換"""
-        data = asdict(self)
-        # datetimeをtimestampに変換
-        if self.created_at:
-            data['created_at'] = self.created_at
-        if self.updated_at:
-            data['updated_at'] = self.updated_at
-        return data
+        """Firestore保存用の辞書形式に変換（リスト・本文はコピーせず参照を渡す）"""
+        return {
+            'title': self.title,
+            'slug': self.slug,
+            'category': self.category,
+            'content_html': self.content_html,
+            'summary': self.summary,
+            'difficulty_level': self.difficulty_level,
+            'niche_score': self.niche_score,
+            'tags': self.tags,
+            'meta_description': self.meta_description,
+            'related_topics': self.related_topics,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'author': self.author,
+            'status': self.status,
+            'view_count': self.view_count,
+        }
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'MathArticle':
-        """Firestoreデータから記事オブジェクトを作成"""
-        return cls(**data)
+        """Firestoreデータから記事オブジェクトを作成（未知のキーは無視）"""
+        if _ARTICLE_FIELDS.issuperset(data):
+            return cls(**data)
+        article = _decode(cls, data, _ARTICLE_REQUIRED, _ARTICLE_OPTIONAL)
+        if article.related_topics is None:
+            article.related_topics = []
+        if article.created_at is None or article.updated_at is None:
+            now = datetime.now()
+            article.created_at = article.created_at or now
+            article.updated_at = article.updated_at or now
+        if not article.slug:
+            article.slug = cls.generate_slug(article.title)
+        return article
 
-@dataclass  
+_ARTICLE_REQUIRED = ('title', 'slug', 'category', 'content_html', 'summary',
+                     'difficulty_level', 'niche_score', 'tags')
+_ARTICLE_OPTIONAL = (('meta_description', ""), ('related_topics', None),
+                     ('created_at', None), ('updated_at', None),
+                     ('author', "Mt.MATH AI"), ('status', "draft"), ('view_count', 0))
+_ARTICLE_FIELDS = frozenset(_ARTICLE_REQUIRED) | {name for name, _ in _ARTICLE_OPTIONAL}
+
+@dataclass(slots=True)
 class MathTopic:
     """数学トピック（記事生成用）のデータモデル - 拡張版"""
     
@@ -95,16 +142,38 @@ class MathTopic:
             self.created_at = datetime.now()
     
     def to_dict(self) -> Dict:
-        """Firestore保存用の辞書形式に変換"""
-        data = asdict(self)
-        if self.created_at:
-            data['created_at'] = self.created_at
-        return data
+        """Firestore保存用の辞書形式に変換（リストはコピーせず参照を渡す）"""
+        return {
+            'name': self.name,
+            'category': self.category,
+            'description': self.description,
+            'title': self.title,
+            'summary': self.summary,
+            'difficulty_level': self.difficulty_level,
+            'niche_score': self.niche_score,
+            'tags': self.tags,
+            'article_generated': self.article_generated,
+            'article_slug': self.article_slug,
+            'topic_id': self.topic_id,
+            'priority': self.priority,
+            'created_at': self.created_at,
+        }
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'MathTopic':
-        """Firestoreデータからトピックオブジェクトを作成"""
-        return cls(**data)
+        """Firestoreデータからトピックオブジェクトを作成（未知のキーは無視）"""
+        if _TOPIC_FIELDS.issuperset(data):
+            return cls(**data)
+        topic = _decode(cls, data, _TOPIC_REQUIRED, _TOPIC_OPTIONAL)
+        if topic.created_at is None:
+            topic.created_at = datetime.now()
+        return topic
+
+_TOPIC_REQUIRED = ('name', 'category', 'description', 'title', 'summary',
+                   'difficulty_level', 'niche_score', 'tags')
+_TOPIC_OPTIONAL = (('article_generated', False), ('article_slug', None), ('topic_id', None),
+                   ('priority', 5), ('created_at', None))
+_TOPIC_FIELDS = frozenset(_TOPIC_REQUIRED) | {name for name, _ in _TOPIC_OPTIONAL}
 
 # カテゴリマッピング（幾何学除外）
 CATEGORY_MAP = {
@@ -30,7 +30,7 @@ def debug_topic_parameter():
                 doc = docs[0]
                 data = doc.to_dict()
                 data['topic_id'] = doc.id
-                topic = MathTopic(**data)
+                topic = MathTopic.from_dict(data)
                 topics = [topic]
             else:
                 print("❌ テスト可能なトピックが見つかりません")
@@ -1,215 +1,1294 @@
 """
 Mt.MATH - Firestore管理モジュール
 記事とトピックのCRUD操作を管理
+
+実際の読み書きは scripts.storage_backends のバックエンドに委譲する。
+環境変数 STORAGE_BACKEND=memory / sqlite でオフライン実行できる。
+記事・トピックの読み取り結果は scripts.read_cache でプロセス内にキャッシュし、書き込み時に無効化する。
+MIRROR_DB_PATH を設定すると、一覧・検索・統計などの読み取り専用クエリは
+scripts.firestore_mirror のローカル SQLite ミラーから返す。
+SYNC_MANIFEST=true の場合、記事・トピックの書き込みを scripts.merkle_sync のマニフェストに記録する。
+閲覧数は記事ごとに複数のシャードへ分散して加算し（record_view）、rollup_view_counts() で
+articles の view_count にまとめる（1ドキュメントへの書き込み集中を避ける）。
+上書き保存・削除の前の記事は scripts.article_revisions の形式で版として残す（ARTICLE_REVISIONS）。
+ARTICLE_FEEDS=true の場合、記事の書き込みと同じトランザクションで一覧用のフィード
+（feeds/home、feeds/category_{カテゴリ}）の記事カードを更新し、一覧は1ドキュメントの読み取りで返す。
+
+ARTICLE_BODY_LAYOUT=split の場合、記事のメタデータは articles/{slug}、
+本文は article_bodies/{slug}（大きな本文は article_bodies/{slug}/chunks/{n}）に分けて保存する。
 """
 
-from typing import List, Optional, Dict, Any
-from google.cloud.firestore_v1.base_query import FieldFilter
-from google.cloud import firestore
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Callable, Generator, Hashable, Iterable, Iterator, NamedTuple, Tuple
+from datetime import datetime, timedelta, timezone
+import atexit
 import logging
+import os
+import random
+import socket
 
 from scripts.config import config
-from scripts.data_models import MathArticle, MathTopic
+from scripts.data_models import MathArticle, MathTopic, CATEGORY_MAP
+from scripts.article_registry import ArticleRegistry, registry_cache_path
+from scripts.search_index import SearchIndex, search_index_path
+from scripts.read_cache import ReadCache, MISS
+from scripts.firestore_mirror import mirror_fresh, mirror_synced_at, open_mirror
+from scripts.merkle_sync import manifest_ops
+from scripts.content_codec import encode_content, decode_content, encode_body, decode_body, content_hash
+from scripts.article_revisions import REVISION_KEYFRAME, encode_revision, decode_revision
+from scripts.storage_backends import (
+    StorageBackend, Transaction, WriteOp, Read, Plan, DocumentExistsError, DocumentRecord, Filter, OrderBy,
+    create_backend, grouped_write, DESCENDING, DEFAULT_PAGE_SIZE, MAX_BATCH_SIZE, BULK_MODE_BULK_WRITER,
+)
 
 logger = logging.getLogger(__name__)
 
+# 記事本文の保存レイアウト
+BODY_LAYOUT_INLINE = "inline"
+BODY_LAYOUT_SPLIT = "split"
+
+# 記事数カウンターのドキュメントID（stats/{ARTICLE_COUNTER_DOC}、フィールドは "{status}/{category}"）
+ARTICLE_COUNTER_DOC = "articles"
+
+# 人気記事ランキングに未反映の閲覧数の増分（stats/{TRENDING_PENDING_DOC}、フィールドはスラッグ）
+TRENDING_PENDING_DOC = "trending_pending"
+
+# 一覧表示に必要な記事フィールド（本文を含まない）
+ARTICLE_LIST_FIELDS = ("title", "slug", "category", "summary", "difficulty_level", "niche_score",
+                       "tags", "meta_description", "created_at", "updated_at", "author", "status",
+                       "view_count", "content_length")
+
+# 記事一覧フィードのドキュメントID（ホーム）とカードに含めるフィールド
+FEED_HOME = "home"
+FEED_CARD_FIELDS = ("slug", "title", "summary", "category", "difficulty_level", "niche_score",
+                    "tags", "created_at")
+
+def feed_id(category: str = None) -> str:
+    """フィードのドキュメントID（category を省略するとホーム）"""
+    return f"category_{category}" if category else FEED_HOME
+
+def _card_time(card: Dict[str, Any]) -> datetime:
+    """カードの並び順に使う作成日時（naive な日時は UTC とみなす）"""
+    value = card.get("created_at")
+    if not isinstance(value, datetime):
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+# トピックのリース情報（クレーム時に設定し、生成済みにするときに消す）
+LEASE_FIELDS = ("lease_owner", "lease_expires_at")
+
+def default_worker_id() -> str:
+    """ワーカーID（ホスト名とプロセスID）"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def _lease_available(data: Dict[str, Any], now: datetime) -> bool:
+    """リースされていない、またはリースが期限切れか"""
+    expires_at = data.get("lease_expires_at")
+    return not data.get("lease_owner") or expires_at is None or expires_at <= now
+
+def _parse_counts(data: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """カウンタードキュメント（"{status}/{category}": 件数）を {status: {category: 件数}} に変換"""
+    counts: Dict[str, Dict[str, int]] = {}
+    for key, value in data.items():
+        status, _, category = key.partition("/")
+        if value:
+            counts.setdefault(status, {})[category] = value
+    return counts
+
+class BulkResult(NamedTuple):
+    """一括保存の1件ごとの結果"""
+    id: str                      # 記事スラッグまたはトピックID
+    error: Optional[str] = None  # None なら成功
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class CachedRead(NamedTuple):
+    """キャッシュする読み取り（キャッシュのキー・種別・無効化タグと読み取り計画）"""
+    key: Hashable
+    kind: str
+    tags: List[str]
+    make_plan: Callable[[], Generator]
+
 class FirestoreManager:
     """Firestore データベース管理クラス"""
-    
-    def __init__(self):
-        self.db = config.db
+
+    def __init__(self, backend: StorageBackend = None, mirror: StorageBackend = None):
         self.articles_collection = config.articles_collection
         self.topics_collection = config.math_topics_collection
-    
+        self.bodies_collection = config.article_bodies_collection
+        self.body_layout = config.article_body_layout
+        self.stats_collection = config.stats_collection
+        self.counters_enabled = config.article_counters
+        self.sync_manifest = config.sync_manifest
+        self.feeds_enabled = config.article_feeds
+        self.feeds_collection = config.feeds_collection
+        self.feed_size = config.feed_size
+        self.view_counter_shards = config.view_counter_shards
+        self.view_shards_collection = config.view_shards_collection
+        self.revisions_enabled = config.article_revisions
+        self.revisions_collection = config.revisions_collection
+        self.revision_keyframe_interval = config.revision_keyframe_interval
+        self.revision_retention = config.revision_retention
+        self._backend = backend
+        # 自前で生成したバックエンドは fork 後の子プロセスで作り直す
+        self._owns_backend = backend is None
+        self._backend_pid = os.getpid()
+        self._registry: Optional[ArticleRegistry] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._search_index_backend = None
+        self.cache = ReadCache.from_config()
+        self._mirror = mirror
+        self._owns_mirror = mirror is None
+        self._mirror_pid = None if mirror is None else os.getpid()
+        self._mirror_synced: Dict[str, Any] = {}
+
+    @property
+    def backend(self) -> Optional[StorageBackend]:
+        """ストレージバックエンド（初回アクセス時、および fork 後の初回アクセス時に生成）"""
+        if self._owns_backend and self._backend_pid != os.getpid():
+            self._backend = None
+            self._backend_pid = os.getpid()
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    @property
+    def mirror(self) -> Optional[StorageBackend]:
+        """読み取り専用クエリに使うローカルミラー（MIRROR_DB_PATH 未設定なら None）"""
+        if self._owns_mirror and self._mirror_pid != os.getpid():
+            self._mirror = open_mirror()
+            self._mirror_pid = os.getpid()
+            self._mirror_synced = {}
+        return self._mirror
+
+    def _reader(self, collection: str) -> Optional[StorageBackend]:
+        """読み取り専用クエリの読み先（初回読み込み済みのミラー、無ければバックエンド）"""
+        return self.mirror if self._use_mirror(collection) else self.backend
+
+    def _use_mirror(self, collection: str) -> bool:
+        """読み取り専用クエリをミラーから読めるか（ミラーが MIRROR_MAX_AGE_SECONDS 以内に同期されているか）
+
+        前回読んだ同期日時が古くなるまではミラーの同期状態を読み直さない。
+        """
+        mirror = self.mirror
+        if mirror is None:
+            return False
+        if mirror_fresh(self._mirror_synced.get(collection)):
+            return True
+        synced_at = mirror_synced_at(mirror, collection)
+        if not mirror_fresh(synced_at):
+            if self._mirror_synced.pop(collection, None) is not None:
+                logger.warning(f"ミラーの同期が止まっているためバックエンドから読みます: {collection} "
+                               f"(最終同期: {synced_at})")
+            return False
+        self._mirror_synced[collection] = synced_at
+        return True
+
+    def _read(self, plan: Generator[Any, Any, Any]) -> Any:
+        """読み取り計画を実行して戻り値を返す
+
+        読み取り計画は Read（またはその並列に読めるリスト）を yield して結果を受け取るジェネレーター。
+        同じ計画を AsyncFirestoreManager が非同期バックエンドで実行する。
+        """
+        def fetch(read: Read):
+            return getattr(self.mirror if read.mirror else self.backend, read.method)(*read.args)
+
+        try:
+            request = next(plan)
+            while True:
+                result = [fetch(read) for read in request] if isinstance(request, list) else fetch(request)
+                request = plan.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    @property
+    def registry(self) -> ArticleRegistry:
+        """記事スラッグ/タイトル登録簿（現在のバックエンドに対して遅延構築）"""
+        backend = self.backend
+        if self._registry is None or self._registry.backend is not backend:
+            self._registry = ArticleRegistry(
+                backend, self.articles_collection,
+                cache_path=registry_cache_path(config.cache_dir, backend, self.articles_collection))
+            atexit.register(self._registry.save_cache)
+        return self._registry
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """記事の全文検索インデックス（現在のバックエンドに対して遅延構築）"""
+        backend = self.backend
+        if self._search_index is None or self._search_index_backend is not backend:
+            self._search_index = SearchIndex(
+                search_index_path(config.cache_dir, backend, self.articles_collection))
+            self._search_index_backend = backend
+            atexit.register(self._search_index.save)
+        return self._search_index
+
+    def _scan_articles(self, since: Optional[datetime] = None) -> Iterator[MathArticle]:
+        """since より後に更新された記事（本文を含む）を1ページずつ読み込んで返す"""
+        filters = [("updated_at", ">", since)] if since is not None else []
+        page: List[DocumentRecord] = []
+        for doc in self.backend.paginate(self.articles_collection, filters=filters):
+            page.append(doc)
+            if len(page) >= DEFAULT_PAGE_SIZE:
+                yield from self._articles_from_records(page)
+                page = []
+        yield from self._articles_from_records(page)
+
+    def _articles_from_records(self, docs: List[DocumentRecord]) -> List[MathArticle]:
+        return self._read(self._records_steps(docs, True))
+
+    @property
+    def db(self):
+        """Firestore クライアント（初回アクセス時に接続）"""
+        return config.db
+
     # === 記事管理 ===
-    
+
     def save_article(self, article: MathArticle, allow_overwrite: bool = False) -> str:
         """記事をFirestoreに保存"""
         try:
-            # 重複チェック
-            if not allow_overwrite:
-                existing = self.get_article(article.slug)
-                if existing:
-                    raise ValueError(f"記事が既に存在します: {article.slug} (タイトル: {existing.title})")
-            
-            article.updated_at = datetime.now()
-            doc_ref = self.db.collection(self.articles_collection).document(article.slug)
-            doc_ref.set(article.to_dict())
-            
+            self._write_article(article, allow_overwrite)
             logger.info(f"記事を保存しました: {article.title}")
             return article.slug
-            
+
+        except DocumentExistsError as e:
+            logger.error(f"記事保存エラー: 記事が既に存在します: {article.slug}")
+            raise ValueError(f"記事が既に存在します: {article.slug}") from e
         except Exception as e:
             logger.error(f"記事保存エラー: {e}")
             raise
-    
+
+    def publish_generated_article(self, article: MathArticle, topic_id: Optional[str],
+                                  allow_overwrite: bool = False) -> str:
+        """生成した記事の保存とトピックの生成済みマークを1回のバッチで書き込む
+
+        記事は作成の前提条件付きで書き込み、既に存在すれば何も書き込まずに
+        DocumentExistsError を送出する（事前の存在確認の読み取りは行わない）。
+        topic_id が None の場合は記事のみを保存する。
+        """
+        extra = []
+        if topic_id:
+            extra.append(WriteOp("update", self.topics_collection, topic_id,
+                                 {"article_generated": True, "article_slug": article.slug,
+                                  "lease_owner": None, "lease_expires_at": None}))
+        try:
+            self._write_article(article, allow_overwrite, extra)
+            if topic_id:
+                self.cache.invalidate(f"topic:{topic_id}")
+
+            logger.info(f"記事を公開しトピックを生成済みにしました: {article.title} (トピック ID: {topic_id})")
+            return article.slug
+
+        except DocumentExistsError:
+            logger.error(f"記事が既に存在します: {article.slug}")
+            raise
+        except Exception as e:
+            logger.error(f"記事公開エラー: {e}")
+            raise
+
+    def _write_article(self, article: MathArticle, allow_overwrite: bool, extra: Iterable[WriteOp] = ()):
+        """記事（と extra の書き込み）をアトミックに保存（save_article / publish_generated_article 共通）
+
+        上書きしない場合と、登録簿が「存在しない」と判定した場合は存在確認を読まずに
+        作成の前提条件で書き込む。既に存在すれば DocumentExistsError を送出するが、
+        上書きを許可していれば登録簿が古かったものとして、既存の記事を読んで上書きし直す。
+        """
+        may_exist = self._slug_may_exist(article.slug)
+        extra = list(extra)
+        try:
+            refill = self.backend.run_plan(
+                lambda: self._save_plan(article, allow_overwrite and may_exist, extra))
+        except DocumentExistsError:
+            if not allow_overwrite or may_exist:
+                raise
+            logger.warning(f"記事登録簿に無い記事が既に存在します（読み直して上書きします）: {article.slug}")
+            refill = self.backend.run_plan(lambda: self._save_plan(article, True, extra))
+        self._article_saved(article, refill)
+
+    def _article_saved(self, article: MathArticle, refill: List[str]):
+        """記事の保存後の処理（フィードの補充・キャッシュの無効化・登録簿と検索インデックスへの反映）"""
+        self._refill_feeds(refill)
+        self._invalidate_articles(article.slug)
+        self.registry.add(article.slug, article.title, article.category, article.updated_at)
+        self.search_index.add(article)
+
+    def _save_plan(self, article: MathArticle, overwrite: bool, extra: List[WriteOp]) -> Plan:
+        """記事の保存の書き込み計画（補充が必要なフィードのIDを返す）
+
+        overwrite=False なら作成の前提条件で書き込む。True なら同じトランザクションで既存の記事を読み、
+        集計済みの view_count を引き継ぐ（閲覧数の集計と競合しても失われない）。
+        読んだ記事はカウンターの増減とフィードの差し替えにも使う。
+        """
+        previous = None
+        if overwrite:
+            # 版を残す場合は置き換える記事全体を読む
+            fields = None if self.revisions_enabled else ["status", "category", "view_count"]
+            previous = yield Read("get", (self.articles_collection, article.slug, fields))
+        article.updated_at = datetime.now()
+        ops = []
+        if previous is not None:
+            article.view_count = previous.get("view_count") or 0
+            ops += yield from self._revision_steps(article.slug, previous, article)
+        writes = [WriteOp("set", collection, doc_id, data)
+                  for collection, doc_id, data in self._article_writes(article)]
+        if previous is None:
+            writes[-1] = writes[-1]._replace(kind="create")
+        ops += writes + extra
+        ops += self._counter_ops(self._counter_deltas(previous, article))
+        return (yield from self._commit_steps(ops, {article.slug: article}, {article.slug: previous}))
+
+    def save_articles_bulk(self, articles: Iterable[MathArticle], allow_overwrite: bool = False,
+                           mode: str = None, max_retries: int = 3) -> List[BulkResult]:
+        """複数の記事をまとめて保存し、記事ごとの結果を返す
+
+        新しい記事は作成の前提条件付きで、記事ごとの書き込み（split レイアウトの本文を含む）を
+        分けずに500件以内のバッチへ詰めて書き込み、失敗した記事は max_retries 回まで再試行する。
+        既存の記事の上書き（allow_overwrite=True）は save_article と同じく記事ごとのトランザクションで行い、
+        集計済みの閲覧数・カウンター・版を既存の記事から引き継ぐ。
+        mode="bulk_writer"（既定: BULK_WRITE_MODE）では、1件1ドキュメントの記事を BulkWriter で書き込む。
+        """
+        articles = list(articles)
+        errors: Dict[str, str] = {}
+        now = datetime.now()
+
+        # 既存記事の確認は登録簿で絞り込んだうえで1回の一括取得で行う
+        maybe_existing = [a.slug for a in articles if self._slug_may_exist(a.slug)]
+        existing = {}
+        if maybe_existing:
+            docs = self.backend.get_many(self.articles_collection, maybe_existing, fields=["title"])
+            existing = {slug: data for slug, data in zip(maybe_existing, docs) if data is not None}
+
+        created: List[MathArticle] = []
+        overwrites: List[MathArticle] = []
+        groups: List[List[WriteOp]] = []
+        for article in articles:
+            if article.slug in existing:
+                if allow_overwrite:
+                    overwrites.append(article)
+                else:
+                    errors[article.slug] = (f"記事が既に存在します: {article.slug} "
+                                            f"(タイトル: {existing[article.slug].get('title')})")
+                continue
+            article.updated_at = now
+            writes = [WriteOp("set", collection, doc_id, data)
+                      for collection, doc_id, data in self._article_writes(article)]
+            writes[-1] = writes[-1]._replace(kind="create")
+            created.append(article)
+            groups.append(writes)
+
+        for article, error in zip(created, self._write_groups(groups, mode, max_retries)):
+            if error is None:
+                continue
+            if allow_overwrite and error.startswith(DocumentExistsError.__name__):
+                # 登録簿に無いまま別の書き込みで作成されていた記事は上書きに回す
+                overwrites.append(article)
+            else:
+                errors[article.slug] = error
+        created = [a for a in created if a.slug not in errors and a not in overwrites]
+        self._invalidate_articles(*(a.slug for a in created))
+
+        for article in created:
+            self.registry.add(article.slug, article.title, article.category, article.updated_at)
+            self.search_index.add(article)
+        deltas: Dict[str, int] = {}
+        for article in created:
+            for key, delta in self._counter_deltas(None, article).items():
+                deltas[key] = deltas.get(key, 0) + delta
+        for op in self._counter_ops(deltas):
+            self.backend.apply(op)
+        if self.feeds_enabled and created:
+            # 一括保存はバッチに分かれるため、フィードは保存後に1回のトランザクションで更新する
+            cards = {a.slug: a for a in created}
+            self._refill_feeds(self.backend.run_plan(
+                lambda: self._commit_steps([], cards, dict.fromkeys(cards))))
+
+        for article in overwrites:
+            try:
+                self._write_article(article, True)
+            except Exception as e:
+                errors[article.slug] = f"{type(e).__name__}: {e}"
+        saved = sum(1 for article in articles if article.slug not in errors)
+        logger.info(f"記事を一括保存しました: {saved}/{len(articles)}件")
+        return [BulkResult(article.slug, errors.get(article.slug)) for article in articles]
+
+    def _write_groups(self, groups: List[List[WriteOp]], mode: str = None,
+                      max_retries: int = 3) -> List[Optional[str]]:
+        """記事ごとの書き込みのグループを分けずに一括で書き込み、グループごとのエラーを返す"""
+        if (mode or config.bulk_write_mode) == BULK_MODE_BULK_WRITER and all(len(ops) == 1 for ops in groups):
+            results = self._bulk_write([ops[0] for ops in groups], mode, max_retries)
+            return [result.error for result in results]
+        marks = self._manifest_ops([op for ops in groups for op in ops])
+        if marks:
+            self.backend.commit(marks)
+        return grouped_write(self.backend, groups, max_retries)
+
+    def _commit_steps(self, ops: List[WriteOp], cards: Dict[str, Optional[MathArticle]],
+                      previous: Dict[str, Optional[Dict[str, Any]]]) -> Plan:
+        """記事の書き込み計画の仕上げ（(書き込み, 補充が必要なフィードのID) を返す）
+
+        差分同期のマニフェストへの記録を加え、フィードが有効なら関係するフィードを読んで
+        カードを差し替える。cards は {スラッグ: 保存後の記事（削除なら None）}、
+        previous は {スラッグ: 書き込み前の記事の status・category（無ければ None）}。
+        """
+        ops = ops + self._manifest_ops(ops)
+        if not self.feeds_enabled:
+            return ops, []
+        categories = {data.get("category") for data in previous.values() if data}
+        categories |= {article.category for article in cards.values() if article is not None}
+        refill = []
+        for fid in [FEED_HOME] + sorted(feed_id(category) for category in categories if category):
+            feed = yield Read("get", (self.feeds_collection, fid, None))
+            feed, short = self._updated_feed(fid, feed or {}, previous, cards)
+            ops.append(WriteOp("set", self.feeds_collection, fid, feed))
+            if short:
+                refill.append(fid)
+        return ops, refill
+
+    def _updated_feed(self, fid: str, feed: Dict[str, Any], previous: Dict[str, Optional[Dict[str, Any]]],
+                      cards: Dict[str, Optional[MathArticle]]):
+        """記事の保存・削除を反映したフィードと、補充が必要か"""
+        category = None if fid == FEED_HOME else fid[len("category_"):]
+
+        def listed(status, article_category) -> bool:
+            return status == "published" and (category is None or article_category == category)
+
+        entries = [card for card in feed.get("cards", []) if card.get("slug") not in cards]
+        total = feed.get("total", 0)
+        for slug, article in cards.items():
+            data = previous.get(slug) or {}
+            if listed(data.get("status"), data.get("category")):
+                total -= 1
+            if article is not None and listed(article.status, article.category):
+                total += 1
+                entries.append(self._feed_card(article))
+        entries.sort(key=_card_time, reverse=True)
+        short = len(entries) < min(self.feed_size, total)
+        return {"cards": entries[:self.feed_size], "total": max(total, 0), "updated_at": datetime.now()}, short
+
+    @staticmethod
+    def _feed_card(article: MathArticle) -> Dict[str, Any]:
+        return {field: getattr(article, field) for field in FEED_CARD_FIELDS}
+
+    def _refill_feeds(self, feed_ids: List[str]):
+        """削除・非公開化でカードが減ったフィードを公開済み記事から補充"""
+        if feed_ids:
+            self.rebuild_feeds(feed_ids)
+
+    def _invalidate_articles(self, *slugs: str):
+        """記事の書き込み後、その記事と記事一覧のキャッシュを無効化"""
+        self.cache.invalidate("articles", *(f"article:{slug}" for slug in slugs))
+
+    def _bulk_write(self, ops: List[WriteOp], mode: str = None, max_retries: int = 3):
+        # 変更の記録は先にまとめて書く（書き込みが失敗しても余分に比較されるだけ）
+        marks = self._manifest_ops(ops)
+        if marks:
+            self.backend.commit(marks)
+        return self.backend.bulk_write(ops, mode=mode or config.bulk_write_mode,
+                                       max_retries=max_retries)
+
+    def _manifest_ops(self, ops: List[WriteOp]) -> List[WriteOp]:
+        """差分同期のマニフェストに、ops で書き込む記事・トピックを変更ありとして記録する操作"""
+        if not self.sync_manifest:
+            return []
+        return manifest_ops(ops, [self.articles_collection, self.topics_collection],
+                            config.sync_manifest_collection, config.sync_bucket_digits)
+
+    def _article_writes(self, article: MathArticle, layout: str = None) -> List[tuple]:
+        """記事の保存に必要な書き込み (コレクション, ドキュメントID, データ) の一覧
+
+        本文は圧縮・ハッシュを付与し、集計用の派生フィールドを加える。
+        split レイアウトでは本文ドキュメントを先に書き、メタデータが存在しない本文を指さないようにする。
+        """
+        data = article.to_dict()
+        content_html = data.pop('content_html')
+        data['content_length'] = len(content_html)
+
+        if (layout or self.body_layout) != BODY_LAYOUT_SPLIT:
+            data.update(encode_content(content_html, config.content_compression))
+            return [(self.articles_collection, article.slug, data)]
+
+        body_docs = encode_body(content_html, config.content_compression)
+        data['content_hash'] = body_docs[0]['content_hash']
+        data['body_layout'] = BODY_LAYOUT_SPLIT
+        data['body_chunks'] = len(body_docs)
+        writes = [(self.bodies_collection, article.slug, body_docs[0])]
+        writes += [(self._chunks_collection(article.slug), str(i), chunk)
+                   for i, chunk in enumerate(body_docs[1:], 1)]
+        writes.append((self.articles_collection, article.slug, data))
+        return writes
+
+    def _chunks_collection(self, slug: str) -> str:
+        return f"{self.bodies_collection}/{slug}/chunks"
+
+    def _load_body(self, slug: str, chunk_count: int = 1) -> str:
+        """article_bodies から本文を読み込む"""
+        return self._read(self._body_steps(slug, chunk_count))
+
+    def _body_steps(self, slug: str, chunk_count: int = 1) -> Generator[Read, Any, str]:
+        """1件の本文を読む計画（get だけを使うため書き込み計画のトランザクション内でも使える）"""
+        head = yield Read("get", (self.bodies_collection, slug, None))
+        if head is None:
+            logger.warning(f"記事本文が見つかりません: {slug}")
+            return ""
+        docs = [head]
+        for i in range(1, max(chunk_count, head.get("chunk_count", 1))):
+            docs.append((yield Read("get", (self._chunks_collection(slug), str(i), None)))
+                        or {"content_chunk": b""})
+        return decode_body(docs)
+
+    def _bodies_steps(self, slugs: List[str]) -> Generator[Any, Any, Dict[str, str]]:
+        """複数の記事本文をまとめて読む計画（{スラッグ: 本文}。チャンクは記事ごとに並列に読める）"""
+        if not slugs:
+            return {}
+        heads = dict(zip(slugs, (yield Read("get_many", (self.bodies_collection, slugs, None)))))
+        chunked = [slug for slug, head in heads.items() if head and head.get("chunk_count", 1) > 1]
+        chunks = yield [Read("get_many", (self._chunks_collection(slug),
+                                          [str(i) for i in range(1, heads[slug]["chunk_count"])], None))
+                        for slug in chunked]
+        chunks = dict(zip(chunked, chunks))
+        return {slug: decode_body([head] + [c or {"content_chunk": b""} for c in chunks.get(slug, [])])
+                for slug, head in heads.items() if head is not None}
+
+    def _records_steps(self, docs: List[DocumentRecord], include_body: bool) -> Generator[Any, Any, List[MathArticle]]:
+        """(スラッグ, データ) の列から記事を復元する計画（split レイアウトの本文はまとめて読む）"""
+        bodies = {}
+        if include_body:
+            bodies = yield from self._bodies_steps([doc.id for doc in docs
+                                                    if doc.data.get('body_layout') == BODY_LAYOUT_SPLIT])
+        return [self._article_from_document(doc.data, doc.id, include_body, bodies.get(doc.id, ""))
+                for doc in docs]
+
+    def _article_from_document(self, data: Dict[str, Any], slug: str = None,
+                               include_body: bool = True, body: str = None) -> MathArticle:
+        """保存用ドキュメントから記事を復元
+
+        圧縮された本文は展開し、split レイアウトの本文は include_body=True のときだけ読み込む
+        （読み込まない場合 content_html は空文字。body を渡せばそれを使う）。
+        """
+        if data.pop('body_layout', None) == BODY_LAYOUT_SPLIT:
+            chunk_count = data.pop('body_chunks', 1)
+            if not include_body:
+                body = ""
+            elif body is None:
+                body = self._load_body(slug or data['slug'], chunk_count)
+            data['content_html'] = body
+        return MathArticle.from_dict(decode_content(data))
+
+    def delete_article(self, slug: str) -> bool:
+        """記事を削除（split レイアウトの本文・チャンクも削除）"""
+        try:
+            refill = self.backend.run_plan(lambda: self._delete_plan(slug))
+            if refill is None:
+                return False
+            self._article_deleted(slug, refill)
+            logger.info(f"記事を削除しました: {slug}")
+            return True
+        except Exception as e:
+            logger.error(f"記事削除エラー: {e}")
+            raise
+
+    def _article_deleted(self, slug: str, refill: List[str]):
+        """記事の削除後の処理（フィードの補充・キャッシュの無効化・登録簿と検索インデックスからの削除）"""
+        self._refill_feeds(refill)
+        self._invalidate_articles(slug)
+        self.registry.discard(slug)
+        self.search_index.discard(slug)
+
+    def _delete_plan(self, slug: str) -> Plan:
+        """記事の削除の書き込み計画（記事が無ければ何も書き込まずに None を返す）"""
+        fields = None if self.revisions_enabled else ["body_chunks", "status", "category"]
+        data = yield Read("get", (self.articles_collection, slug, fields))
+        if data is None:
+            return [], None
+        ops = yield from self._revision_steps(slug, data, None)
+        ops += [WriteOp("delete", self._chunks_collection(slug), str(i))
+                for i in range(1, data.get("body_chunks") or 1)]
+        ops.append(WriteOp("delete", self.bodies_collection, slug))
+        ops.append(WriteOp("delete", self.articles_collection, slug))
+        ops += self._counter_ops(self._counter_deltas(data, None))
+        return (yield from self._commit_steps(ops, {slug: None}, {slug: data}))
+
+    def get_content_hash(self, slug: str) -> Optional[str]:
+        """記事本文のハッシュのみを取得（本文をダウンロードせずに変更を検知する）"""
+        try:
+            data = self.backend.get(self.articles_collection, slug, fields=["content_hash"])
+            return data.get("content_hash") if data else None
+        except Exception as e:
+            logger.error(f"本文ハッシュ取得エラー: {e}")
+            return None
+
+    def _slug_may_exist(self, slug: str) -> bool:
+        """スラッグが存在する可能性があるか（登録簿が使えなければ常に True）"""
+        try:
+            return self.registry.may_contain_slug(slug)
+        except Exception as e:
+            logger.warning(f"記事登録簿を利用できません（直接確認します）: {e}")
+            return True
+
     def check_topic_exists(self, topic_name: str, category: str) -> bool:
         """トピックが既に記事化されているかチェック"""
         try:
-            query = (self.db.collection(self.articles_collection)
-                    .where(filter=FieldFilter("category", "==", category))
-                    .where(filter=FieldFilter("title", ">=", topic_name))
-                    .where(filter=FieldFilter("title", "<=", topic_name + "\uf8ff"))
-                    .limit(1))
-            
-            docs = list(query.stream())
+            return self.registry.has_title_prefix(category, topic_name)
+        except Exception as e:
+            logger.warning(f"記事登録簿を利用できません（クエリで確認します）: {e}")
+
+        try:
+            docs = self.backend.query(
+                self.articles_collection,
+                filters=[("category", "==", category),
+                         ("title", ">=", topic_name),
+                         ("title", "<=", topic_name + "\uf8ff")],
+                limit=1)
             return len(docs) > 0
-            
+
         except Exception as e:
             logger.error(f"重複チェックエラー: {e}")
             logger.info("Firebaseインデックスが必要です。Firebaseコンソールでインデックスを作成してください。")
             return False
-    
+
     def get_article(self, slug: str) -> Optional[MathArticle]:
         """スラッグで記事を取得"""
         try:
-            doc_ref = self.db.collection(self.articles_collection).document(slug)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                return MathArticle.from_dict(doc.to_dict())
-            return None
-            
+            return self._read_cached(self._article_read(slug))
+
         except Exception as e:
             logger.error(f"記事取得エラー: {e}")
             return None
-    
-    def get_articles_by_category(self, category: str, limit: int = 20) -> List[MathArticle]:
-        """カテゴリ別に記事を取得"""
-        try:
-            query = (self.db.collection(self.articles_collection)
-                    .where(filter=FieldFilter("category", "==", category))
-                    .where(filter=FieldFilter("status", "==", "published"))
-                    .order_by("created_at", direction="DESCENDING")
-                    .limit(limit))
-            
-            docs = query.stream()
-            return [MathArticle.from_dict(doc.to_dict()) for doc in docs]
-            
+
+    def get_articles(self, slugs: Iterable[str], fields: List[str] = None,
+                     include_body: bool = True) -> List[Optional[Any]]:
+        """複数の記事をスラッグでまとめて取得（入力と同じ順序、存在しない記事は None）
+
+        fields を指定した場合は MathArticle ではなく、そのフィールドだけの辞書を返す。
+        """
+        slugs = list(slugs)
+        try:
+            return self._read(self._articles_plan(slugs, fields, include_body))
+
+        except Exception as e:
+            logger.error(f"記事一括取得エラー: {e}")
+            return [None] * len(slugs)
+
+    def get_articles_by_category(self, category: str, limit: int = 20,
+                                 include_body: bool = False) -> List[MathArticle]:
+        """カテゴリ別に記事を取得（split レイアウトの本文は include_body=True で読み込む）"""
+        try:
+            return list(self._read_cached(self._category_read(category, limit, include_body)))
+
         except Exception as e:
             logger.error(f"カテゴリ別記事取得エラー: {e}")
             return []
-    
-    def get_all_published_articles(self, limit: int = 50) -> List[MathArticle]:
-        """公開済み記事を全て取得"""
-        try:
-            query = (self.db.collection(self.articles_collection)
-                    .where(filter=FieldFilter("status", "==", "published"))
-                    .order_by("created_at", direction="DESCENDING")
-                    .limit(limit))
-            
-            docs = query.stream()
-            return [MathArticle.from_dict(doc.to_dict()) for doc in docs]
-            
+
+    def get_all_published_articles(self, limit: int = 50,
+                                   include_body: bool = False) -> List[MathArticle]:
+        """公開済み記事を全て取得（split レイアウトの本文は include_body=True で読み込む）"""
+        try:
+            return list(self._read_cached(self._published_read(limit, include_body)))
+
         except Exception as e:
             logger.error(f"全記事取得エラー: {e}")
             return []
-    
+
+    # 読み取り計画（AsyncFirestoreManager と共用）
+
+    def _read_cached(self, read: 'CachedRead') -> Any:
+        return self.cache.get_or_load(read.key, lambda: self._read(read.make_plan()), read.kind, read.tags)
+
+    def _article_read(self, slug: str) -> 'CachedRead':
+        return CachedRead(("article", slug), "article", [f"article:{slug}"],
+                          lambda: self._article_plan(slug))
+
+    def _category_read(self, category: str, limit: int, include_body: bool) -> 'CachedRead':
+        filters = [("category", "==", category), ("status", "==", "published")]
+        return CachedRead(("category", category, limit, include_body), "list", ["articles"],
+                          lambda: self._list_plan(feed_id(category), filters, limit, include_body))
+
+    def _published_read(self, limit: int, include_body: bool) -> 'CachedRead':
+        filters = [("status", "==", "published")]
+        return CachedRead(("published", limit, include_body), "list", ["articles"],
+                          lambda: self._list_plan(FEED_HOME, filters, limit, include_body))
+
+    def _article_plan(self, slug: str) -> Generator[Any, Any, Optional[MathArticle]]:
+        data = yield Read("get", (self.articles_collection, slug, None))
+        if data is None:
+            return None
+        return (yield from self._records_steps([DocumentRecord(slug, data)], True))[0]
+
+    def _articles_plan(self, slugs: List[str], fields: Optional[List[str]],
+                       include_body: bool) -> Generator[Any, Any, List[Optional[Any]]]:
+        docs = yield Read("get_many", (self.articles_collection, slugs, fields))
+        if fields is not None:
+            return docs
+        found = [DocumentRecord(slug, data) for slug, data in zip(slugs, docs) if data is not None]
+        articles = iter((yield from self._records_steps(found, include_body)))
+        return [next(articles) if data is not None else None for data in docs]
+
+    def _list_plan(self, fid: str, filters: List[Filter], limit: int,
+                   include_body: bool) -> Generator[Any, Any, List[MathArticle]]:
+        """記事一覧を読む計画（フィードで賄えればフィードのカードから、無ければミラーまたはクエリから）"""
+        if self.feeds_enabled and not include_body and limit <= self.feed_size:
+            feed = yield Read("get", (self.feeds_collection, fid, None))
+            if feed is not None:
+                return [MathArticle.from_dict(dict(card, content_html="", status="published"))
+                        for card in feed.get("cards", [])[:limit]]
+        docs = yield Read("query", (self.articles_collection, filters, [("created_at", DESCENDING)], limit, None),
+                          self._use_mirror(self.articles_collection))
+        return (yield from self._records_steps(docs, include_body))
+
+    def iter_articles(self, filters: Iterable[Filter] = (), fields: Optional[Iterable[str]] = ARTICLE_LIST_FIELDS,
+                      page_size: int = DEFAULT_PAGE_SIZE,
+                      order_by: Iterable[OrderBy] = ()) -> Iterator[DocumentRecord]:
+        """条件に合う全記事を (スラッグ, データ) として逐次返す
+
+        page_size 件ごとにカーソルで続きを読み、fields のフィールドだけを取得する
+        （既定は本文を除く一覧用フィールド。None なら保存形式のまま全フィールド）。
+        コーパス全体を走査してもメモリ使用量は1ページ分に収まる。
+        ミラーが有効ならミラーから読む（読んだ内容を元に書き込む走査には backend.paginate を使う）。
+        """
+        return self._reader(self.articles_collection).paginate(
+            self.articles_collection, filters=list(filters),
+            order_by=list(order_by), fields=fields, page_size=page_size)
+
     def search_articles(self, keyword: str, limit: int = 10) -> List[MathArticle]:
-        """キーワードで記事を検索（簡易実装）"""
-        try:
-            # タイトルによる部分検索
-            query = (self.db.collection(self.articles_collection)
-                    .where(filter=FieldFilter("status", "==", "published"))
-                    .limit(limit * 3))  # 多めに取得してフィルタリング
-            
-            docs = query.stream()
-            articles = []
-            
-            for doc in docs:
-                article = MathArticle.from_dict(doc.to_dict())
-                if (keyword.lower() in article.title.lower() or 
-                    keyword.lower() in article.summary.lower() or
-                    keyword in article.tags):
-                    articles.append(article)
-                    if len(articles) >= limit:
-                        break
-            
-            return articles
-            
+        """キーワードで公開済み記事を検索（全文検索インデックスの BM25 スコア順）"""
+        try:
+            index = self.search_index
+            index.ensure_loaded(self._scan_articles,
+                                lambda: self.backend.count(self.articles_collection))
+            slugs = [slug for slug, _ in index.search(keyword, limit)]
+            articles = self.get_articles(slugs, include_body=False)
+            for slug, article in zip(slugs, articles):
+                if article is None:
+                    # 他のプロセスで削除された記事はインデックスからも外す
+                    index.discard(slug)
+            return [article for article in articles if article is not None]
+
         except Exception as e:
             logger.error(f"記事検索エラー: {e}")
             return []
-    
+
+    # === 版履歴 ===
+
+    def _revisions_of(self, slug: str) -> str:
+        return f"{self.revisions_collection}/{slug}/revisions"
+
+    @staticmethod
+    def _revision_fields(article: MathArticle) -> Dict[str, Any]:
+        """版の比較に使うフィールド（更新日時・閲覧数は除く）"""
+        data = article.to_dict()
+        data.pop("updated_at")
+        data.pop("view_count")
+        return data
+
+    def _revision_steps(self, slug: str, data: Dict[str, Any],
+                        successor: Optional[MathArticle]) -> Generator[Read, Any, List[WriteOp]]:
+        """置き換えられる現在の記事 data を版として残す書き込みを作る計画
+
+        書き込み計画のトランザクション内で本文と版の先頭を読むため、同時の上書きと版番号が競合しない。
+        successor は置き換え後の記事（削除なら None で、本文全体の版にする）。
+        版履歴が無効・内容が変わらない場合は空。
+        """
+        if not self.revisions_enabled:
+            return []
+        body = None
+        if data.get("body_layout") == BODY_LAYOUT_SPLIT:
+            body = yield from self._body_steps(slug, data.get("body_chunks", 1))
+        current = self._article_from_document(dict(data), slug, body=body)
+        if successor is not None and self._revision_fields(current) == self._revision_fields(successor):
+            return []
+
+        head = (yield Read("get", (self.revisions_collection, slug, None))) or {}
+        current_hash = content_hash(current.content_html)
+        if head.get("base_hash") not in (None, current_hash):
+            logger.warning(f"版履歴の差分の基準が現在の記事と一致しません（版 #{head['latest']} 以前は復元できません）: {slug}")
+        number = head.get("latest", 0) + 1
+        fields = current.to_dict()
+        content = fields.pop("content_html")
+        successor_html = successor.content_html if successor is not None else ""
+        revision = encode_revision(content, successor_html,
+                                   successor is None or number % self.revision_keyframe_interval == 0)
+        successor_hash = content_hash(successor_html) if successor is not None else None
+        revision.update(revision=number, saved_at=datetime.now(), content_hash=current_hash,
+                        base_hash=successor_hash, article=fields)
+
+        # 古い版は新しい版を基準にしないため、古い方から削除できる
+        oldest = max(head.get("oldest", 1), number - self.revision_retention + 1)
+        ops = [WriteOp("set", self._revisions_of(slug), str(number), revision)]
+        ops += [WriteOp("delete", self._revisions_of(slug), str(n))
+                for n in range(head.get("oldest", 1), oldest)]
+        ops.append(WriteOp("set", self.revisions_collection, slug,
+                           {"latest": number, "oldest": oldest, "base_hash": successor_hash}))
+        return ops
+
+    def list_revisions(self, slug: str) -> List[Dict[str, Any]]:
+        """記事の版の一覧（版番号の新しい順）"""
+        revisions = []
+        for doc in self.backend.paginate(self._revisions_of(slug), fields=None):
+            data = doc.data
+            revisions.append({"revision": data["revision"], "saved_at": data["saved_at"],
+                              "kind": data["kind"], "size": len(data["content"]),
+                              "title": data["article"].get("title"), "status": data["article"].get("status")})
+        return sorted(revisions, key=lambda info: info["revision"], reverse=True)
+
+    def get_revision(self, slug: str, number: int) -> Optional[MathArticle]:
+        """版を復元（無ければ None、差分の基準が一致しなければ ValueError）
+
+        新しい方へ keyframe（無ければ現在の記事）まで版を読み、差分を新しい順にあてる。
+        """
+        head = self.backend.get(self.revisions_collection, slug)
+        if head is None or not head.get("oldest", 1) <= number <= head["latest"]:
+            return None
+
+        chain: List[Dict[str, Any]] = []
+        interval = self.revision_keyframe_interval
+        for start in range(number, head["latest"] + 1, interval):
+            ids = [str(n) for n in range(start, min(start + interval, head["latest"] + 1))]
+            for n, data in zip(ids, self.backend.get_many(self._revisions_of(slug), ids)):
+                if data is None:
+                    raise ValueError(f"版が欠けています: {slug} #{n}")
+                chain.append(data)
+                if data["kind"] == REVISION_KEYFRAME:
+                    break
+            if chain[-1]["kind"] == REVISION_KEYFRAME:
+                break
+
+        text = None
+        if chain[-1]["kind"] != REVISION_KEYFRAME:
+            current = self.backend.get(self.articles_collection, slug)
+            if current is None:
+                raise ValueError(f"差分の基準となる記事がありません: {slug}")
+            text = self._article_from_document(current, slug).content_html
+        for data in reversed(chain):
+            if data["kind"] != REVISION_KEYFRAME and data["base_hash"] != content_hash(text):
+                raise ValueError(f"差分の基準が一致しません: {slug} #{data['revision']}")
+            text = decode_revision(data, text)
+        if content_hash(text) != chain[0]["content_hash"]:
+            raise ValueError(f"復元した本文のハッシュが一致しません: {slug} #{number}")
+        return MathArticle.from_dict(dict(chain[0]["article"], content_html=text))
+
+    def rollback_article(self, slug: str, number: int) -> MathArticle:
+        """記事を版の内容に戻す（現在の記事は新しい版として残る）"""
+        article = self.get_revision(slug, number)
+        if article is None:
+            raise ValueError(f"版が見つかりません: {slug} #{number}")
+        self.save_article(article, allow_overwrite=True)
+        logger.info(f"記事を版 #{number} に戻しました: {slug}")
+        return article
+
+    # === 閲覧数 ===
+
+    def _view_shard_id(self, slug: str, shard: int) -> str:
+        return f"{slug}:{shard}"
+
+    def record_view(self, slug: str, count: int = 1):
+        """記事の閲覧数を加算（ランダムに選んだシャードに加算する）"""
+        shard = random.randrange(self.view_counter_shards)
+        self.backend.increment(self.view_shards_collection, self._view_shard_id(slug, shard), {"count": count})
+
+    def get_view_count(self, slug: str) -> int:
+        """集計済みの view_count と未集計のシャードの合計"""
+        data = self.backend.get(self.articles_collection, slug, ["view_count"]) or {}
+        shard_ids = [self._view_shard_id(slug, shard) for shard in range(self.view_counter_shards)]
+        shards = self.backend.get_many(self.view_shards_collection, shard_ids, ["count"])
+        return (data.get("view_count") or 0) + sum((shard or {}).get("count", 0) for shard in shards)
+
+    def rollup_view_counts(self, trending: bool = False) -> Dict[str, int]:
+        """シャードに溜まった閲覧数を記事の view_count にまとめる（{スラッグ: 加算した閲覧数}）
+
+        記事ごとに view_count の加算と読み取った分のシャードの減算を同じコミットで書き込むため、
+        集計中に加算された閲覧も失われず、二重にも数えられない。
+        trending=True なら同じコミットで増分を stats/trending_pending にも加算し、
+        人気記事ランキングの更新（scripts.trending）が失敗しても次回に持ち越す。
+        """
+        pending: Dict[str, Dict[str, int]] = {}
+        stray: List[str] = []
+        for doc in self.backend.paginate(self.view_shards_collection, [("count", ">", 0)], fields=["count"]):
+            slug, _, shard = doc.id.rpartition(":")
+            if not slug or not shard.isdigit() or int(shard) >= self.view_counter_shards:
+                # record_view が使わない番号のシャードは数えずに捨てる
+                stray.append(doc.id)
+                continue
+            pending.setdefault(slug, {})[doc.id] = doc.data["count"]
+        if not pending and not stray:
+            return {}
+
+        slugs = list(pending)
+        totals: Dict[str, int] = {}
+        groups: List[Tuple[str, List[WriteOp]]] = [
+            ("", [WriteOp("delete", self.view_shards_collection, shard_id)
+                  for shard_id in stray[start:start + MAX_BATCH_SIZE - 1]])
+            for start in range(0, len(stray), MAX_BATCH_SIZE - 1)]
+        docs = self.backend.get_many(self.articles_collection, slugs, []) if slugs else []
+        for slug, data in zip(slugs, docs):
+            shards = pending[slug]
+            if data is None:
+                # 削除済みの記事の閲覧数は捨てる
+                groups.append((slug, [WriteOp("delete", self.view_shards_collection, shard_id)
+                                      for shard_id in shards]))
+                continue
+            totals[slug] = sum(shards.values())
+            ops = [WriteOp("increment", self.view_shards_collection, shard_id, {"count": -count})
+                   for shard_id, count in shards.items()]
+            ops.append(WriteOp("increment", self.articles_collection, slug, {"view_count": totals[slug]}))
+            groups.append((slug, ops + self._manifest_ops(ops)))
+
+        # 記事ごとの書き込みを分けずに、上限内でまとめてコミットする（ランキングの増分の1件分を空けておく）
+        def flush(batch: List[WriteOp], views: Dict[str, int]):
+            if trending and views:
+                batch = batch + [WriteOp("increment", self.stats_collection, TRENDING_PENDING_DOC, views)]
+            self.backend.commit(batch)
+
+        batch: List[WriteOp] = []
+        views: Dict[str, int] = {}
+        for slug, ops in groups:
+            if batch and len(batch) + len(ops) > MAX_BATCH_SIZE - 1:
+                flush(batch, views)
+                batch, views = [], {}
+            batch += ops
+            if slug in totals:
+                views[slug] = totals[slug]
+        if batch:
+            flush(batch, views)
+        self._invalidate_articles(*totals)
+        logger.info(f"閲覧数を集計しました: {len(totals)}記事 / {sum(totals.values())}回")
+        return totals
+
     # === トピック管理 ===
-    
+
     def save_topic(self, topic: MathTopic) -> str:
         """トピックをFirestoreに保存"""
         try:
             # ランダムIDで新規ドキュメント作成
-            doc_ref = self.db.collection(self.topics_collection).document()
-            topic.topic_id = doc_ref.id  # 生成されたIDを記録
-            doc_ref.set(topic.to_dict())
-            logger.info(f"トピックを保存しました: {topic.name} (ID: {doc_ref.id})")
-            return doc_ref.id
+            topic_id = self.backend.new_id(self.topics_collection)
+            topic.topic_id = topic_id  # 生成されたIDを記録
+            self.backend.commit(self._new_topic_ops(topic))
+            logger.info(f"トピックを保存しました: {topic.name} (ID: {topic_id})")
+            return topic_id
         except Exception as e:
             logger.error(f"トピック保存エラー: {e}")
             raise
-    
+
+    def _new_topic_ops(self, topic: MathTopic) -> List[WriteOp]:
+        ops = [WriteOp("set", self.topics_collection, topic.topic_id, topic.to_dict())]
+        return ops + self._manifest_ops(ops)
+
+    def save_topics_bulk(self, topics: Iterable[MathTopic], mode: str = None,
+                         max_retries: int = 3) -> List[BulkResult]:
+        """複数のトピックをまとめて保存し、トピックごとの結果を返す（topic_id を採番して記録）"""
+        topics = list(topics)
+        ops = []
+        for topic in topics:
+            topic.topic_id = self.backend.new_id(self.topics_collection)
+            ops.append(WriteOp("set", self.topics_collection, topic.topic_id, topic.to_dict()))
+
+        results = [BulkResult(r.op.doc_id, r.error) for r in self._bulk_write(ops, mode, max_retries)]
+        logger.info(f"トピックを一括保存しました: {sum(r.ok for r in results)}/{len(results)}件")
+        return results
+
+    def get_topics(self, topic_ids: Iterable[str], fields: List[str] = None) -> List[Optional[Any]]:
+        """複数のトピックをIDでまとめて取得（入力と同じ順序、存在しないトピックは None）
+
+        fields を指定した場合は MathTopic ではなく、そのフィールドだけの辞書を返す。
+        """
+        topic_ids = list(topic_ids)
+        try:
+            if fields is not None:
+                return self.backend.get_many(self.topics_collection, topic_ids, fields)
+
+            # キャッシュに無いものだけをまとめて取得
+            cached = {topic_id: self.cache.get(("topic", topic_id)) for topic_id in topic_ids}
+            missing = list(dict.fromkeys(t for t, topic in cached.items() if topic is MISS))
+            for topic_id, data in zip(missing, self.backend.get_many(self.topics_collection, missing)):
+                if data is not None:
+                    data['topic_id'] = topic_id  # ドキュメントIDを記録
+                    data = MathTopic.from_dict(data)
+                cached[topic_id] = data
+                self.cache.put(("topic", topic_id), data, "topic", [f"topic:{topic_id}"])
+            return [cached[topic_id] for topic_id in topic_ids]
+
+        except Exception as e:
+            logger.error(f"トピック一括取得エラー: {e}")
+            return [None] * len(topic_ids)
+
+    def iter_topics(self, filters: Iterable[Filter] = (), fields: Optional[Iterable[str]] = None,
+                    page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[DocumentRecord]:
+        """条件に合う全トピックを (トピックID, データ) として逐次返す（ミラーが有効ならミラーから読む）"""
+        return self._reader(self.topics_collection).paginate(
+            self.topics_collection, filters=list(filters), fields=fields, page_size=page_size)
+
     def get_ungenerated_topics(self, limit: int = 10) -> List[MathTopic]:
         """未生成のトピックを取得（優先度順）"""
         try:
-            query = (self.db.collection(self.topics_collection)
-                    .where(filter=FieldFilter("article_generated", "==", False))
-                    .order_by("priority", direction=firestore.Query.DESCENDING)
-                    .order_by("niche_score", direction=firestore.Query.DESCENDING)
-                    .limit(limit))
-            
-            docs = query.stream()
-            topics = []
-            for doc in docs:
-                data = doc.to_dict()
-                data['topic_id'] = doc.id  # ドキュメントIDを記録
-                topics.append(MathTopic(**data))
-            return topics
-            
+            return self._read(self._ungenerated_topics_plan(limit))
+
         except Exception as e:
             logger.error(f"未生成トピック取得エラー: {e}")
             return []
-    
+
+    def _ungenerated_topics_plan(self, limit: int) -> Generator[Any, Any, List[MathTopic]]:
+        docs = yield Read("query", (self.topics_collection,
+                                    [("article_generated", "==", False)],
+                                    [("priority", DESCENDING), ("niche_score", DESCENDING)],
+                                    limit, None))
+        topics = []
+        for doc in docs:
+            data = doc.data
+            data['topic_id'] = doc.id  # ドキュメントIDを記録
+            topics.append(MathTopic.from_dict(data))
+        return topics
+
+    # === トピックのリース（複数ワーカーでの分担） ===
+
+    def claim_topics(self, worker_id: str = None, count: int = 1, lease_seconds: int = None,
+                     topic_ids: Iterable[str] = None) -> List[MathTopic]:
+        """未生成のトピックを最大 count 件、優先度順にリースして返す
+
+        リースはトランザクションで取得するため、同時に実行した別のワーカーが
+        同じトピックを受け取ることはない。期限切れのリースは取り直せる。
+        topic_ids を指定した場合はそのトピックだけを対象にする。
+        """
+        worker_id = worker_id or default_worker_id()
+        lease_seconds = lease_seconds or config.topic_lease_seconds
+        claimed: List[MathTopic] = []
+
+        if topic_ids is not None:
+            candidates = (DocumentRecord(topic_id, {}) for topic_id in topic_ids)
+            count = None
+        else:
+            candidates = self.backend.paginate(
+                self.topics_collection,
+                filters=[("article_generated", "==", False)],
+                order_by=[("priority", DESCENDING), ("niche_score", DESCENDING)],
+                fields=LEASE_FIELDS, page_size=max(count * 2, 10))
+
+        batch: List[str] = []
+        now = datetime.now(timezone.utc)
+        for doc in candidates:
+            if not _lease_available(doc.data, now):
+                continue
+            batch.append(doc.id)
+            if count is not None and len(batch) >= count - len(claimed):
+                claimed += self.backend.run_transaction(
+                    lambda txn: self._lease_topics(txn, batch, worker_id, lease_seconds))
+                batch = []
+                if len(claimed) >= count:
+                    break
+        if batch:
+            claimed += self.backend.run_transaction(
+                lambda txn: self._lease_topics(txn, batch, worker_id, lease_seconds))
+
+        for topic in claimed:
+            self.cache.invalidate(f"topic:{topic.topic_id}")
+        logger.info(f"トピックをリースしました: {len(claimed)}件 (ワーカー: {worker_id}, {lease_seconds}秒)")
+        return claimed
+
+    def _lease_topics(self, txn: Transaction, topic_ids: List[str], worker_id: str,
+                      lease_seconds: int) -> List[MathTopic]:
+        """トランザクション内で、まだ空いているトピックにリースを設定"""
+        now = datetime.now(timezone.utc)
+        docs = [(topic_id, txn.get(self.topics_collection, topic_id)) for topic_id in topic_ids]
+        topics = []
+        for topic_id, data in docs:
+            if data is None or data.get("article_generated"):
+                continue
+            if not _lease_available(data, now) and data.get("lease_owner") != worker_id:
+                continue
+            lease = {"lease_owner": worker_id,
+                     "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                     "lease_attempts": (data.get("lease_attempts") or 0) + 1}
+            txn.update(self.topics_collection, topic_id, lease)
+            data.update(lease)
+            data['topic_id'] = topic_id
+            topics.append(MathTopic.from_dict(data))
+        return topics
+
+    def renew_leases(self, topic_ids: Iterable[str], worker_id: str = None,
+                     lease_seconds: int = None) -> Dict[str, bool]:
+        """保持しているリースの期限を延長（ハートビート）。{トピックID: 延長できたか}"""
+        worker_id = worker_id or default_worker_id()
+        lease_seconds = lease_seconds or config.topic_lease_seconds
+        topic_ids = list(topic_ids)
+
+        def renew(txn: Transaction) -> Dict[str, bool]:
+            now = datetime.now(timezone.utc)
+            docs = [(topic_id, txn.get(self.topics_collection, topic_id, fields=LEASE_FIELDS))
+                    for topic_id in topic_ids]
+            renewed = {}
+            for topic_id, data in docs:
+                # 期限切れでも、まだ他のワーカーに取られていなければ延長できる
+                renewed[topic_id] = data is not None and data.get("lease_owner") == worker_id
+                if renewed[topic_id]:
+                    txn.update(self.topics_collection, topic_id,
+                               {"lease_expires_at": now + timedelta(seconds=lease_seconds)})
+            return renewed
+
+        renewed = self.backend.run_transaction(renew)
+        lost = [topic_id for topic_id, ok in renewed.items() if not ok]
+        if lost:
+            logger.warning(f"リースを失ったトピック: {', '.join(lost)}")
+        return renewed
+
+    def release_topics(self, topic_ids: Iterable[str], worker_id: str = None):
+        """保持しているリースを解放（生成に失敗したトピックを他のワーカーに戻す）"""
+        worker_id = worker_id or default_worker_id()
+        topic_ids = list(topic_ids)
+
+        def release(txn: Transaction):
+            docs = [(topic_id, txn.get(self.topics_collection, topic_id, fields=LEASE_FIELDS))
+                    for topic_id in topic_ids]
+            for topic_id, data in docs:
+                if data is not None and data.get("lease_owner") == worker_id:
+                    txn.update(self.topics_collection, topic_id,
+                               {"lease_owner": None, "lease_expires_at": None})
+
+        self.backend.run_transaction(release)
+        self.cache.invalidate(*(f"topic:{topic_id}" for topic_id in topic_ids))
+
     def update_topic_status(self, topic_id: str, generated: bool, article_slug: str = None):
         """トピックの生成ステータスを更新"""
         try:
-            doc_ref = self.db.collection(self.topics_collection).document(topic_id)
-            update_data = {"article_generated": generated}
-            if article_slug:
-                update_data["article_slug"] = article_slug
-            doc_ref.update(update_data)
+            self.backend.commit(self._topic_status_ops(topic_id, generated, article_slug))
+            self.cache.invalidate(f"topic:{topic_id}")
             logger.info(f"トピック ID '{topic_id}' のステータスを更新しました。")
         except Exception as e:
             logger.error(f"トピックステータス更新エラー (ID: {topic_id}): {e}")
             raise
 
+    def _topic_status_ops(self, topic_id: str, generated: bool, article_slug: str = None) -> List[WriteOp]:
+        update_data = {"article_generated": generated}
+        if article_slug or not generated:
+            # 未生成に戻すときは記事との対応も外す
+            update_data["article_slug"] = article_slug
+        if generated:
+            # publish_generated_article と同じく、生成済みにしたトピックのリースは終える
+            update_data.update(dict.fromkeys(LEASE_FIELDS))
+        ops = [WriteOp("update", self.topics_collection, topic_id, update_data)]
+        return ops + self._manifest_ops(ops)
+
+    def update_topics_bulk(self, updates: Dict[str, Dict[str, Any]], mode: str = None,
+                           max_retries: int = 3) -> List[BulkResult]:
+        """複数のトピックをまとめて更新（{トピックID: 更新内容}）し、トピックごとの結果を返す"""
+        ops = [WriteOp("update", self.topics_collection, topic_id, data)
+               for topic_id, data in updates.items()]
+        results = [BulkResult(r.op.doc_id, r.error) for r in self._bulk_write(ops, mode, max_retries)]
+        self.cache.invalidate(*(f"topic:{topic_id}" for topic_id in updates))
+        logger.info(f"トピックを一括更新しました: {sum(r.ok for r in results)}/{len(results)}件")
+        return results
+
     def mark_topic_as_generated(self, topic_id: str, article_slug: str):
         """トピックを生成済みとしてマーク（互換性のため）"""
         self.update_topic_status(topic_id, True, article_slug)
-    
+
     # === 統計情報 ===
-    
+
     def get_stats(self) -> Dict[str, Any]:
-        """サイト統計情報を取得"""
-        try:
-            # 記事数
-            articles_count = len(list(self.db.collection(self.articles_collection)
-                                    .where(filter=FieldFilter("status", "==", "published"))
-                                    .stream()))
-            
-            # カテゴリ別記事数
-            categories = {}
-            articles = self.get_all_published_articles()
-            for article in articles:
-                categories[article.category] = categories.get(article.category, 0) + 1
-            
-            return {
-                "total_articles": articles_count,
-                "categories": categories,
-                "last_updated": datetime.now()
-            }
-            
+        """サイト統計情報を取得
+
+        記事数カウンターが有効ならカウンタードキュメント1件の読み取りで、
+        無効なら公開済み件数とカテゴリ別件数の集計クエリ（count()）で求める。
+        """
+        try:
+            return self._read(self._stats_plan())
+
         except Exception as e:
             logger.error(f"統計情報取得エラー: {e}")
             return {}
 
+    def _stats_plan(self) -> Generator[Any, Any, Dict[str, Any]]:
+        categories = None
+        if self.counters_enabled:
+            data = yield Read("get", (self.stats_collection, ARTICLE_COUNTER_DOC, None))
+            categories = _parse_counts(data or {}).get("published")
+        if categories is not None:
+            total = sum(categories.values())
+        else:
+            # 公開済み件数とカテゴリ別件数の集計クエリはまとめて（非同期版では並行して）発行する
+            published = [("status", "==", "published")]
+            mirror = self._use_mirror(self.articles_collection)
+            counts = yield [Read("count", (self.articles_collection, filters), mirror)
+                            for filters in [published] + [published + [("category", "==", category)]
+                                                          for category in CATEGORY_MAP]]
+            total = counts[0]
+            categories = {category: count for category, count in zip(CATEGORY_MAP, counts[1:]) if count}
+
+        return {
+            "total_articles": total,
+            "categories": categories,
+            "last_updated": datetime.now()
+        }
+
+    # === 記事数カウンター ===
+
+    @staticmethod
+    def _counter_deltas(previous: Optional[Dict[str, Any]],
+                        article: Optional[MathArticle]) -> Dict[str, int]:
+        """保存・削除によるカウンターの増減（{"status/category": 増減}）"""
+        deltas: Dict[str, int] = {}
+        if previous is not None:
+            key = f"{previous.get('status', 'draft')}/{previous.get('category', '')}"
+            deltas[key] = deltas.get(key, 0) - 1
+        if article is not None:
+            key = f"{article.status}/{article.category}"
+            deltas[key] = deltas.get(key, 0) + 1
+        return {key: delta for key, delta in deltas.items() if delta}
+
+    def _counter_ops(self, deltas: Dict[str, int]) -> List[WriteOp]:
+        if not self.counters_enabled or not deltas:
+            return []
+        return [WriteOp("increment", self.stats_collection, ARTICLE_COUNTER_DOC, deltas)]
+
+    def get_article_counts(self) -> Dict[str, Dict[str, int]]:
+        """カウンタードキュメントから {status: {category: 件数}} を取得"""
+        return _parse_counts(self.backend.get(self.stats_collection, ARTICLE_COUNTER_DOC) or {})
+
+    def rebuild_article_counters(self) -> Dict[str, Dict[str, int]]:
+        """全記事を走査してカウンタードキュメントを作り直す（カウンター導入時・ずれの修正用）"""
+        totals: Dict[str, int] = {}
+        # ミラーは遅れている可能性があるため、書き込みの元にする走査は本番のバックエンドから読む
+        for doc in self.backend.paginate(self.articles_collection, fields=["status", "category"]):
+            key = f"{doc.data.get('status', 'draft')}/{doc.data.get('category', '')}"
+            totals[key] = totals.get(key, 0) + 1
+        self.backend.set(self.stats_collection, ARTICLE_COUNTER_DOC, totals)
+        logger.info(f"記事数カウンターを再構築しました: {sum(totals.values())}件")
+        return self.get_article_counts()
+
+    def rebuild_feeds(self, feed_ids: Iterable[str] = None) -> Dict[str, int]:
+        """公開済み記事からフィードを作り直す（{フィードID: 公開記事数}）
+
+        feed_ids を省略すると全記事を走査してホームと全カテゴリのフィードを作る（フィード導入時・ずれの修正用）。
+        """
+        if feed_ids is None:
+            # 公開記事の無いカテゴリのフィードも空で上書きする
+            feeds: Dict[str, Dict[str, Any]] = {fid: {"cards": [], "total": 0} for fid in
+                                                [FEED_HOME] + [feed_id(c) for c in CATEGORY_MAP]}
+            for doc in self.backend.paginate(self.articles_collection, [("status", "==", "published")],
+                                             fields=list(FEED_CARD_FIELDS)):
+                card = dict(doc.data, slug=doc.id)
+                for fid in (FEED_HOME, feed_id(card.get("category"))):
+                    feed = feeds.setdefault(fid, {"cards": [], "total": 0})
+                    feed["cards"].append(card)
+                    feed["total"] += 1
+            for feed in feeds.values():
+                feed["cards"] = sorted(feed["cards"], key=_card_time, reverse=True)[:self.feed_size]
+        else:
+            feeds = {}
+            for fid in feed_ids:
+                filters = [("status", "==", "published")]
+                if fid != FEED_HOME:
+                    filters.append(("category", "==", fid[len("category_"):]))
+                docs = self.backend.query(self.articles_collection, filters=filters,
+                                          order_by=[("created_at", DESCENDING)],
+                                          limit=self.feed_size, fields=list(FEED_CARD_FIELDS))
+                feeds[fid] = {"cards": [dict(doc.data, slug=doc.id) for doc in docs],
+                              "total": self.backend.count(self.articles_collection, filters)}
+
+        now = datetime.now()
+        self.backend.bulk_write([WriteOp("set", self.feeds_collection, fid, dict(feed, updated_at=now))
+                                 for fid, feed in feeds.items()])
+        self._invalidate_articles()
+        logger.info(f"記事フィードを再構築しました: {len(feeds)}件")
+        return {fid: feed["total"] for fid, feed in feeds.items()}
+
 # グローバルインスタンス
 firestore_manager = FirestoreManager()
\ No newline at end of file
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - Firestore のローカル SQLite ミラー
+articles / math_topics をローカルの SQLite ファイルに複製し、変更に追従させる
+
+- 初回はコレクション全体を読み込む（ページ単位）
+- 以後は on_snapshot リスナーで変更を反映する（Firestore）
+- リスナーが使えないバックエンドでは updated_at のウォーターマークで差分を取り込む
+  （ウォーターマークの無いコレクションは毎回全体を読み直す。削除は全体の読み直しで反映される）
+
+MIRROR_DB_PATH を設定すると、FirestoreManager は一覧・検索・統計などの読み取り専用クエリを
+ミラーから返す（Firestore の読み取りが発生しない）。最後の同期から MIRROR_MAX_AGE_SECONDS 秒を
+過ぎたコレクションはミラーが止まっているとみなし、同期されるまで本番のバックエンドから読む
+（--watch のリスナーは変更が無くても --interval ごとに同期日時を更新する）。
+
+使い方:
+    python -m scripts.firestore_mirror              # 1回だけ同期
+    python -m scripts.firestore_mirror --watch      # 変更に追従し続ける
+    python -m scripts.firestore_mirror --full       # 全体を読み直す
+"""
+
+import argparse
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from scripts.config import config
+from scripts.storage_backends import (
+    ASCENDING, MAX_BATCH_SIZE, SQLiteBackend, StorageBackend, WriteOp,
+)
+
+logger = logging.getLogger(__name__)
+
+# 同期状態を保存するコレクション（ミラーの SQLite 内のみ）
+MIRROR_STATE_COLLECTION = "_mirror"
+
+MIRROR_MODE_LISTEN = "listen"
+MIRROR_MODE_POLL = "poll"
+
+def mirror_synced_at(local: StorageBackend, collection: str) -> Optional[Any]:
+    """ミラーがコレクションを最後に同期した日時（初回読み込み前なら None）"""
+    state = local.get(MIRROR_STATE_COLLECTION, collection, ["synced_at"])
+    return None if state is None else state.get("synced_at")
+
+def mirror_fresh(synced_at: Any, max_age: float = None) -> bool:
+    """同期日時が max_age 秒（既定: MIRROR_MAX_AGE_SECONDS、0 以下なら無制限）以内か"""
+    max_age = config.mirror_max_age_seconds if max_age is None else max_age
+    if max_age <= 0:
+        return synced_at is not None
+    if not isinstance(synced_at, datetime):
+        return False
+    return (datetime.now() - synced_at).total_seconds() <= max_age
+
+def open_mirror(path: str = None) -> Optional[SQLiteBackend]:
+    """ミラーの SQLite を開く（パスが設定されていなければ None）"""
+    path = path if path is not None else config.mirror_db_path
+    return SQLiteBackend(path) if path else None
+
+class FirestoreMirror:
+    """source のコレクションを local（SQLite）に複製する"""
+
+    def __init__(self, source: StorageBackend, local: SQLiteBackend,
+                 collections: Iterable[str] = None, watermark_fields: Dict[str, str] = None):
+        self.source = source
+        self.local = local
+        self.collections = list(collections or [config.articles_collection, config.math_topics_collection])
+        # 差分取り込みに使う更新日時フィールド（トピックには無いため毎回全体を読む）
+        self.watermark_fields = (watermark_fields if watermark_fields is not None
+                                 else {config.articles_collection: "updated_at"})
+        self._unsubscribes: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    # === 同期状態 ===
+
+    def state(self, collection: str) -> Dict[str, Any]:
+        return self.local.get(MIRROR_STATE_COLLECTION, collection) or {}
+
+    def _state_op(self, collection: str, mode: str, watermark: Any = None, count: int = None) -> WriteOp:
+        state = self.state(collection)
+        state.update({"mode": mode, "synced_at": datetime.now()})
+        if watermark is not None:
+            state["watermark"] = watermark
+        if count is not None:
+            state["loaded_count"] = count
+        return WriteOp("set", MIRROR_STATE_COLLECTION, collection, state)
+
+    # === 全体読み込み・差分取り込み ===
+
+    def load(self, collection: str) -> int:
+        """コレクション全体を読み込み、ミラーを置き換える（件数を返す）"""
+        records = list(self.source.paginate(collection, fields=None))
+        self._replace(collection, [WriteOp("set", collection, r.id, r.data) for r in records],
+                      MIRROR_MODE_POLL, self._max_watermark(collection, (r.data for r in records)))
+        logger.info(f"ミラーに読み込みました: {collection} ({len(records)}件)")
+        return len(records)
+
+    def sync(self, collection: str) -> int:
+        """前回のウォーターマーク以降に更新されたドキュメントを取り込む（件数を返す）"""
+        field = self.watermark_fields.get(collection)
+        watermark = self.state(collection).get("watermark")
+        if field is None or watermark is None:
+            return self.load(collection)
+
+        # 同じ時刻のドキュメントを取りこぼさないよう >= で読み、重複分は上書きする
+        records = list(self.source.paginate(collection, [(field, ">=", watermark)],
+                                            order_by=[(field, ASCENDING)], fields=None))
+        ops = [WriteOp("set", collection, r.id, r.data) for r in records]
+        new_watermark = self._max_watermark(collection, (r.data for r in records)) or watermark
+        for start in range(0, len(ops), MAX_BATCH_SIZE):
+            self.local.commit(ops[start:start + MAX_BATCH_SIZE])
+        self.local.commit([self._state_op(collection, MIRROR_MODE_POLL, new_watermark)])
+        logger.info(f"ミラーを更新しました: {collection} ({len(records)}件)")
+        return len(records)
+
+    def sync_all(self, full: bool = False) -> Dict[str, int]:
+        """全コレクションを同期（full=True なら全体を読み直す）"""
+        return {collection: self.load(collection) if full else self.sync(collection)
+                for collection in self.collections}
+
+    def _max_watermark(self, collection: str, docs: Iterable[Dict[str, Any]]) -> Any:
+        field = self.watermark_fields.get(collection)
+        if field is None:
+            return None
+        values = [data[field] for data in docs if isinstance(data.get(field), datetime)]
+        return max(values) if values else None
+
+    def _replace(self, collection: str, ops: List[WriteOp], mode: str, watermark: Any = None):
+        """ミラーのコレクションを ops の内容で置き換える（1トランザクション）"""
+        keep = {op.doc_id for op in ops}
+        stale = [WriteOp("delete", collection, r.id)
+                 for r in self.local.paginate(collection, fields=[]) if r.id not in keep]
+        with self._lock:
+            self.local.commit(stale + ops + [self._state_op(collection, mode, watermark, len(ops))])
+
+    # === リスナー ===
+
+    def listen(self) -> bool:
+        """全コレクションの変更を購読（リスナーに対応しないバックエンドなら False）"""
+        try:
+            for collection in self.collections:
+                self._unsubscribes.append(self.source.watch(collection, self._on_change_for(collection)))
+        except NotImplementedError:
+            self.stop()
+            return False
+        return True
+
+    def _on_change_for(self, collection: str) -> Callable[[List[WriteOp], bool], None]:
+        def on_change(ops: List[WriteOp], full: bool):
+            try:
+                if full:
+                    self._replace(collection, ops, MIRROR_MODE_LISTEN)
+                    logger.info(f"ミラーに読み込みました: {collection} ({len(ops)}件)")
+                    return
+                with self._lock:
+                    self.local.commit(ops + [self._state_op(collection, MIRROR_MODE_LISTEN)])
+            except Exception as e:
+                # リスナースレッドで例外を投げると購読が止まるため記録だけする
+                logger.error(f"ミラー更新エラー ({collection}): {e}")
+        return on_change
+
+    def heartbeat(self):
+        """リスナーで追従中のコレクションの同期日時を更新する（変更が無くてもミラーが生きていることを示す）"""
+        if not self._unsubscribes:
+            return
+        with self._lock:
+            self.local.commit([self._state_op(collection, MIRROR_MODE_LISTEN)
+                               for collection in self.collections])
+
+    def stop(self):
+        """購読を止める"""
+        for unsubscribe in self._unsubscribes:
+            unsubscribe()
+        self._unsubscribes = []
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """コレクションごとの同期状態と件数"""
+        return {collection: dict(self.state(collection), count=self.local.count(collection))
+                for collection in self.collections}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH Firestore のローカル SQLite ミラー')
+    parser.add_argument('--path', default=None,
+                       help='ミラーの SQLite ファイル (既定: MIRROR_DB_PATH または ./mtmath-mirror.sqlite3)')
+    parser.add_argument('--watch', action='store_true', help='変更に追従し続ける')
+    parser.add_argument('--interval', type=float, default=60.0,
+                       help='差分取り込み・同期日時の更新の間隔（秒、デフォルト: 60）')
+    parser.add_argument('--full', action='store_true', help='全体を読み直す')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from scripts.firestore_manager import firestore_manager
+
+    source = firestore_manager.backend
+    if not source:
+        print("❌ ストレージに接続できません")
+        return False
+    path = args.path or config.mirror_db_path or './mtmath-mirror.sqlite3'
+    mirror = FirestoreMirror(source, SQLiteBackend(path))
+
+    print(f"🪞 Firestore ミラー: {path}")
+    print("=" * 60)
+    if not args.watch:
+        for collection, count in mirror.sync_all(full=args.full).items():
+            print(f"✅ {collection}: {count}件を反映")
+        print(f"\n💡 読み取りをミラーから返すには MIRROR_DB_PATH={path} を設定してください")
+        return
+
+    try:
+        if mirror.listen():
+            print("👂 リスナーで変更を追従中 (Ctrl+C で終了)")
+            while True:
+                time.sleep(args.interval)
+                mirror.heartbeat()
+        print(f"🔁 {args.interval:.0f}秒ごとに差分を取り込み中 (Ctrl+C で終了)")
+        full = args.full
+        while True:
+            mirror.sync_all(full=full)
+            full = False
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        mirror.stop()
+        print("\n⏹️  ミラーを停止しました")
+
+if __name__ == "__main__":
+    main()
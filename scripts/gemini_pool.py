@@ -0,0 +1,199 @@
+"""
+Mt.MATH - Gemini モデルプール
+複数の API キー（プロジェクト）に跨ってリクエストを振り分ける
+
+- round_robin / least_loaded で次に使うキーを選択
+- キーごとに実行中件数・成功/失敗数・429 回数を記録
+- 429（クォータ超過）を返したキーは一定時間隔離し、別のキーで再試行
+
+GenerativeModel と同じ generate_content() を持つので、
+TopicSelector / ArticleGenerator からはそのまま config.gemini_model として使える。
+
+google-generativeai の API キーは genai.configure() によるプロセス全体の設定のため、
+キーごとの呼び出し（KeyedModel）はキーの切り替えと呼び出しをロックで直列化する。
+複数プロセスで並列に生成する場合は、プロセスごとに並行して呼び出される。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_LOADED = "least_loaded"
+
+# 連続 429 時の隔離時間の上限（秒）
+MAX_QUARANTINE_SECONDS = 15 * 60
+
+@dataclass
+class KeyState:
+    """1つの API キーの利用状況"""
+    label: str
+    model: Any
+    in_flight: int = 0
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    consecutive_rate_limits: int = 0
+    quarantined_until: float = 0.0
+    last_error: Optional[str] = None
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.quarantined_until
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED 系のエラーか判定（例外の型かステータスコードのみで判定する）"""
+    from google.api_core.exceptions import ResourceExhausted
+
+    if isinstance(error, ResourceExhausted):
+        return True
+    code = getattr(error, "code", None)
+    return code == 429 or getattr(code, "value", None) == 429
+
+def mask_api_key(api_key: str) -> str:
+    """ログ表示用に API キーを伏せる"""
+    return f"...{api_key[-4:]}" if len(api_key) > 4 else "****"
+
+# genai.configure() で最後に設定したキー（同じキーが続く間はクライアントを使い回す）
+_configure_lock = threading.Lock()
+_configured_key: Optional[str] = None
+
+class KeyedModel:
+    """1つの API キーで GenerativeModel を呼び出すモデル"""
+
+    def __init__(self, api_key: str, model_name: str):
+        self.api_key = api_key
+        self.model_name = model_name
+
+    def generate_content(self, *args, **kwargs):
+        """このキーを genai.configure() で設定してから generate_content を実行"""
+        global _configured_key
+        import google.generativeai as genai
+
+        with _configure_lock:
+            if _configured_key != self.api_key:
+                genai.configure(api_key=self.api_key)
+                _configured_key = self.api_key
+            return genai.GenerativeModel(self.model_name).generate_content(*args, **kwargs)
+
+class GeminiModelPool:
+    """複数キーの GenerativeModel を束ねるプール"""
+
+    def __init__(self, models: List[Tuple[str, Any]], strategy: str = ROUND_ROBIN,
+                 quarantine_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        if not models:
+            raise ValueError("Gemini モデルが1つも指定されていません")
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f"未知の振り分け方式です: {strategy}")
+
+        self.states = [KeyState(label=label, model=model) for label, model in models]
+        self.strategy = strategy
+        self.quarantine_seconds = quarantine_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next_index = 0
+
+    @classmethod
+    def from_api_keys(cls, api_keys: List[Tuple[str, str]], model_name: str,
+                      **kwargs) -> 'GeminiModelPool':
+        """(ラベル, APIキー) のリストからプールを構築"""
+        models = [(label, KeyedModel(api_key, model_name)) for label, api_key in api_keys]
+        return cls(models, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    # === キー選択 ===
+
+    def _acquire(self) -> Tuple[Optional[KeyState], float]:
+        """利用可能なキーを1つ確保する。全て隔離中なら (None, 最短の解除時刻) を返す"""
+        with self._lock:
+            now = self._clock()
+            available = [s for s in self.states if s.is_available(now)]
+            if not available:
+                return None, min(s.quarantined_until for s in self.states)
+
+            if self.strategy == LEAST_LOADED:
+                state = min(available, key=lambda s: (s.in_flight, s.requests))
+            else:
+                count = len(self.states)
+                for offset in range(count):
+                    candidate = self.states[(self._next_index + offset) % count]
+                    if candidate.is_available(now):
+                        state = candidate
+                        self._next_index = (self._next_index + offset + 1) % count
+                        break
+
+            state.in_flight += 1
+            state.requests += 1
+            return state, now
+
+    def _release(self, state: KeyState, error: Exception = None):
+        with self._lock:
+            state.in_flight -= 1
+            if error is None:
+                state.successes += 1
+                state.consecutive_rate_limits = 0
+                return
+
+            state.failures += 1
+            state.last_error = str(error)
+            if is_rate_limit_error(error):
+                state.rate_limited += 1
+                state.consecutive_rate_limits += 1
+                duration = min(self.quarantine_seconds * 2 ** (state.consecutive_rate_limits - 1),
+                               MAX_QUARANTINE_SECONDS)
+                state.quarantined_until = self._clock() + duration
+                logger.warning(f"Gemini キー {state.label} を {duration:.0f}秒間隔離します (429)")
+
+    # === GenerativeModel 互換API ===
+
+    def generate_content(self, *args, **kwargs):
+        """空いているキーで generate_content を実行（429 は別キーで再試行）"""
+        last_error = None
+        for _ in range(len(self.states) * 2):
+            state, available_at = self._acquire()
+            if state is None:
+                wait = available_at - self._clock()
+                if wait > self.quarantine_seconds:
+                    break
+                logger.info(f"全ての Gemini キーが隔離中です。{wait:.1f}秒待機します")
+                time.sleep(max(wait, 0))
+                continue
+
+            try:
+                response = state.model.generate_content(*args, **kwargs)
+            except Exception as e:
+                self._release(state, e)
+                if not is_rate_limit_error(e):
+                    raise
+                last_error = e
+                continue
+
+            self._release(state)
+            return response
+
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError("利用可能な Gemini キーがありません（全てクォータ超過で隔離中）")
+
+    # === 状態確認 ===
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """キーごとの利用状況を返す"""
+        with self._lock:
+            now = self._clock()
+            return [{
+                "label": s.label,
+                "in_flight": s.in_flight,
+                "requests": s.requests,
+                "successes": s.successes,
+                "failures": s.failures,
+                "rate_limited": s.rate_limited,
+                "quarantined_for": max(0.0, s.quarantined_until - now),
+                "last_error": s.last_error,
+            } for s in self.states]
@@ -4,7 +4,7 @@ Firestoreのトピックデータを詳細調査
 """
 
 import logging
-from scripts.config import config
+from scripts.firestore_manager import firestore_manager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,13 +16,13 @@ def inspect_firestore_topics():
     print("=" * 60)
     
     try:
-        topics_ref = config.db.collection(config.math_topics_collection)
-        topics = topics_ref.stream()
+        # MIRROR_DB_PATH が設定されていればローカルミラーから読む
+        topics = firestore_manager.iter_topics()
         
         problem_found = False
         
         for doc in topics:
-            data = doc.to_dict()
+            data = doc.data
             doc_id = doc.id
             
             print(f"\n📄 ドキュメントID: {doc_id}")
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - マニフェストによる差分同期（Merkle ハッシュ）
+Firestore とローカルのスナップショット（SQLite）の間で、変更のあった記事・トピックだけを転送する
+
+マニフェストはどちらの側にも同じ形で置く:
+- {SYNC_MANIFEST_COLLECTION}/{コレクション}:           {バケット: バケットのルートハッシュ}（作成・同期時に更新）
+- {SYNC_MANIFEST_COLLECTION}/{コレクション}/buckets/{バケット}: {ドキュメントID: 内容ハッシュ}
+  （変更ありのエントリが残っている間は _DIRTY: true）
+
+バケットはドキュメントIDのハッシュの先頭 SYNC_BUCKET_DIGITS 桁（16進）。
+SYNC_MANIFEST=true の FirestoreManager は書き込むドキュメントを「変更あり」（"~" で始まるトークン）
+としてバケットに記録し、バケットに変更ありのフラグを立てる。書き込みはルートのドキュメントに触れないため、
+1つのドキュメントに書き込みが集中しない。同期時はルートのドキュメントと変更ありのバケットの一覧から
+ルートを求め、ルートの異なる（または変更ありの）バケットだけを読み、変更ありのドキュメントのハッシュを
+計算し直して、ハッシュの異なるドキュメントだけを転送する。
+転送量・読み取り数はコーパスの大きさではなく変更の数に比例する。
+転送はドキュメントごとの書き込み（記事は本文を含む）を分けずに500件以内のバッチへまとめて書き込む。
+マニフェストの作り直し（init）中に書き込みで記録された変更ありのエントリは残すため、書き込みを止めずに実行できる。
+
+split レイアウトの記事は本文（article_bodies とチャンク）も一緒に転送する。
+トピックのリース（lease_owner など）の更新は記録しない（一時的な情報のため）。
+
+使い方:
+    python -m scripts.merkle_sync init            # Firestore 側のマニフェストを作成（初回のみ全件読み取り）
+    python -m scripts.merkle_sync pull            # Firestore → ローカル（バックアップ・ステージング更新）
+    python -m scripts.merkle_sync push            # ローカル → Firestore（リストア）
+    python -m scripts.merkle_sync status          # 異なるバケット数を表示
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from scripts.config import config
+from scripts.storage_backends import (
+    SQLiteBackend, StorageBackend, Transaction, WriteOp, generate_document_id, grouped_write,
+)
+
+logger = logging.getLogger(__name__)
+
+# 「変更あり（ハッシュ未計算）」を表すエントリの接頭辞
+DIRTY_PREFIX = "~"
+# 変更ありのエントリを含むバケットのフラグ（記事のスラッグは小文字、トピックのIDは "_" を含まないため衝突しない）
+DIRTY_FIELD = "_DIRTY"
+
+def _canonical(value: Any) -> Any:
+    """ハッシュ計算用の正規形（日時は UTC に揃え、naive な日時は UTC とみなす。Firestore と同じ扱い）"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return {"$datetime": value.astimezone(timezone.utc).isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bytes": base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+def document_hash(data: Dict[str, Any]) -> str:
+    """ドキュメント内容のハッシュ（保存先に依存しない）"""
+    text = json.dumps(_canonical(data), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+def bucket_of(doc_id: str, digits: int) -> str:
+    """ドキュメントIDの属するバケット"""
+    return hashlib.sha1(doc_id.encode('utf-8')).hexdigest()[:digits]
+
+def bucket_root(entries: Dict[str, Optional[str]]) -> Optional[str]:
+    """バケットのルートハッシュ（変更ありのエントリが残っていれば None）"""
+    digest = hashlib.sha256()
+    for doc_id, value in sorted(entries.items()):
+        if value is None:
+            continue
+        if value.startswith(DIRTY_PREFIX):
+            return None
+        digest.update(f"{doc_id}:{value}\n".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+def buckets_collection(manifest_collection: str, collection: str) -> str:
+    return f"{manifest_collection}/{collection}/buckets"
+
+def bucket_entries(doc: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """バケットのドキュメントのエントリ（変更ありのフラグを除く）"""
+    return {doc_id: value for doc_id, value in (doc or {}).items() if doc_id != DIRTY_FIELD}
+
+def manifest_ops(ops: Iterable[WriteOp], collections: Iterable[str], manifest_collection: str,
+                 digits: int) -> List[WriteOp]:
+    """ops で書き込むドキュメントを変更ありとして記録する書き込み（バケットごとに1件）"""
+    collections = set(collections)
+    token = DIRTY_PREFIX + generate_document_id()
+    marks: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for op in ops:
+        if op.collection in collections:
+            marks.setdefault((op.collection, bucket_of(op.doc_id, digits)), {DIRTY_FIELD: True})[op.doc_id] = token
+    return [WriteOp("merge", buckets_collection(manifest_collection, collection), bucket, entries)
+            for (collection, bucket), entries in marks.items()]
+
+class MerkleSync:
+    """remote（Firestore）と local（SQLite スナップショット）をマニフェストで差分同期する"""
+
+    def __init__(self, remote: StorageBackend, local: StorageBackend, manager,
+                 collections: Iterable[str] = None):
+        self.remote = remote
+        self.local = local
+        self.manager = manager
+        self.collections = list(collections or [manager.articles_collection, manager.topics_collection])
+        self.manifest_collection = config.sync_manifest_collection
+        self.digits = config.sync_bucket_digits
+
+    # === マニフェスト ===
+
+    def all_buckets(self) -> List[str]:
+        return [format(i, f"0{self.digits}x") for i in range(16 ** self.digits)]
+
+    def roots(self, backend: StorageBackend, collection: str) -> Optional[Dict[str, Optional[str]]]:
+        """{バケット: ルート}（init で作成されたマニフェストが無ければ None）
+
+        変更ありのバケットのルートは未計算（None）とする。読み取りは1件 + 変更ありのバケット数。
+        """
+        roots = backend.get(self.manifest_collection, collection)
+        if roots is None or any(bucket not in roots for bucket in self.all_buckets()):
+            return None
+        for record in backend.paginate(buckets_collection(self.manifest_collection, collection),
+                                       [(DIRTY_FIELD, "==", True)], fields=[]):
+            roots[record.id] = None
+        return roots
+
+    def _write_roots(self, backend: StorageBackend, collection: str, roots: Dict[str, Optional[str]]):
+        """同期・作成で計算し直したバケットのルートをルートのドキュメントに書き込む"""
+        if roots:
+            backend.commit([WriteOp("merge", self.manifest_collection, collection, roots)])
+
+    def rebuild(self, backend: StorageBackend, collection: str) -> int:
+        """全ドキュメントを読んでマニフェストを作り直す（件数を返す）
+
+        走査の前に読んだエントリと異なる変更ありのエントリは走査中の書き込み（SYNC_MANIFEST）で
+        記録されたものなので、ハッシュで上書きせずに残す（次の同期でハッシュを計算し直す）。
+        """
+        manifests = buckets_collection(self.manifest_collection, collection)
+        all_buckets = self.all_buckets()
+        before = dict(zip(all_buckets, map(bucket_entries, backend.get_many(manifests, all_buckets))))
+        buckets: Dict[str, Dict[str, str]] = {}
+        count = 0
+        for doc in backend.paginate(collection, fields=None):
+            buckets.setdefault(bucket_of(doc.id, self.digits), {})[doc.id] = document_hash(doc.data)
+            count += 1
+        roots = {bucket: self._replace_bucket(backend, collection, bucket, buckets.get(bucket, {}), before[bucket])
+                 for bucket in all_buckets}
+        backend.set(self.manifest_collection, collection, roots)
+        logger.info(f"マニフェストを作成しました: {collection} ({count}件, {len(buckets)}バケット)")
+        return count
+
+    def _replace_bucket(self, backend: StorageBackend, collection: str, bucket: str,
+                        hashes: Dict[str, str], before: Dict[str, Optional[str]]) -> Optional[str]:
+        """バケットのエントリを hashes に置き換えてルートを返す（before に無い変更ありのエントリは残す）"""
+        def replace(txn: Transaction) -> Optional[str]:
+            current = txn.get(buckets_collection(self.manifest_collection, collection), bucket)
+            entries = dict(hashes)
+            for doc_id, value in bucket_entries(current).items():
+                if value and value.startswith(DIRTY_PREFIX) and before.get(doc_id) != value:
+                    entries[doc_id] = value
+            return self._write_bucket(txn, collection, bucket, entries, current is not None)
+
+        return backend.run_transaction(replace)
+
+    def _write_bucket(self, txn: Transaction, collection: str, bucket: str,
+                      entries: Dict[str, str], exists: bool) -> Optional[str]:
+        """バケットのエントリを書き込み、ルートを返す（変更ありのエントリが残っていればフラグを立てたままにする）"""
+        manifests = buckets_collection(self.manifest_collection, collection)
+        root = bucket_root(entries)
+        if entries:
+            txn.set(manifests, bucket, entries if root is not None else dict(entries, **{DIRTY_FIELD: True}))
+        elif exists:
+            txn.delete(manifests, bucket)
+        return root
+
+    def changed_buckets(self, source_roots: Dict[str, Optional[str]],
+                        target_roots: Dict[str, Optional[str]]) -> List[str]:
+        """ルートの異なる（またはどちらかが未計算の）バケット"""
+        return sorted(bucket for bucket in set(source_roots) | set(target_roots)
+                      if source_roots.get(bucket) is None or source_roots.get(bucket) != target_roots.get(bucket))
+
+    def _resolve(self, backend: StorageBackend, collection: str, entries: Dict[str, Optional[str]],
+                 docs: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """エントリの変更ありトークンを実際のハッシュに置き換えた {ドキュメントID: ハッシュ}"""
+        resolved = {doc_id: value for doc_id, value in entries.items()
+                    if value is not None and not value.startswith(DIRTY_PREFIX)}
+        dirty = [doc_id for doc_id, value in entries.items() if value and value.startswith(DIRTY_PREFIX)]
+        for doc_id, data in zip(dirty, backend.get_many(collection, dirty) if dirty else []):
+            if data is not None:
+                resolved[doc_id] = document_hash(data)
+                docs[doc_id] = data
+        return resolved
+
+    def _settle(self, backend: StorageBackend, collection: str, bucket: str,
+                updates: Dict[str, Tuple[Optional[str], Optional[str]]]) -> Optional[str]:
+        """バケットのエントリを {ドキュメントID: (同期前の値, 新しいハッシュ)} で更新し、ルートを返す
+
+        同期中に書き込まれた（値が変わった）エントリは変更ありのまま残す。
+        """
+        def settle(txn: Transaction) -> Optional[str]:
+            current = txn.get(buckets_collection(self.manifest_collection, collection), bucket)
+            entries = bucket_entries(current)
+            for doc_id, (expected, new) in updates.items():
+                if entries.get(doc_id) != expected:
+                    continue
+                if new is None:
+                    entries.pop(doc_id, None)
+                else:
+                    entries[doc_id] = new
+            return self._write_bucket(txn, collection, bucket, entries, current is not None)
+
+        return backend.run_transaction(settle)
+
+    # === 同期 ===
+
+    def pull(self, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+        """remote → local"""
+        return {c: self._sync(self.remote, self.local, c, dry_run) for c in self.collections}
+
+    def push(self, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+        """local → remote"""
+        return {c: self._sync(self.local, self.remote, c, dry_run) for c in self.collections}
+
+    def _sync(self, source: StorageBackend, target: StorageBackend, collection: str,
+              dry_run: bool) -> Dict[str, int]:
+        """source の内容に target を合わせる（ハッシュの異なるドキュメントだけを書き込む・削除する）"""
+        result = {"buckets": 0, "copied": 0, "deleted": 0, "failed": 0}
+        source_roots = self._roots_or_rebuild(source, collection)
+        target_roots = self._roots_or_rebuild(target, collection)
+        changed = self.changed_buckets(source_roots, target_roots)
+        result["buckets"] = len(changed)
+        if not changed:
+            return result
+
+        manifests = buckets_collection(self.manifest_collection, collection)
+        source_buckets = source.get_many(manifests, changed)
+        target_buckets = target.get_many(manifests, changed)
+        transfers = []
+        for bucket, source_entries, target_entries in zip(changed, source_buckets, target_buckets):
+            source_entries, target_entries = bucket_entries(source_entries), bucket_entries(target_entries)
+            docs: Dict[str, Dict[str, Any]] = {}
+            source_hashes = self._resolve(source, collection, source_entries, docs)
+            target_hashes = self._resolve(target, collection, target_entries, {})
+            diff = sorted(doc_id for doc_id in set(source_hashes) | set(target_hashes)
+                          if source_hashes.get(doc_id) != target_hashes.get(doc_id))
+
+            missing = [doc_id for doc_id in diff if doc_id in source_hashes and doc_id not in docs]
+            for doc_id, data in zip(missing, source.get_many(collection, missing) if missing else []):
+                if data is not None:
+                    docs[doc_id] = data
+                else:
+                    # マニフェストの記録後に削除されていた
+                    source_hashes.pop(doc_id, None)
+            copied = [doc_id for doc_id in diff if doc_id in docs]
+            deleted = [doc_id for doc_id in diff if doc_id not in source_hashes]
+            result["copied"] += len(copied)
+            result["deleted"] += len(deleted)
+            if not dry_run:
+                transfers.append((bucket, source_entries, target_entries, source_hashes, diff, docs))
+        if dry_run:
+            return result
+
+        # 全バケットの転送を、ドキュメントごとの書き込み（記事は本文を含む）を分けずにまとめて書き込む
+        doc_ids = [doc_id for _, _, _, _, diff, _ in transfers for doc_id in diff]
+        previous = dict(zip(doc_ids, target.get_many(collection, doc_ids, ["body_chunks"]) if doc_ids else []))
+        groups = [self._transfer_ops(source, collection, doc_id, docs.get(doc_id), previous[doc_id])
+                  for _, _, _, _, diff, docs in transfers for doc_id in diff]
+        failed = {doc_id for doc_id, error in zip(doc_ids, grouped_write(target, groups)) if error is not None}
+        for doc_id in sorted(failed):
+            logger.error(f"転送エラー: {collection}/{doc_id}")
+        result["failed"] = len(failed)
+
+        target_roots, source_roots = {}, {}
+        for bucket, source_entries, target_entries, source_hashes, diff, _ in transfers:
+            # target は source と同じ内容になったので、エントリも source のハッシュに揃える
+            # （転送に失敗したドキュメントのエントリは元のままにして、次の同期で再び転送する）
+            target_roots[bucket] = self._settle(target, collection, bucket, {
+                doc_id: (target_entries.get(doc_id), source_hashes.get(doc_id))
+                for doc_id in (set(diff) | set(target_entries)) - failed})
+            source_roots[bucket] = self._settle(source, collection, bucket, {
+                doc_id: (source_entries.get(doc_id), source_hashes.get(doc_id))
+                for doc_id, value in source_entries.items() if value and value.startswith(DIRTY_PREFIX)})
+        # ルートのドキュメントは同期ごとに1回だけ書き込む（後から変更ありになったバケットはフラグが優先される）
+        self._write_roots(target, collection, target_roots)
+        self._write_roots(source, collection, source_roots)
+        logger.info(f"同期しました: {collection} (バケット {result['buckets']}, "
+                    f"転送 {result['copied']}件, 削除 {result['deleted']}件, 失敗 {result['failed']}件)")
+        return result
+
+    def _roots_or_rebuild(self, backend: StorageBackend, collection: str) -> Dict[str, Optional[str]]:
+        roots = self.roots(backend, collection)
+        if roots is None:
+            if backend is not self.local:
+                raise ValueError(f"マニフェストがありません: {collection}（先に init を実行してください）")
+            # ローカル側は読み取りが無料なのでその場で作る
+            self.rebuild(backend, collection)
+            roots = self.roots(backend, collection)
+        return roots
+
+    def _transfer_ops(self, source: StorageBackend, collection: str, doc_id: str,
+                      data: Optional[Dict[str, Any]], previous: Optional[Dict[str, Any]]) -> List[WriteOp]:
+        """1ドキュメントを target に書き込む（data が None なら削除）操作。記事は本文も含める"""
+        ops = [WriteOp("set", collection, doc_id, data) if data is not None
+               else WriteOp("delete", collection, doc_id)]
+        if collection != self.manager.articles_collection:
+            return ops
+        stale = self._body_refs(doc_id, previous)
+        for body_collection, body_id in self._body_refs(doc_id, data):
+            body = source.get(body_collection, body_id)
+            if body is not None:
+                ops.insert(0, WriteOp("set", body_collection, body_id, body))
+                stale.discard((body_collection, body_id))
+        ops += [WriteOp("delete", body_collection, body_id) for body_collection, body_id in sorted(stale)]
+        return ops
+
+    def _body_refs(self, slug: str, data: Optional[Dict[str, Any]]) -> set:
+        """split レイアウトの記事本文ドキュメント {(コレクション, ID)}"""
+        if not data or "body_chunks" not in data:
+            return set()
+        refs = {(self.manager.bodies_collection, slug)}
+        refs.update((self.manager._chunks_collection(slug), str(i)) for i in range(1, data["body_chunks"] or 1))
+        return refs
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """コレクションごとの異なるバケット数（マニフェストのルートのみを比較）"""
+        status = {}
+        for collection in self.collections:
+            remote_roots = self.roots(self.remote, collection)
+            local_roots = self.roots(self.local, collection)
+            status[collection] = {
+                "remote_manifest": remote_roots is not None,
+                "local_manifest": local_roots is not None,
+                "changed_buckets": (len(self.changed_buckets(remote_roots, local_roots))
+                                    if remote_roots is not None and local_roots is not None else None),
+            }
+        return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH マニフェストによる差分同期')
+    parser.add_argument('action', choices=['init', 'pull', 'push', 'status'],
+                       help='init: Firestore 側のマニフェスト作成 / pull: Firestore → ローカル / '
+                            'push: ローカル → Firestore / status: 差分の確認')
+    parser.add_argument('--path', default=None,
+                       help='ローカルスナップショットの SQLite ファイル (既定: SYNC_SNAPSHOT_PATH)')
+    parser.add_argument('--dry-run', action='store_true', help='書き込まずに転送件数だけ表示する')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from scripts.firestore_manager import firestore_manager
+
+    remote = firestore_manager.backend
+    if not remote:
+        print("❌ ストレージに接続できません")
+        return False
+    path = args.path or config.sync_snapshot_path
+    if isinstance(remote, SQLiteBackend) and os.path.abspath(remote.path) == os.path.abspath(path):
+        print("❌ 同期元と同期先が同じファイルです")
+        return False
+    sync = MerkleSync(remote, SQLiteBackend(path), firestore_manager)
+
+    print(f"🔄 差分同期 ({args.action}): {path}")
+    print("=" * 60)
+    if args.action == 'init':
+        for collection in sync.collections:
+            print(f"✅ {collection}: {sync.rebuild(remote, collection)}件のマニフェストを作成")
+        if not config.sync_manifest:
+            print("\n💡 書き込み時に変更を記録するには SYNC_MANIFEST=true を設定してください")
+        return
+    if args.action == 'status':
+        for collection, state in sync.status().items():
+            if state["changed_buckets"] is None:
+                print(f"⚠️  {collection}: マニフェストがありません "
+                      f"(Firestore: {'あり' if state['remote_manifest'] else 'なし'}, "
+                      f"ローカル: {'あり' if state['local_manifest'] else 'なし'})")
+            else:
+                print(f"📊 {collection}: 異なるバケット {state['changed_buckets']}件")
+        return
+
+    try:
+        results = sync.pull(args.dry_run) if args.action == 'pull' else sync.push(args.dry_run)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    for collection, result in results.items():
+        print(f"✅ {collection}: バケット {result['buckets']}件を比較, "
+              f"{'転送対象' if args.dry_run else '転送'} {result['copied']}件, 削除 {result['deleted']}件")
+        if result["failed"]:
+            print(f"❌ {collection}: 転送失敗 {result['failed']}件（次回の同期で再試行されます）")
+
+if __name__ == "__main__":
+    main()
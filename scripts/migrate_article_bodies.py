@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - 記事本文の保存レイアウト移行
+articles に同居している本文を article_bodies に分離する（--to split）、
+または分離した本文を articles に戻す（--to inline）
+
+使い方:
+    python -m scripts.migrate_article_bodies --to split --dry-run
+    python -m scripts.migrate_article_bodies --to split
+"""
+
+import argparse
+import logging
+
+from scripts.firestore_manager import (
+    BODY_LAYOUT_INLINE, BODY_LAYOUT_SPLIT, FirestoreManager, firestore_manager,
+)
+from scripts.storage_backends import WriteOp
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def migrate(manager: FirestoreManager, target: str, dry_run: bool = False) -> dict:
+    """全記事を target レイアウトに書き換え、件数を返す"""
+    backend = manager.backend
+    result = {"migrated": 0, "skipped": 0, "failed": 0}
+
+    # 読んだ記事をそのまま書き戻すため、ミラーではなく本番のバックエンドから読む
+    for doc in backend.paginate(manager.articles_collection, fields=None):
+        current = doc.data.get("body_layout", BODY_LAYOUT_INLINE)
+        if current == target:
+            result["skipped"] += 1
+            continue
+        if dry_run:
+            result["migrated"] += 1
+            continue
+        try:
+            body_chunks = doc.data.get("body_chunks") or 1
+            article = manager._article_from_document(doc.data, doc.id)
+            # 本文を先に書き、最後にメタデータを差し替える（updated_at は変更しない）
+            writes = manager._article_writes(article, layout=target)
+            marks = manager._manifest_ops([WriteOp("set", c, i, d) for c, i, d in writes])
+            if marks:
+                backend.commit(marks)
+            for collection, doc_id, data in writes:
+                backend.set(collection, doc_id, data)
+            if target == BODY_LAYOUT_INLINE:
+                for i in range(1, body_chunks):
+                    backend.delete(manager._chunks_collection(doc.id), str(i))
+                backend.delete(manager.bodies_collection, doc.id)
+            result["migrated"] += 1
+        except Exception as e:
+            logger.error(f"移行エラー ({doc.id}): {e}")
+            result["failed"] += 1
+
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH 記事本文の保存レイアウト移行')
+    parser.add_argument('--to', choices=[BODY_LAYOUT_SPLIT, BODY_LAYOUT_INLINE], default=BODY_LAYOUT_SPLIT,
+                       help='移行先のレイアウト (デフォルト: split)')
+    parser.add_argument('--dry-run', action='store_true', help='書き込まずに対象件数だけ表示する')
+    args = parser.parse_args(argv)
+
+    if not firestore_manager.backend:
+        print("❌ ストレージに接続できません")
+        return False
+
+    print(f"📦 記事本文の移行: → {args.to}{' (dry-run)' if args.dry_run else ''}")
+    print("=" * 60)
+    result = migrate(firestore_manager, args.to, dry_run=args.dry_run)
+    print(f"✅ 移行{'対象' if args.dry_run else '完了'}: {result['migrated']}件")
+    print(f"⏭️  移行済み: {result['skipped']}件")
+    if result["failed"]:
+        print(f"❌ 失敗: {result['failed']}件")
+        return False
+    print(f"\n💡 新規保存を {args.to} にするには ARTICLE_BODY_LAYOUT={args.to} を設定してください")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Mt.MATH - 読み取りキャッシュ
+FirestoreManager の読み取り結果をプロセス内に保持する LRU + TTL キャッシュ
+
+キーはクエリの形（("category", "algebra", 20, False) など）で、各エントリにタグ
+（"article:{slug}"、"articles" など）を付けておき、書き込み時にタグ単位で無効化する。
+キャッシュした MathArticle / MathTopic は呼び出し側と共有されるため、変更しないこと。
+他のプロセスの書き込みは TTL が切れるまで見えないため、既定では無効（READ_CACHE_MAX_ENTRIES=0）。
+
+    cache = ReadCache(max_entries=1024, ttls={"article": 300, "list": 60})
+    cache.put(("article", slug), article, kind="article", tags=[f"article:{slug}"])
+    cache.get(("article", slug))
+    cache.invalidate("articles")
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Set, Tuple
+
+# 見つからなかったことを表す値（None をキャッシュできるようにする）
+MISS = object()
+
+class CacheEntry(NamedTuple):
+    value: Any
+    expires_at: float
+    tags: Tuple[str, ...]
+
+def parse_ttls(text: str) -> Dict[str, float]:
+    """"article=300,list=60" 形式の文字列を {種別: 秒} に変換"""
+    ttls = {}
+    for item in (text or "").split(","):
+        if "=" in item:
+            kind, seconds = item.split("=", 1)
+            ttls[kind.strip()] = float(seconds)
+    return ttls
+
+class ReadCache:
+    """サイズ上限付き LRU + 種別ごとの TTL キャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 60.0,
+                 ttls: Dict[str, float] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0  # invalidate() の回数（読み込み中に無効化された結果を保存しない）
+
+    @classmethod
+    def from_config(cls) -> 'ReadCache':
+        from scripts.config import config
+        return cls(config.read_cache_max_entries, config.read_cache_ttl,
+                   parse_ttls(config.read_cache_ttls))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Any:
+        """キャッシュされた値（無い・期限切れなら MISS）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return MISS
+
+    def put(self, key: Hashable, value: Any, kind: str = None, tags: Iterable[str] = ()):
+        """値を保存（kind ごとの TTL を適用し、上限を超えたら最も古いものから捨てる）"""
+        if not self.enabled:
+            return
+        ttl = self.ttls.get(kind, self.default_ttl)
+        if ttl <= 0:
+            return
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, self.clock() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], kind: str = None,
+                    tags: Iterable[str] = ()) -> Any:
+        """キャッシュに無ければ loader() で読み込んで保存"""
+        value = self.get(key)
+        if value is MISS:
+            generation = self._generation
+            value = loader()
+            with self._lock:
+                if generation == self._generation:
+                    self.put(key, value, kind, tags)
+        return value
+
+    def invalidate(self, *tags: str):
+        """タグの付いたエントリを削除"""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミス・追い出し件数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
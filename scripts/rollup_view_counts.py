@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Mt.MATH - 閲覧数の集計
+view_counter_shards のシャードに分散して加算された閲覧数を articles の view_count にまとめ、
+その増分で人気記事ランキング（feeds/trending）を更新する
+
+使い方:
+    python -m scripts.rollup_view_counts                   # 1回だけ集計
+    python -m scripts.rollup_view_counts --watch           # 定期的に集計し続ける
+    python -m scripts.rollup_view_counts --watch --interval 300
+"""
+
+import argparse
+import logging
+import time
+
+from scripts.firestore_manager import firestore_manager
+from scripts.trending import TrendingRanking
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mt.MATH 閲覧数の集計')
+    parser.add_argument('--watch', action='store_true', help='定期的に集計し続ける')
+    parser.add_argument('--interval', type=float, default=600.0,
+                       help='--watch の集計間隔（秒、デフォルト: 600）')
+    parser.add_argument('--no-trending', action='store_true', help='人気記事ランキングを更新しない')
+    args = parser.parse_args(argv)
+
+    if not firestore_manager.backend:
+        print("❌ ストレージに接続できません")
+        return False
+
+    print("👀 閲覧数の集計")
+    print("=" * 60)
+    ranking = None if args.no_trending else TrendingRanking(firestore_manager)
+    try:
+        while True:
+            totals = firestore_manager.rollup_view_counts(trending=ranking is not None)
+            print(f"✅ {len(totals)}記事に {sum(totals.values())}回の閲覧を反映")
+            if ranking is not None:
+                # ランキングの増分は集計と同じコミットで記録した未反映分（失敗した回の分を含む）から計算する
+                trending = ranking.update()
+                print(f"🔥 人気記事ランキング: {len(trending['cards'])}件 / {len(trending['categories'])}カテゴリ")
+            if not args.watch:
+                return
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n⏹️  集計を停止しました")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Mt.MATH - 記事の全文検索インデックス
+タイトル・概要・タグ・本文（HTML タグを除去）の転置インデックスを作り、BM25 で順位付けする
+
+- トークン: 日本語（ひらがな・カタカナ・漢字）は文字 bigram、英数字は単語単位（NFKC 正規化・小文字化）。
+  1文字の問い合わせ（「環」など）にも当たるよう、文書側は日本語の1文字（unigram）も索引する
+- ファイル: ヘッダ（JSON: 文書表・語彙表）+ ポスティング（uint32 の文書番号と float32 の重み付き出現数）。
+  ポスティングは mmap で開き、問い合わせに現れた語の分だけを読む
+- 更新: save_article ごとに差分セグメント（メモリ）に追加し、save() で1つのファイルにまとめ直す。
+  キャッシュファイルがあれば読み込み、updated_at の水位線より新しい記事だけを追加で取り込む。
+  他のプロセスで削除された記事は差分に現れないため、記事数が合わなければ全件スキャンで作り直す
+
+    index = SearchIndex(path)
+    index.ensure_loaded(scan, count)   # scan(since) は since より後に更新された MathArticle を、count() は記事数を返す
+    index.search("ガロア 理論", limit=10)  # [(スラッグ, スコア), ...]
+"""
+
+import html
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"MTSRCH01"
+INDEX_VERSION = 2
+
+# フィールドごとの重み（出現数に掛ける）
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "summary": 2.0, "content": 1.0}
+
+# BM25 のパラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'[0-9a-z]+|[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\u3005\u3006]+')
+
+def strip_html(text: str) -> str:
+    """HTML タグを除去して文字参照を戻す"""
+    return html.unescape(_TAG_RE.sub(' ', text or ''))
+
+def tokenize(text: str, unigrams: bool = False) -> Iterator[str]:
+    """検索用トークン（日本語は文字 bigram、英数字は単語。unigrams=True なら日本語の各1文字も返す）"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    for match in _TOKEN_RE.finditer(text):
+        run = match.group()
+        if run.isascii() or len(run) == 1:
+            yield run
+        else:
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+            if unigrams:
+                yield from run
+
+def document_terms(title: str, summary: str, tags: Iterable[str], content_html: str) -> Dict[str, float]:
+    """記事の {語: フィールド重み付きの出現数}"""
+    terms: Dict[str, float] = {}
+    fields = {"title": title, "tags": " ".join(tags or []), "summary": summary,
+              "content": strip_html(content_html)}
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for term in tokenize(text, unigrams=True):
+            terms[term] = terms.get(term, 0.0) + weight
+    return terms
+
+class SearchIndex:
+    """記事の転置インデックス（mmap したファイル + メモリ上の差分）"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        # 文書表: 番号 -> [スラッグ, 文書長, 公開済みか]。削除・置き換えた文書は deleted に入れる
+        self.docs: List[list] = []
+        self.doc_ids: Dict[str, int] = {}
+        self.deleted = set()
+        self.total_length = 0.0
+        self.watermark: Optional[datetime] = None
+        self.loaded = False
+        self._terms: Dict[str, Tuple[int, int]] = {}       # ファイル上の語 -> (位置, 件数)
+        self._delta: Dict[str, Dict[int, float]] = {}      # 差分セグメントの語 -> {文書番号: 出現数}
+        self._mmap: Optional[mmap.mmap] = None
+        self._doc_offset = 0
+        self._tf_offset = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    # === 構築 ===
+
+    def ensure_loaded(self, scan: Callable[[Optional[datetime]], Iterable],
+                      count: Callable[[], int] = None):
+        """未構築ならファイル + 差分スキャン、または全件スキャンで構築
+
+        差分スキャンの後に count() の記事数と一致しなければ、他のプロセスで削除された記事が
+        残っているため全件スキャンで作り直す。
+        """
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            since = self.watermark if self._open() else None
+            scanned = 0
+            for article in scan(since):
+                self._add(article)
+                scanned += 1
+            if since is not None and count is not None and len(self) != count():
+                logger.info("検索インデックスの記事数が一致しないため全件スキャンで作り直します")
+                self._reset()
+                for article in scan(None):
+                    self._add(article)
+                    scanned += 1
+            self.loaded = True
+            logger.info(f"検索インデックスを構築しました: {len(self)}件 (スキャン {scanned}件)")
+            if scanned:
+                self.save()
+
+    def _open(self) -> bool:
+        """インデックスファイルを mmap で開く（無い・壊れていれば False）"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mm[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError("形式が異なります")
+            header_length = int.from_bytes(mm[8:12], 'little')
+            header = json.loads(mm[12:12 + header_length].decode('utf-8'))
+            if header["version"] != INDEX_VERSION or header["byteorder"] != sys.byteorder:
+                raise ValueError("バージョンまたはバイト順が異なります")
+            self.docs = header["docs"]
+            self.doc_ids = {doc[0]: i for i, doc in enumerate(self.docs)}
+            self.total_length = sum(doc[1] for doc in self.docs)
+            self._terms = {term: tuple(entry) for term, entry in header["terms"].items()}
+            self._doc_offset = 12 + header_length
+            self._tf_offset = self._doc_offset + 4 * header["postings"]
+            self.watermark = datetime.fromisoformat(header["watermark"]) if header.get("watermark") else None
+            self._mmap = mm
+            return self.watermark is not None
+        except Exception as e:
+            logger.warning(f"検索インデックスを読み込めませんでした（全件スキャンします）: {e}")
+            self._reset()
+            return False
+
+    def _reset(self):
+        """ファイルと差分を捨てて空にする"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.docs, self.doc_ids, self._terms, self._delta = [], {}, {}, {}
+        self.deleted = set()
+        self.total_length = 0.0
+        self.watermark = None
+        self._dirty = True
+
+    def _base_postings(self, term: str) -> Iterator[Tuple[int, float]]:
+        entry = self._terms.get(term)
+        if entry is None or self._mmap is None:
+            return iter(())
+        offset, count = entry
+        doc_numbers = array('I')
+        doc_numbers.frombytes(self._mmap[self._doc_offset + 4 * offset:self._doc_offset + 4 * (offset + count)])
+        tfs = array('f')
+        tfs.frombytes(self._mmap[self._tf_offset + 4 * offset:self._tf_offset + 4 * (offset + count)])
+        return zip(doc_numbers, tfs)
+
+    def _postings(self, term: str) -> Iterator[Tuple[int, float]]:
+        """語のポスティング（ファイル + 差分、削除済みの文書を除く）"""
+        for doc, tf in self._base_postings(term):
+            if doc not in self.deleted:
+                yield doc, tf
+        for doc, tf in self._delta.get(term, {}).items():
+            if doc not in self.deleted:
+                yield doc, tf
+
+    def save(self):
+        """ファイルと差分を1つのインデックスファイルにまとめて書き出す（削除済みの文書は詰める）"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            renumber: Dict[int, int] = {}
+            docs = []
+            for i, doc in enumerate(self.docs):
+                if i not in self.deleted:
+                    renumber[i] = len(docs)
+                    docs.append(doc)
+            doc_numbers, tfs = array('I'), array('f')
+            terms: Dict[str, List[int]] = {}
+            for term in sorted(set(self._terms) | set(self._delta)):
+                postings = sorted((renumber[doc], tf) for doc, tf in self._postings(term))
+                if not postings:
+                    continue
+                terms[term] = [len(doc_numbers), len(postings)]
+                doc_numbers.extend(doc for doc, _ in postings)
+                tfs.extend(tf for _, tf in postings)
+            header = json.dumps({
+                "version": INDEX_VERSION,
+                "byteorder": sys.byteorder,
+                "docs": docs,
+                "terms": terms,
+                "postings": len(doc_numbers),
+                "watermark": self.watermark.isoformat() if self.watermark else None,
+            }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(INDEX_MAGIC)
+                    f.write(len(header).to_bytes(4, 'little'))
+                    f.write(header)
+                    f.write(doc_numbers.tobytes())
+                    f.write(tfs.tobytes())
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.warning(f"検索インデックスの保存エラー: {e}")
+                return
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self.deleted, self._delta, self._dirty = set(), {}, False
+            self._open()
+
+    # === 更新 ===
+
+    def _add(self, article):
+        self._remove(article.slug)
+        terms = document_terms(article.title, article.summary, article.tags, article.content_html)
+        length = sum(terms.values())
+        doc = len(self.docs)
+        self.docs.append([article.slug, length, article.status == "published"])
+        self.doc_ids[article.slug] = doc
+        self.total_length += length
+        for term, tf in terms.items():
+            self._delta.setdefault(term, {})[doc] = tf
+        updated_at = article.updated_at
+        if isinstance(updated_at, datetime):
+            try:
+                if self.watermark is None or updated_at > self.watermark:
+                    self.watermark = updated_at
+            except TypeError:
+                pass  # タイムゾーン有無の異なる日時は水位線に使わない
+        self._dirty = True
+
+    def _remove(self, slug: str):
+        doc = self.doc_ids.pop(slug, None)
+        if doc is not None:
+            self.deleted.add(doc)
+            self.total_length -= self.docs[doc][1]
+            self._dirty = True
+
+    def add(self, article):
+        """保存した記事を登録（構築前なら何もしない。構築時に取り込まれる）"""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._add(article)
+
+    def discard(self, slug: str):
+        """削除した記事を外す"""
+        with self._lock:
+            self._remove(slug)
+
+    # === 検索 ===
+
+    def search(self, query: str, limit: int = 10, published_only: bool = True) -> List[Tuple[str, float]]:
+        """BM25 スコアの高い順に (スラッグ, スコア) を返す"""
+        with self._lock:
+            count = len(self.doc_ids)
+            if not count:
+                return []
+            average_length = self.total_length / count or 1.0
+            scores: Dict[int, float] = {}
+            for term in dict.fromkeys(tokenize(query)):
+                postings = list(self._postings(term))
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings:
+                    length = self.docs[doc][1]
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+                    scores[doc] = scores.get(doc, 0.0) + idf * norm
+            ranked = sorted(((score, doc) for doc, score in scores.items()
+                             if not published_only or self.docs[doc][2]), reverse=True)
+            return [(self.docs[doc][0], score) for score, doc in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+def search_index_path(cache_dir: str, backend, collection: str) -> Optional[str]:
+    """バックエンドとコレクションごとのインデックスファイルパス（永続化しないバックエンドは None）"""
+    cache_key = getattr(backend, "cache_key", None)
+    if not cache_dir or not cache_key:
+        return None
+    return os.path.join(cache_dir, f"search_index-{cache_key}-{collection}.bin")
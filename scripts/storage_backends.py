@@ -0,0 +1,1024 @@
+"""
+Mt.MATH - ストレージバックエンド
+FirestoreManager が発行するクエリ（等価フィルタ・範囲フィルタ・order_by・limit・
+ドキュメントの get/set/update・フィールド射影）を抽象化し、実装を差し替えられるようにする
+
+- firestore: 本番の Firestore（config.db）
+- memory:    プロセス内メモリ（負荷試験・プロファイリング用）
+- sqlite:    ローカル SQLite ファイル（オフライン実行用）
+
+環境変数 STORAGE_BACKEND で選択する。
+
+複数ドキュメントの書き込みは WriteOp の列として commit()（1回のアトミックな書き込み）
+または bulk_write()（500件ごとのバッチ・BulkWriter と失敗分の再試行）に渡す。
+読み取った内容で書き込みを決める場合は、読み取り要求（Read）を yield して最後に書き込みを返す
+ジェネレーター（書き込み計画）を run_plan() に渡すと、読み取りから書き込みまでを1つのトランザクションで行う。
+"""
+
+import base64
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import string
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# フィルタ: (フィールド名, 演算子, 値)
+Filter = Tuple[str, str, Any]
+# 並び順: (フィールド名, "ASCENDING" | "DESCENDING")
+OrderBy = Tuple[str, str]
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+# Firestore の1バッチあたりの書き込み上限
+MAX_BATCH_SIZE = 500
+
+# 一括書き込みの方式
+BULK_MODE_BATCH = "batch"              # 500件ごとの WriteBatch を順に commit
+BULK_MODE_BULK_WRITER = "bulk_writer"  # Firestore BulkWriter（並列送信・段階的な流量増加）
+
+# paginate() の1ページあたりの件数
+DEFAULT_PAGE_SIZE = 200
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+class DocumentRecord(NamedTuple):
+    """クエリ結果の1ドキュメント"""
+    id: str
+    data: Dict[str, Any]
+
+class DocumentNotFoundError(KeyError):
+    """update 対象のドキュメントが存在しない"""
+
+class DocumentExistsError(KeyError):
+    """create 対象のドキュメントが既に存在する"""
+
+class WriteOp(NamedTuple):
+    """書き込み操作"""
+    kind: str                               # "set" | "create" | "update" | "delete" | "increment" | "merge"
+    collection: str
+    doc_id: str
+    data: Optional[Dict[str, Any]] = None
+
+class Read(NamedTuple):
+    """読み書きの計画が yield する読み取り要求
+
+    method はバックエンドの読み取りメソッド名（トランザクション内の書き込み計画では "get" のみ）。
+    mirror=True ならローカルミラーから読む（FirestoreManager の読み取り計画のみ）。
+    """
+    method: str
+    args: tuple
+    mirror: bool = False
+
+# 書き込み計画: Read を yield して結果を受け取り、最後に (書き込み操作の列, 戻り値) を返すジェネレーター
+Plan = Generator[Read, Any, Tuple[List[WriteOp], Any]]
+
+class WriteResult(NamedTuple):
+    """一括書き込みの操作ごとの結果"""
+    op: WriteOp
+    error: Optional[str] = None  # None なら成功
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+# 再試行しても結果が変わらないエラー
+PERMANENT_WRITE_ERRORS = (DocumentNotFoundError, DocumentExistsError, ValueError)
+
+class Transaction:
+    """run_transaction() の関数に渡す読み書きハンドル
+
+    読み取りは全ての書き込みより前に行う（Firestore の制約）。
+    書き込みは関数が正常に戻ったときにまとめてコミットされる。
+    """
+
+    def __init__(self, backend: 'StorageBackend'):
+        self.backend = backend
+        self.writes: List[WriteOp] = []
+
+    def get(self, collection: str, doc_id: str,
+            fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        return self.backend.get(collection, doc_id, fields)
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.writes.append(WriteOp("set", collection, doc_id, data))
+
+    def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.writes.append(WriteOp("create", collection, doc_id, data))
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.writes.append(WriteOp("update", collection, doc_id, data))
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        self.writes.append(WriteOp("delete", collection, doc_id))
+
+    def write(self, op: WriteOp) -> None:
+        """任意の書き込み操作（increment / merge を含む）を追加"""
+        self.writes.append(op)
+
+def drive_plan(plan: Plan, transaction: Transaction, request: Read = None) -> Any:
+    """書き込み計画の読み取りにトランザクションで答え、最後に返された書き込みを追加して戻り値を返す
+
+    request には計画から取り出し済みの最初の読み取り要求を渡せる。
+    """
+    try:
+        if request is None:
+            request = next(plan)
+        while True:
+            request = plan.send(transaction.get(*request.args))
+    except StopIteration as stop:
+        ops, result = stop.value
+    for op in ops:
+        transaction.write(op)
+    return result
+
+def generate_document_id() -> str:
+    """Firestore 形式の20文字ランダムIDを生成"""
+    return ''.join(secrets.choice(_ID_ALPHABET) for _ in range(20))
+
+class StorageBackend:
+    """ストレージバックエンドの共通インターフェース"""
+
+    name = "base"
+    # ローカルキャッシュファイルの識別子（None ならキャッシュを永続化しない）
+    cache_key: Optional[str] = None
+
+    def new_id(self, collection: str) -> str:
+        """新規ドキュメントIDを払い出す"""
+        return generate_document_id()
+
+    def get(self, collection: str, doc_id: str,
+            fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """ドキュメントを取得（存在しなければ None、fields 指定時はそのフィールドのみ）"""
+        raise NotImplementedError
+
+    def get_many(self, collection: str, doc_ids: Iterable[str],
+                 fields: Optional[Iterable[str]] = None) -> List[Optional[Dict[str, Any]]]:
+        """複数のドキュメントを取得（doc_ids と同じ順序、存在しないものは None）"""
+        fields = list(fields) if fields is not None else None
+        return [self.get(collection, doc_id, fields) for doc_id in doc_ids]
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        """ドキュメントを新規作成（既に存在すれば DocumentExistsError）"""
+        raise NotImplementedError
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        raise NotImplementedError
+
+    def increment(self, collection: str, doc_id: str, amounts: Dict[str, int]) -> None:
+        """数値フィールドに加算（ドキュメント・フィールドが無ければ 0 から）"""
+        raise NotImplementedError
+
+    def merge(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        """トップレベルのフィールドを上書き（ドキュメントが無ければ作成）"""
+        raise NotImplementedError
+
+    def count(self, collection: str, filters: Iterable[Filter] = ()) -> int:
+        """条件に合うドキュメント数"""
+        return len(self.query(collection, filters, fields=()))
+
+    def query(self, collection: str, filters: Iterable[Filter] = (),
+              order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+              fields: Optional[Iterable[str]] = None) -> List[DocumentRecord]:
+        """条件に合うドキュメントを取得（fields 指定時はそのフィールドのみ）"""
+        raise NotImplementedError
+
+    def stream(self, collection: str, filters: Iterable[Filter] = (),
+               order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+               fields: Optional[Iterable[str]] = None) -> Iterator[DocumentRecord]:
+        """query() と同じ条件のドキュメントを逐次返す"""
+        return iter(self.query(collection, filters, order_by, limit, fields))
+
+    def paginate(self, collection: str, filters: Iterable[Filter] = (),
+                 order_by: Iterable[OrderBy] = (), fields: Optional[Iterable[str]] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[DocumentRecord]:
+        """条件に合う全ドキュメントを page_size 件ずつ取得しながら逐次返す
+
+        Firestore ではページごとにカーソル（start_after）で続きから問い合わせるため、
+        長時間のストリームやメモリ使用量がコーパスの大きさに比例しない。
+        """
+        records = self.query(collection, filters, order_by, None, fields)
+        for start in range(0, len(records), page_size):
+            yield from records[start:start + page_size]
+
+    def apply(self, op: WriteOp) -> None:
+        """1件の書き込み操作を実行"""
+        if op.kind == "set":
+            self.set(op.collection, op.doc_id, op.data)
+        elif op.kind == "create":
+            self.create(op.collection, op.doc_id, op.data)
+        elif op.kind == "update":
+            self.update(op.collection, op.doc_id, op.data)
+        elif op.kind == "delete":
+            self.delete(op.collection, op.doc_id)
+        elif op.kind == "increment":
+            self.increment(op.collection, op.doc_id, op.data)
+        elif op.kind == "merge":
+            self.merge(op.collection, op.doc_id, op.data)
+        else:
+            raise ValueError(f"未対応の書き込み操作です: {op.kind}")
+
+    def commit(self, ops: Iterable[WriteOp]) -> None:
+        """複数の書き込みを1回でアトミックに実行（いずれかが失敗すれば何も書き込まない）"""
+        raise NotImplementedError
+
+    def run_transaction(self, func: Callable[[Transaction], Any], max_attempts: int = 5) -> Any:
+        """func(transaction) をトランザクション内で実行し、その戻り値を返す
+
+        他の書き込みと競合した場合は func を再実行する（Firestore）。
+        memory / sqlite ではバックエンドのロックで直列化する。
+        """
+        raise NotImplementedError
+
+    def run_plan(self, make_plan: Callable[[], Plan], max_attempts: int = 5) -> Any:
+        """書き込み計画をトランザクション内で実行し、計画の戻り値を返す
+
+        競合して再実行するときは make_plan() で計画を作り直す。
+        最初の読み取りより前に終わる計画はトランザクションを使わずに commit() する。
+        """
+        plan = make_plan()
+        try:
+            first = next(plan)
+        except StopIteration as stop:
+            ops, result = stop.value
+            self.commit(ops)
+            return result
+
+        started = [(plan, first)]
+
+        def run(transaction: Transaction) -> Any:
+            plan, request = started.pop() if started else (make_plan(), None)
+            return drive_plan(plan, transaction, request)
+
+        return self.run_transaction(run, max_attempts)
+
+    def watch(self, collection: str,
+              on_change: Callable[[List[WriteOp], bool], None]) -> Callable[[], None]:
+        """コレクションの変更を購読し、購読を止める関数を返す
+
+        on_change(ops, full) には変更を "set" / "delete" の WriteOp の列で渡す。
+        最初の呼び出しは full=True で、その時点のコレクション全体を表す。
+        変更通知に対応しないバックエンドは NotImplementedError。
+        """
+        raise NotImplementedError
+
+    def bulk_write(self, ops: Iterable[WriteOp], mode: str = BULK_MODE_BATCH,
+                   max_retries: int = 3) -> List[WriteResult]:
+        """大量の書き込みを実行し、操作ごとの結果を返す
+
+        MAX_BATCH_SIZE 件ごとに commit() し、失敗したバッチは1件ずつ再試行する。
+        """
+        return batched_write(self, list(ops), max_retries)
+
+def batched_write(backend: StorageBackend, ops: List[WriteOp], max_retries: int = 3,
+                  batch_size: int = MAX_BATCH_SIZE) -> List[WriteResult]:
+    """ops を batch_size 件ごとに commit し、失敗したバッチの操作は個別に再試行する"""
+    results: List[WriteResult] = []
+    for start in range(0, len(ops), batch_size):
+        chunk = ops[start:start + batch_size]
+        try:
+            backend.commit(chunk)
+            results.extend(WriteResult(op) for op in chunk)
+        except Exception:
+            results.extend(_apply_with_retry(backend, op, max_retries) for op in chunk)
+    return results
+
+def _apply_with_retry(backend: StorageBackend, op: WriteOp, max_retries: int) -> WriteResult:
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            backend.apply(op)
+            return WriteResult(op, None, attempts)
+        except PERMANENT_WRITE_ERRORS as e:
+            return WriteResult(op, f"{type(e).__name__}: {e}", attempts)
+        except Exception as e:
+            if attempts > max_retries:
+                return WriteResult(op, f"{type(e).__name__}: {e}", attempts)
+            time.sleep(min(0.2 * 2 ** (attempts - 1), 5.0))
+
+def grouped_write(backend: StorageBackend, groups: List[List[WriteOp]], max_retries: int = 3,
+                  batch_size: int = MAX_BATCH_SIZE) -> List[Optional[str]]:
+    """操作のグループを分割せずに batch_size 件以内のバッチへ詰めて commit し、グループごとのエラーを返す
+
+    失敗したバッチはグループごとに再試行するため、グループ内の操作は必ずまとめて書き込まれるか、
+    まとめて失敗する（成功したグループのエラーは None）。
+    """
+    errors: List[Optional[str]] = [None] * len(groups)
+
+    def flush(indices: List[int]):
+        try:
+            backend.commit([op for i in indices for op in groups[i]])
+        except Exception:
+            for i in indices:
+                errors[i] = _commit_with_retry(backend, groups[i], max_retries)
+
+    batch: List[int] = []
+    size = 0
+    for i, group in enumerate(groups):
+        if len(group) > batch_size:
+            errors[i] = f"ValueError: 書き込みが1バッチの上限 {batch_size} 件を超えています ({len(group)}件)"
+            continue
+        if batch and size + len(group) > batch_size:
+            flush(batch)
+            batch, size = [], 0
+        batch.append(i)
+        size += len(group)
+    if batch:
+        flush(batch)
+    return errors
+
+def _commit_with_retry(backend: StorageBackend, ops: List[WriteOp], max_retries: int) -> Optional[str]:
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            backend.commit(ops)
+            return None
+        except PERMANENT_WRITE_ERRORS as e:
+            return f"{type(e).__name__}: {e}"
+        except Exception as e:
+            if attempts > max_retries:
+                return f"{type(e).__name__}: {e}"
+            time.sleep(min(0.2 * 2 ** (attempts - 1), 5.0))
+
+# === プロセス内評価用ヘルパー（memory / sqlite 共通） ===
+
+_MISSING = object()
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    try:
+        if op == "==":
+            return value == operand
+        if op == "!=":
+            return value != operand
+        if op == "<":
+            return value < operand
+        if op == "<=":
+            return value <= operand
+        if op == ">":
+            return value > operand
+        if op == ">=":
+            return value >= operand
+        if op == "in":
+            return value in operand
+        if op == "not-in":
+            return value not in operand
+        if op == "array-contains":
+            return isinstance(value, list) and operand in value
+        if op == "array-contains-any":
+            return isinstance(value, list) and any(v in value for v in operand)
+    except TypeError:
+        # 型の異なる値同士の範囲比較は Firestore 同様に不一致とする
+        return False
+    raise ValueError(f"未対応のフィルタ演算子です: {op}")
+
+def matches_filters(data: Dict[str, Any], filters: Iterable[Filter]) -> bool:
+    """ドキュメントが全てのフィルタを満たすか判定"""
+    for field, op, operand in filters:
+        value = data.get(field, _MISSING)
+        if value is _MISSING or not _compare(value, op, operand):
+            return False
+    return True
+
+def apply_query(records: Iterable[DocumentRecord], filters: Iterable[Filter] = (),
+                order_by: Iterable[OrderBy] = (), limit: Optional[int] = None) -> List[DocumentRecord]:
+    """フィルタ・並び替え・件数制限をプロセス内で適用"""
+    filters = list(filters)
+    order_by = list(order_by)
+    result = [r for r in records if matches_filters(r.data, filters)]
+
+    # Firestore 同様、order_by のフィールドを持たないドキュメントは除外
+    if order_by:
+        result = [r for r in result if all(f in r.data for f, _ in order_by)]
+        # 安定ソートを後ろのキーから順に適用
+        result.sort(key=lambda r: r.id)
+        for field, direction in reversed(order_by):
+            result.sort(key=lambda r: r.data[field], reverse=(direction == DESCENDING))
+
+    if limit is not None:
+        result = result[:limit]
+    return result
+
+def project(data: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """fields に含まれるフィールドだけを残す（None なら全フィールドの複製）"""
+    if fields is None:
+        return _copy_data(data)
+    return _copy_data({f: data[f] for f in fields if f in data})
+
+def _copy_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """リスト・辞書を複製した浅いコピー（呼び出し側の変更から保存値を守る）"""
+    return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v)
+            for k, v in data.items()}
+
+# === Firestore ===
+
+_RANGE_OPERATORS = ("<", "<=", ">", ">=", "!=", "not-in")
+
+def _increments(amounts: Dict[str, int]) -> Dict[str, Any]:
+    from google.cloud.firestore_v1 import Increment
+    return {field: Increment(amount) for field, amount in amounts.items()}
+
+class FirestoreBackend(StorageBackend):
+    """Firestore クライアントをそのまま使うバックエンド"""
+
+    name = "firestore"
+
+    def __init__(self, db):
+        self.db = db
+        self.cache_key = f"firestore-{getattr(db, 'project', 'default')}"
+
+    def new_id(self, collection: str) -> str:
+        return self.db.collection(collection).document().id
+
+    def get(self, collection: str, doc_id: str,
+            fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        doc_ref = self.db.collection(collection).document(doc_id)
+        doc = doc_ref.get(field_paths=list(fields) if fields is not None else None)
+        return doc.to_dict() if doc.exists else None
+
+    def get_many(self, collection: str, doc_ids: Iterable[str],
+                 fields: Optional[Iterable[str]] = None) -> List[Optional[Dict[str, Any]]]:
+        doc_ids = list(doc_ids)
+        col_ref = self.db.collection(collection)
+        refs = [col_ref.document(doc_id) for doc_id in dict.fromkeys(doc_ids)]
+        found: Dict[str, Dict[str, Any]] = {}
+        # get_all は1回のストリーミング RPC で取得し、順序は保証しない
+        for doc in self.db.get_all(refs, field_paths=list(fields) if fields is not None else None):
+            if doc.exists:
+                found[doc.id] = doc.to_dict()
+        return [_copy_data(found[doc_id]) if doc_id in found else None for doc_id in doc_ids]
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.db.collection(collection).document(doc_id).set(data)
+
+    def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        from google.api_core.exceptions import AlreadyExists
+        try:
+            self.db.collection(collection).document(doc_id).create(data)
+        except AlreadyExists as e:
+            raise DocumentExistsError(f"{collection}/{doc_id}") from e
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        from google.api_core.exceptions import NotFound
+        try:
+            self.db.collection(collection).document(doc_id).update(data)
+        except NotFound as e:
+            raise DocumentNotFoundError(f"{collection}/{doc_id}") from e
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        self.db.collection(collection).document(doc_id).delete()
+
+    def increment(self, collection: str, doc_id: str, amounts: Dict[str, int]) -> None:
+        self.db.collection(collection).document(doc_id).set(_increments(amounts), merge=True)
+
+    def merge(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.db.collection(collection).document(doc_id).set(data, merge=True)
+
+    def count(self, collection: str, filters: Iterable[Filter] = ()) -> int:
+        # 集計クエリはドキュメントを転送せず、インデックス 1,000件ごとに1読み取りで課金される
+        query = self._build_query(collection, filters, (), None)
+        result = query.count(alias="count").get()
+        return int(result[0][0].value)
+
+    def commit(self, ops: Iterable[WriteOp]) -> None:
+        from google.api_core.exceptions import AlreadyExists, NotFound
+
+        batch = self.db.batch()
+        for op in ops:
+            self._add_write(batch, op)
+        try:
+            batch.commit()
+        except NotFound as e:
+            raise DocumentNotFoundError(str(e)) from e
+        except AlreadyExists as e:
+            raise DocumentExistsError(str(e)) from e
+
+    def run_transaction(self, func: Callable[[Transaction], Any], max_attempts: int = 5) -> Any:
+        from google.api_core.exceptions import AlreadyExists, NotFound
+        from google.cloud.firestore_v1 import transactional
+
+        @transactional
+        def run(transaction):
+            return func(_FirestoreTransaction(self, transaction))
+
+        try:
+            return run(self.db.transaction(max_attempts=max_attempts))
+        except NotFound as e:
+            raise DocumentNotFoundError(str(e)) from e
+        except AlreadyExists as e:
+            raise DocumentExistsError(str(e)) from e
+
+    def _add_write(self, writer, op: WriteOp) -> None:
+        """WriteBatch / BulkWriter に操作を追加"""
+        doc_ref = self.db.collection(op.collection).document(op.doc_id)
+        if op.kind == "set":
+            writer.set(doc_ref, op.data)
+        elif op.kind == "create":
+            writer.create(doc_ref, op.data)
+        elif op.kind == "update":
+            writer.update(doc_ref, op.data)
+        elif op.kind == "delete":
+            writer.delete(doc_ref)
+        elif op.kind == "increment":
+            writer.set(doc_ref, _increments(op.data), merge=True)
+        elif op.kind == "merge":
+            writer.set(doc_ref, op.data, merge=True)
+        else:
+            raise ValueError(f"未対応の書き込み操作です: {op.kind}")
+
+    def bulk_write(self, ops: Iterable[WriteOp], mode: str = BULK_MODE_BATCH,
+                   max_retries: int = 3) -> List[WriteResult]:
+        ops = list(ops)
+        if mode != BULK_MODE_BULK_WRITER:
+            return batched_write(self, ops, max_retries)
+        return self._bulk_writer_write(ops, max_retries)
+
+    def _bulk_writer_write(self, ops: List[WriteOp], max_retries: int) -> List[WriteResult]:
+        """BulkWriter で送信（流量は 500 ops/秒から段階的に増加、失敗は max_retries 回まで再試行）"""
+        pending: Dict[str, List[int]] = {}
+        for index, op in enumerate(ops):
+            pending.setdefault(f"{op.collection}/{op.doc_id}", []).append(index)
+        results: List[Optional[WriteResult]] = [None] * len(ops)
+        lock = threading.Lock()
+
+        def settle(path: str, error: Optional[str], attempts: int):
+            with lock:
+                indexes = pending.get(path)
+                if indexes:
+                    index = indexes.pop(0)
+                    results[index] = WriteResult(ops[index], error, attempts)
+
+        def on_result(reference, result, bulk_writer):
+            settle(reference.path, None, 1)
+
+        def on_error(failure, bulk_writer) -> bool:
+            if failure.attempts <= max_retries and failure.code not in (5, 6):  # NOT_FOUND / ALREADY_EXISTS
+                return True
+            reference = failure.operation.reference
+            settle(reference.path, f"{failure.code}: {failure.message}", failure.attempts)
+            return False
+
+        bulk_writer = self.db.bulk_writer()
+        bulk_writer.on_write_result(on_result)
+        bulk_writer.on_write_error(on_error)
+        for op in ops:
+            self._add_write(bulk_writer, op)
+        bulk_writer.close()
+        return [r if r is not None else WriteResult(op, "結果を受信できませんでした")
+                for op, r in zip(ops, results)]
+
+    def watch(self, collection: str,
+              on_change: Callable[[List[WriteOp], bool], None]) -> Callable[[], None]:
+        initial = [True]
+
+        def on_snapshot(snapshots, changes, read_time):
+            if initial[0]:
+                initial[0] = False
+                on_change([WriteOp("set", collection, doc.id, doc.to_dict()) for doc in snapshots], True)
+                return
+            ops = []
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    ops.append(WriteOp("delete", collection, doc.id))
+                else:
+                    ops.append(WriteOp("set", collection, doc.id, doc.to_dict()))
+            on_change(ops, False)
+
+        # 通知はリスナーのバックグラウンドスレッドから呼ばれる
+        watch = self.db.collection(collection).on_snapshot(on_snapshot)
+        return watch.unsubscribe
+
+    def query(self, collection: str, filters: Iterable[Filter] = (),
+              order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+              fields: Optional[Iterable[str]] = None) -> List[DocumentRecord]:
+        return list(self.stream(collection, filters, order_by, limit, fields))
+
+    def stream(self, collection: str, filters: Iterable[Filter] = (),
+               order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+               fields: Optional[Iterable[str]] = None) -> Iterator[DocumentRecord]:
+        query = self._build_query(collection, filters, order_by, limit, fields)
+        for doc in query.stream():
+            yield DocumentRecord(doc.id, doc.to_dict())
+
+    def paginate(self, collection: str, filters: Iterable[Filter] = (),
+                 order_by: Iterable[OrderBy] = (), fields: Optional[Iterable[str]] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[DocumentRecord]:
+        filters = list(filters)
+        order_by = list(order_by)
+        # 範囲フィルタのフィールドは並び順の先頭に置く必要がある（Firestore の制約）
+        ordered = {field for field, _ in order_by}
+        for field, op, _ in filters:
+            if op in _RANGE_OPERATORS and field not in ordered:
+                order_by.insert(0, (field, ASCENDING))
+                ordered.add(field)
+        select = None
+        if fields is not None:
+            fields = list(fields)
+            # カーソルの位置決めに並び順のフィールドが必要
+            select = list(dict.fromkeys(fields + [field for field, _ in order_by]))
+        query = self._build_query(collection, filters, order_by, None, select)
+        # ドキュメントIDで同値の並びを一意にする
+        query = query.order_by("__name__", direction=order_by[-1][1] if order_by else ASCENDING)
+
+        last = None
+        while True:
+            page = query.limit(page_size)
+            if last is not None:
+                page = page.start_after(last)
+            snapshots = list(page.stream())
+            for doc in snapshots:
+                data = doc.to_dict()
+                yield DocumentRecord(doc.id, project(data, fields) if select != fields else data)
+            if len(snapshots) < page_size:
+                return
+            last = snapshots[-1]
+
+    def _build_query(self, collection, filters, order_by, limit, fields=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.db.collection(collection)
+        for field, op, value in filters:
+            query = query.where(filter=FieldFilter(field, op, value))
+        for field, direction in order_by:
+            query = query.order_by(field, direction=direction)
+        if limit is not None:
+            query = query.limit(limit)
+        if fields is not None:
+            query = query.select(list(fields))
+        return query
+
+class _FirestoreTransaction(Transaction):
+    """Firestore のトランザクションに読み書きを直接発行するハンドル"""
+
+    def __init__(self, backend: FirestoreBackend, transaction):
+        super().__init__(backend)
+        self.transaction = transaction
+
+    def get(self, collection: str, doc_id: str,
+            fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        doc_ref = self.backend.db.collection(collection).document(doc_id)
+        doc = doc_ref.get(transaction=self.transaction,
+                          field_paths=list(fields) if fields is not None else None)
+        return doc.to_dict() if doc.exists else None
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.backend._add_write(self.transaction, WriteOp("set", collection, doc_id, data))
+
+    def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.backend._add_write(self.transaction, WriteOp("create", collection, doc_id, data))
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        self.backend._add_write(self.transaction, WriteOp("update", collection, doc_id, data))
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        self.backend._add_write(self.transaction, WriteOp("delete", collection, doc_id))
+
+    def write(self, op: WriteOp) -> None:
+        self.backend._add_write(self.transaction, op)
+
+# === メモリ ===
+
+class MemoryBackend(StorageBackend):
+    """プロセス内の辞書に保存するバックエンド"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+
+    def _collection(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self._collections.setdefault(collection, {})
+
+    def get(self, collection: str, doc_id: str,
+            fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._collection(collection).get(doc_id)
+            return project(data, fields) if data is not None else None
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._collection(collection)[doc_id] = _copy_data(data)
+
+    def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            docs = self._collection(collection)
+            if doc_id in docs:
+                raise DocumentExistsError(f"{collection}/{doc_id}")
+            docs[doc_id] = _copy_data(data)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            docs = self._collection(collection)
+            if doc_id not in docs:
+                raise DocumentNotFoundError(f"{collection}/{doc_id}")
+            docs[doc_id].update(_copy_data(data))
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        with self._lock:
+            self._collection(collection).pop(doc_id, None)
+
+    def increment(self, collection: str, doc_id: str, amounts: Dict[str, int]) -> None:
+        with self._lock:
+            doc = self._collection(collection).setdefault(doc_id, {})
+            for field, amount in amounts.items():
+                doc[field] = doc.get(field, 0) + amount
+
+    def merge(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._collection(collection).setdefault(doc_id, {}).update(_copy_data(data))
+
+    def run_transaction(self, func: Callable[[Transaction], Any], max_attempts: int = 5) -> Any:
+        with self._lock:
+            transaction = Transaction(self)
+            result = func(transaction)
+            self.commit(transaction.writes)
+            return result
+
+    def commit(self, ops: Iterable[WriteOp]) -> None:
+        ops = list(ops)
+        with self._lock:
+            # 書き込む前に全操作を検証し、途中で失敗しないようにする
+            exists: Dict[Tuple[str, str], bool] = {}
+            for op in ops:
+                key = (op.collection, op.doc_id)
+                current = exists.get(key, op.doc_id in self._collection(op.collection))
+                if op.kind in ("set", "increment", "merge"):
+                    exists[key] = True
+                elif op.kind == "create":
+                    if current:
+                        raise DocumentExistsError(f"{op.collection}/{op.doc_id}")
+                    exists[key] = True
+                elif op.kind == "update":
+                    if not current:
+                        raise DocumentNotFoundError(f"{op.collection}/{op.doc_id}")
+                elif op.kind == "delete":
+                    exists[key] = False
+                else:
+                    raise ValueError(f"未対応の書き込み操作です: {op.kind}")
+            for op in ops:
+                self.apply(op)
+
+    def query(self, collection: str, filters: Iterable[Filter] = (),
+              order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+              fields: Optional[Iterable[str]] = None) -> List[DocumentRecord]:
+        with self._lock:
+            records = [DocumentRecord(doc_id, data)
+                       for doc_id, data in self._collection(collection).items()]
+            result = apply_query(records, filters, order_by, limit)
+            return [DocumentRecord(r.id, project(r.data, fields)) for r in result]
+
+# === SQLite ===
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"JSONに変換できない型です: {type(value).__name__}")
+
+def _json_object_hook(obj: Dict[str, Any]):
+    if len(obj) == 1:
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+    return obj
+
+def encode_document(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_json_default)
+
+def decode_document(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_json_object_hook)
+
+class SQLiteBackend(StorageBackend):
+    """ローカル SQLite ファイルに JSON として保存するバックエンド
+
+    スカラー値の等価フィルタは json_extract で SQL 側に絞り込み、
+    残りのフィルタ・並び替えはプロセス内で評価する。
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:10]
+        self.cache_key = f"sqlite-{digest}"
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " collection TEXT NOT NULL,"
+                " id TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (collection, id))"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, collection: str, doc_id: str,
+            fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?",
+                (collection, doc_id)).fetchone()
+        if not row:
+            return None
+        data = decode_document(row[0])
+        return data if fields is None else {f: data[f] for f in fields if f in data}
+
+    def get_many(self, collection: str, doc_ids: Iterable[str],
+                 fields: Optional[Iterable[str]] = None) -> List[Optional[Dict[str, Any]]]:
+        doc_ids = list(doc_ids)
+        fields = list(fields) if fields is not None else None
+        unique_ids = list(dict.fromkeys(doc_ids))
+        found: Dict[str, str] = {}
+        with self._lock:
+            # SQLite のパラメータ数上限に収まるよう分割
+            for start in range(0, len(unique_ids), MAX_BATCH_SIZE):
+                chunk = unique_ids[start:start + MAX_BATCH_SIZE]
+                rows = self._conn.execute(
+                    "SELECT id, data FROM documents WHERE collection = ? AND id IN "
+                    f"({', '.join('?' * len(chunk))})", [collection] + chunk).fetchall()
+                found.update(rows)
+        result = []
+        for doc_id in doc_ids:
+            if doc_id not in found:
+                result.append(None)
+                continue
+            data = decode_document(found[doc_id])
+            result.append(data if fields is None else {f: data[f] for f in fields if f in data})
+        return result
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (collection, doc_id, encode_document(data)))
+
+    def create(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                    (collection, doc_id, encode_document(data)))
+            except sqlite3.IntegrityError as e:
+                raise DocumentExistsError(f"{collection}/{doc_id}") from e
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            current = self.get(collection, doc_id)
+            if current is None:
+                raise DocumentNotFoundError(f"{collection}/{doc_id}")
+            current.update(data)
+            self.set(collection, doc_id, current)
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+
+    def increment(self, collection: str, doc_id: str, amounts: Dict[str, int]) -> None:
+        with self._lock:
+            doc = self.get(collection, doc_id) or {}
+            for field, amount in amounts.items():
+                doc[field] = doc.get(field, 0) + amount
+            self.set(collection, doc_id, doc)
+
+    def merge(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            doc = self.get(collection, doc_id) or {}
+            doc.update(data)
+            self.set(collection, doc_id, doc)
+
+    def count(self, collection: str, filters: Iterable[Filter] = ()) -> int:
+        filters = list(filters)
+        sql, params = self._select(collection, filters)
+        if len(params) - 1 != 2 * len(filters):
+            # SQL に変換できないフィルタがあればプロセス内で評価
+            return super().count(collection, filters)
+        with self._lock:
+            return self._conn.execute(
+                sql.replace("SELECT id, data", "SELECT COUNT(*)", 1), params).fetchone()[0]
+
+    def run_transaction(self, func: Callable[[Transaction], Any], max_attempts: int = 5) -> Any:
+        with self._lock:
+            # 読み取りの前に書き込みロックを取り、他プロセスの書き込みと直列化する
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                transaction = Transaction(self)
+                result = func(transaction)
+                for op in transaction.writes:
+                    self.apply(op)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def commit(self, ops: Iterable[WriteOp]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for op in ops:
+                    self.apply(op)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def query(self, collection: str, filters: Iterable[Filter] = (),
+              order_by: Iterable[OrderBy] = (), limit: Optional[int] = None,
+              fields: Optional[Iterable[str]] = None) -> List[DocumentRecord]:
+        filters = list(filters)
+        sql, params = self._select(collection, filters)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        records = [DocumentRecord(doc_id, decode_document(text)) for doc_id, text in rows]
+        result = apply_query(records, filters, order_by, limit)
+        if fields is not None:
+            fields = list(fields)
+            result = [DocumentRecord(r.id, {f: r.data[f] for f in fields if f in r.data})
+                      for r in result]
+        return result
+
+    def paginate(self, collection: str, filters: Iterable[Filter] = (),
+                 order_by: Iterable[OrderBy] = (), fields: Optional[Iterable[str]] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[DocumentRecord]:
+        order_by = list(order_by)
+        if order_by:
+            yield from super().paginate(collection, filters, order_by, fields, page_size)
+            return
+
+        # 並び順の指定がなければ ID のキーセットで1ページずつ読む
+        filters = list(filters)
+        fields = list(fields) if fields is not None else None
+        sql, params = self._select(collection, filters)
+        sql += " AND id > ? ORDER BY id LIMIT ?"
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, params + [last_id, page_size]).fetchall()
+            for doc_id, text in rows:
+                data = decode_document(text)
+                if matches_filters(data, filters):
+                    yield DocumentRecord(doc_id, data if fields is None else
+                                         {f: data[f] for f in fields if f in data})
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    @staticmethod
+    def _select(collection: str, filters: List[Filter]) -> Tuple[str, List[Any]]:
+        """スカラー値の等価フィルタを SQL に変換した SELECT 文"""
+        sql = "SELECT id, data FROM documents WHERE collection = ?"
+        params: List[Any] = [collection]
+        for field, op, value in filters:
+            if op == "==" and isinstance(value, (str, int, float, bool)):
+                sql += " AND json_extract(data, ?) = ?"
+                params += [f'$."{field}"', value]
+        return sql, params
+
+# === 選択 ===
+
+_memory_backend: Optional[MemoryBackend] = None
+
+def create_backend(kind: str = None) -> Optional[StorageBackend]:
+    """設定に応じたバックエンドを生成
+
+    kind を省略すると環境変数 STORAGE_BACKEND（既定: firestore）を使う。
+    firestore で接続に失敗した場合は None を返す。
+    """
+    from scripts.config import config
+
+    kind = (kind or config.storage_backend).lower()
+    if kind == "firestore":
+        return FirestoreBackend(config.db) if config.db is not None else None
+    if kind == "memory":
+        # 同一プロセス内の全マネージャーで共有する
+        global _memory_backend
+        if _memory_backend is None:
+            _memory_backend = MemoryBackend()
+        return _memory_backend
+    if kind == "sqlite":
+        return SQLiteBackend(config.sqlite_path)
+    raise ValueError(f"未知のストレージバックエンドです: {kind}")
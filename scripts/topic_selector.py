@@ -20,6 +20,9 @@ from scripts.firestore_manager import firestore_manager
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# generated_topics.json の読み込み結果キャッシュ {(絶対パス, 更新時刻): トピック名リスト}
+_topics_file_cache: Dict[tuple, List[str]] = {}
+
 class TopicSelector:
     """ニッチ数学トピック選定クラス"""
     
@@ -50,10 +53,15 @@ class TopicSelector:
             return []
         
         try:
-            with open(self.generated_topics_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                topics = [topic['name'] for topic in data.get('topics', [])]
-                return topics
+            # 常駐デーモンなどで繰り返し生成される場合はファイル更新時にのみ読み直す
+            cache_key = (os.path.abspath(self.generated_topics_file),
+                         os.path.getmtime(self.generated_topics_file))
+            if cache_key not in _topics_file_cache:
+                with open(self.generated_topics_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                _topics_file_cache.clear()
+                _topics_file_cache[cache_key] = [topic['name'] for topic in data.get('topics', [])]
+            return list(_topics_file_cache[cache_key])
         except Exception as e:
             logger.error(f"既出トピックの読み込みエラー: {e}")
             return []
@@ -402,7 +410,7 @@ class TopicSelector:
         
         return topics
 
-def main():
+def main(argv=None):
     """メイン実行関数"""
     
     parser = argparse.ArgumentParser(description='ニッチ数学トピック選定ツール')
@@ -416,7 +424,7 @@ def main():
     parser.add_argument('--show-stats', action='store_true',
                        help='統計情報を表示')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     try:
         selector = TopicSelector()
@@ -443,14 +451,14 @@ def main():
         # 保存処理
         if args.save:
             saved_count = 0
-            for topic in topics:
-                try:
-                    firestore_manager.save_topic(topic)
+            results = firestore_manager.save_topics_bulk(topics)
+            for topic, result in zip(topics, results):
+                if result.ok:
                     saved_count += 1
                     # generated_topics.jsonにも保存
                     selector._save_new_topic(topic)
-                except Exception as e:
-                    logger.error(f"トピック保存エラー ({topic.name}): {e}")
+                else:
+                    logger.error(f"トピック保存エラー ({topic.name}): {result.error}")
             
             print(f"💾 {saved_count}個のトピックをFirestoreに保存しました！")
         
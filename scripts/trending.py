@@ -0,0 +1,156 @@
+"""
+Mt.MATH - 人気記事ランキング
+閲覧数の集計（rollup_view_counts）で得た記事ごとの増分から時間減衰する人気スコアを更新し、
+全体とカテゴリごとの上位 K 件を1つのランキングドキュメント（feeds/trending）に書き込む
+
+- スコア: 1時間単位のバケットで指数減衰させる（半減期 TRENDING_HALF_LIFE_HOURS）
+  score ← score × 2^(-経過時間数 / 半減期) + 今回の閲覧数
+- 増分更新: スコアは stats/trending に保存し、前回からの経過時間分だけ減衰させて増分を足す
+  （記事全体の view_count は読まない）。十分小さくなったスコアは捨て、保持する記事数は
+  TRENDING_MAX_TRACKED 件までに抑える（ドキュメントの 1 MiB の上限に収める）
+- 増分: rollup_view_counts(trending=True) が view_count と同じコミットで stats/trending_pending に加算する。
+  update() は増分・状態の読み取りと、状態・ランキングの書き込み・増分の削除を1つのトランザクションで行うため、
+  更新に失敗した回の増分も次回に反映される
+- 減衰・加算・カテゴリ別の上位抽出は NumPy で全記事分をまとめて計算する
+
+    ranking = TrendingRanking(firestore_manager)
+    firestore_manager.rollup_view_counts(trending=True)
+    ranking.update()
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from scripts.config import config
+from scripts.firestore_manager import TRENDING_PENDING_DOC
+from scripts.storage_backends import Transaction
+
+logger = logging.getLogger(__name__)
+
+# ランキングドキュメント（feeds コレクション）と状態ドキュメント（stats コレクション）のID
+TRENDING_FEED = "trending"
+TRENDING_STATE_DOC = "trending"
+
+# これより小さくなったスコアの記事は状態から外す
+MIN_SCORE = 0.01
+
+# ランキングのカードに含める記事のフィールド
+CARD_FIELDS = ("title", "summary", "category", "difficulty_level", "niche_score", "status")
+
+def hour_bucket(now: datetime = None) -> int:
+    """UNIX 時間を1時間単位に切り捨てたバケット番号"""
+    return int((now or datetime.now()).timestamp() // 3600)
+
+def decay_factor(hours: float, half_life_hours: float) -> float:
+    """hours 時間分の減衰率"""
+    return 0.5 ** (hours / half_life_hours)
+
+def top_k_by_group(scores: np.ndarray, groups: np.ndarray, k: int) -> Dict[int, np.ndarray]:
+    """グループ（整数コード）ごとにスコアの高い順の上位 k 件の添字"""
+    if not len(scores):
+        return {}
+    order = np.lexsort((-scores, groups))
+    codes, starts = np.unique(groups[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    return {int(code): order[start:min(start + k, end)] for code, start, end in zip(codes, starts, ends)}
+
+class TrendingRanking:
+    """閲覧数の増分から人気スコアを更新し、ランキングドキュメントを書き出す"""
+
+    def __init__(self, manager, half_life_hours: float = None, top_k: int = None, max_tracked: int = None):
+        self.manager = manager
+        self.backend = manager.backend
+        self.half_life_hours = half_life_hours or config.trending_half_life_hours
+        self.top_k = top_k or config.trending_top_k
+        self.max_tracked = max_tracked or config.trending_max_tracked
+
+    def load_state(self) -> Dict[str, Any]:
+        return self.backend.get(self.manager.stats_collection, TRENDING_STATE_DOC) or {}
+
+    def update(self, now: datetime = None) -> Dict[str, Any]:
+        """未反映の閲覧数の増分（stats/trending_pending）を反映し、ランキングドキュメントを返す"""
+        ranking, tracked, views = self.backend.run_transaction(
+            lambda transaction: self._update(transaction, now))
+        logger.info(f"人気記事ランキングを更新しました: {tracked}記事 (閲覧 {views}回)")
+        return ranking
+
+    def _update(self, transaction: Transaction, now: datetime = None):
+        stats_collection = self.manager.stats_collection
+        state = transaction.get(stats_collection, TRENDING_STATE_DOC) or {}
+        deltas = transaction.get(stats_collection, TRENDING_PENDING_DOC) or {}
+        hour = hour_bucket(now)
+        slugs: List[str] = list(state.get("slugs", []))
+        categories: List[str] = list(state.get("categories", []))
+        scores = np.asarray(state.get("scores", []), dtype=np.float64)
+        scores *= decay_factor(max(hour - state.get("hour", hour), 0), self.half_life_hours)
+
+        # 初めて閲覧された記事はカテゴリを読んで追加する
+        index = {slug: i for i, slug in enumerate(slugs)}
+        new = [slug for slug, count in deltas.items() if count > 0 and slug not in index]
+        if new:
+            for slug, data in zip(new, self.backend.get_many(self.manager.articles_collection, new, ["category"])):
+                if data is not None:
+                    index[slug] = len(slugs)
+                    slugs.append(slug)
+                    categories.append(data.get("category", ""))
+            scores = np.concatenate([scores, np.zeros(len(slugs) - len(scores))])
+        hits = [(index[slug], count) for slug, count in deltas.items() if slug in index]
+        if hits:
+            positions, counts = zip(*hits)
+            np.add.at(scores, np.array(positions), np.array(counts, dtype=np.float64))
+
+        keep = np.flatnonzero(scores >= MIN_SCORE)
+        if len(keep) > self.max_tracked:
+            keep = np.sort(keep[np.argsort(-scores[keep], kind="stable")[:self.max_tracked]])
+        slugs = [slugs[i] for i in keep]
+        categories = [categories[i] for i in keep]
+        scores = scores[keep]
+        ranking = self._ranking(slugs, categories, scores)
+
+        # 削除された記事は _ranking でスコアが 0 になる
+        keep = np.flatnonzero(scores > 0)
+        state = {
+            "hour": hour,
+            "slugs": [slugs[i] for i in keep],
+            "categories": [categories[i] for i in keep],
+            "scores": scores[keep].tolist(),
+        }
+        transaction.set(stats_collection, TRENDING_STATE_DOC, state)
+        transaction.set(self.manager.feeds_collection, TRENDING_FEED, ranking)
+        transaction.delete(stats_collection, TRENDING_PENDING_DOC)
+        return ranking, len(keep), sum(deltas.values())
+
+    def _ranking(self, slugs: List[str], categories: List[str], scores: np.ndarray) -> Dict[str, Any]:
+        """全体とカテゴリごとの上位 K 件のカード
+
+        削除・非公開化された記事を除いても K 件残るよう、候補は 2K 件ずつ読む。
+        """
+        names, codes = np.unique(np.asarray(categories, dtype=str), return_inverse=True)
+        limit = 2 * self.top_k
+        candidates = top_k_by_group(scores, codes, limit)
+        overall = np.argsort(-scores, kind="stable")[:limit]
+
+        picked = sorted(set(overall.tolist()).union(*(indices.tolist() for indices in candidates.values())))
+        docs = self.backend.get_many(self.manager.articles_collection, [slugs[i] for i in picked],
+                                     list(CARD_FIELDS))
+        cards: Dict[int, Dict[str, Any]] = {}
+        for i, data in zip(picked, docs):
+            if data is None:
+                scores[i] = 0.0  # 削除された記事は状態から外す
+            elif data.get("status") == "published":
+                data.pop("status")
+                cards[i] = dict(data, slug=slugs[i], score=round(float(scores[i]), 3))
+
+        def top(indices) -> List[Dict[str, Any]]:
+            return [cards[i] for i in indices.tolist() if i in cards][:self.top_k]
+
+        by_category = {str(names[code]): top(indices) for code, indices in candidates.items()}
+        return {
+            "cards": top(overall),
+            "categories": {name: entries for name, entries in by_category.items() if entries},
+            "half_life_hours": self.half_life_hours,
+            "updated_at": datetime.now(),
+        }
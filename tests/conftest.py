@@ -0,0 +1,49 @@
+"""
+pytest の共通フィクスチャ
+記事・トピックの読み書きは memory / sqlite の両方のバックエンドで確認する
+（Firestore への接続は不要）
+"""
+
+import pytest
+
+from scripts.config import config
+from scripts.data_models import MathArticle
+from scripts.firestore_manager import FirestoreManager
+from scripts.storage_backends import MemoryBackend, SQLiteBackend
+
+@pytest.fixture(autouse=True)
+def offline_config(monkeypatch, tmp_path):
+    """ローカルキャッシュを一時ディレクトリに置き、任意機能は既定で無効にする"""
+    monkeypatch.setattr(config, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(config, "mirror_db_path", "")
+    for flag in ("article_counters", "article_feeds", "article_revisions", "sync_manifest"):
+        monkeypatch.setattr(config, flag, False)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / "mtmath.sqlite3"))
+
+@pytest.fixture
+def make_manager(backend, monkeypatch):
+    """設定を上書きして FirestoreManager を作る（例: make_manager(article_revisions=True)）"""
+    def make(**settings) -> FirestoreManager:
+        for name, value in settings.items():
+            monkeypatch.setattr(config, name, value)
+        return FirestoreManager(backend)
+    return make
+
+@pytest.fixture
+def manager(make_manager) -> FirestoreManager:
+    return make_manager()
+
+@pytest.fixture
+def make_article():
+    """テスト用の記事を作る（例: make_article("slug", status="published")）"""
+    def make(slug: str, title: str = None, category: str = "algebra",
+             content_html: str = "<p>本文</p>", **fields) -> MathArticle:
+        return MathArticle(title=title or slug, slug=slug, category=category, content_html=content_html,
+                           summary=f"{title or slug} の概要", difficulty_level=5, niche_score=5,
+                           tags=["テスト"], **fields)
+    return make
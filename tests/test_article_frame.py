@@ -0,0 +1,96 @@
+"""記事の列指向フレーム（読み込み・絞り込み・集計）とコーパスレポート"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from scripts import corpus_report
+from scripts.article_frame import ArticleFrame
+
+RECORDS = [
+    ("a1", {"category": "algebra", "status": "published", "difficulty_level": 3, "niche_score": 8,
+            "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc), "content_length": 1200,
+            "tags": ["群論", "対称性"]}),
+    ("a2", {"category": "algebra", "status": "draft", "difficulty_level": 7, "niche_score": 6,
+            "created_at": datetime(2024, 3, 1), "content_html": "<p>本文</p>", "tags": ["群論"]}),
+    ("g1", {"category": "geometry", "status": "published", "difficulty_level": 5, "niche_score": 9,
+            "tags": []}),
+    ("n1", {"category": "number_theory", "status": "published", "difficulty_level": 9,
+            "niche_score": 4, "created_at": datetime(2024, 6, 1), "tags": ["素数", "群論"]}),
+]
+
+@pytest.fixture
+def frame():
+    return ArticleFrame.from_records(RECORDS)
+
+def test_from_records_builds_columns(frame):
+    assert len(frame) == 4
+    assert list(frame.column("slug")) == ["a1", "a2", "g1", "n1"]
+    assert list(frame.column("category")) == ["algebra", "algebra", "geometry", "number_theory"]
+    assert list(frame.column("content_length")) == [1200, len("<p>本文</p>"), -1, -1]
+    assert np.isnat(frame.column("created_at")[2])
+    assert frame.tags_of(0) == ["群論", "対称性"]
+    assert frame.tags_of(2) == []
+
+def test_where_filters_rows_and_tags(frame):
+    published = frame.where(status="published")
+    assert list(published.slugs) == ["a1", "g1", "n1"]
+    assert [published.tags_of(i) for i in range(3)] == [["群論", "対称性"], [], ["素数", "群論"]]
+
+    assert list(frame.where(tag="群論", min_difficulty=5).slugs) == ["a2", "n1"]
+    assert list(frame.where(category="algebra", max_difficulty=5).slugs) == ["a1"]
+    assert list(frame.where(since=datetime(2024, 2, 1)).slugs) == ["a2", "n1"]
+    assert len(frame.where(category="analysis")) == 0
+    assert len(frame.where(tag="存在しないタグ")) == 0
+
+def test_value_counts_and_group_by(frame):
+    assert frame.value_counts("status") == {"draft": 1, "published": 3}
+    assert frame.group_by("category", "difficulty_level") == {
+        "algebra": 5.0, "geometry": 5.0, "number_theory": 9.0}
+    assert frame.group_by("category", "niche_score", how="sum")["algebra"] == 14.0
+    assert frame.group_by("status", "niche_score", how="count") == {"draft": 1.0, "published": 3.0}
+    with pytest.raises(ValueError):
+        frame.group_by("category", "niche_score", how="median")
+
+def test_histograms(frame):
+    counts, edges = frame.histogram("difficulty_level", bins=3, range=(0, 9))
+    assert list(counts) == [0, 2, 2]
+    assert list(edges) == [0, 3, 6, 9]
+
+    # 長さの無い記事・作成日時の無い記事は除く
+    assert frame.histogram("content_length", bins=2)[0].sum() == 2
+    assert frame.histogram("created_at", bins=2)[0].sum() == 3
+
+def test_tag_counts(frame):
+    assert frame.tag_counts() == {"群論": 3, "対称性": 1, "素数": 1}
+    assert frame.tag_counts(top=1) == {"群論": 3}
+
+def test_load_reads_articles_through_manager(manager, make_article):
+    for slug, category, status in [("x", "algebra", "published"), ("y", "geometry", "draft"),
+                                   ("z", "geometry", "published")]:
+        manager.save_article(make_article(slug, category=category, status=status))
+
+    frame = ArticleFrame.load(manager, [("status", "==", "published")])
+
+    assert sorted(frame.slugs) == ["x", "z"]
+    assert frame.value_counts("category") == {"algebra": 1, "geometry": 1}
+    assert frame.tag_counts() == {"テスト": 2}
+
+def test_corpus_report(frame, monkeypatch, manager, make_article, capsys):
+    report = corpus_report.build_report(frame)
+    assert report["total"] == 4
+    assert report["difficulty"][3] == 1 and report["difficulty"][9] == 1
+    assert sum(report["niche"].values()) == 4
+    assert report["mean_niche"]["algebra"] == 7.0
+    assert list(report["tags"]) == ["群論", "対称性", "素数"]
+
+    manager.save_article(make_article("x", status="published"))
+    manager.save_article(make_article("y", category="geometry"))
+    monkeypatch.setattr(corpus_report, "firestore_manager", manager)
+
+    corpus_report.main(["--status", "published"])
+
+    out = capsys.readouterr().out
+    assert "記事数: 1" in out
+    assert "テスト (1)" in out
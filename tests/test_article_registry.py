@@ -0,0 +1,102 @@
+"""記事登録簿と、登録簿で存在確認を省略した保存"""
+
+import json
+
+import pytest
+
+from scripts.article_registry import ArticleRegistry
+from scripts.firestore_manager import FirestoreManager
+from scripts.storage_backends import DocumentExistsError, MemoryBackend
+
+@pytest.fixture
+def registry():
+    registry = ArticleRegistry(MemoryBackend(), "articles")
+    registry.ensure_loaded()
+    return registry
+
+def test_discard_keeps_same_title_in_other_category(registry):
+    registry.add("a", "同じタイトル", "algebra")
+    registry.add("b", "同じタイトル", "geometry")
+
+    registry.discard("a")
+
+    assert not registry.has_title_prefix("algebra", "同じ")
+    assert registry.has_title_prefix("geometry", "同じ")
+
+def test_readd_moves_title_between_categories(registry):
+    registry.add("a", "同じタイトル", "algebra")
+    registry.add("b", "同じタイトル", "geometry")
+
+    registry.add("b", "同じタイトル", "algebra")
+
+    assert not registry.has_title_prefix("geometry", "同じ")
+    assert registry.titles["algebra"] == ["同じタイトル", "同じタイトル"]
+
+def test_old_cache_format_is_rescanned(tmp_path):
+    backend = MemoryBackend()
+    backend.set("articles", "a", {"title": "タイトル", "category": "algebra"})
+    cache_path = tmp_path / "registry.json"
+    cache_path.write_text(json.dumps({
+        "bloom": ArticleRegistry(backend, "articles").bloom.to_dict(),
+        "slugs": {"a": "タイトル"}, "titles": {"algebra": ["タイトル"]},
+        "watermark": "2026-01-01T00:00:00"}))
+
+    registry = ArticleRegistry(backend, "articles", cache_path=str(cache_path))
+
+    assert registry.may_contain_slug("a")
+    assert registry.slugs["a"] == ["タイトル", "algebra"]
+
+def _write_behind_registry(manager, backend, article):
+    """manager の登録簿を構築した後に、別のプロセスとして記事を書き込む"""
+    manager.registry.ensure_loaded()
+    FirestoreManager(backend).save_article(article)
+    assert not manager.registry.may_contain_slug(article.slug)
+
+def test_stale_registry_does_not_overwrite(manager, backend, make_article):
+    _write_behind_registry(manager, backend, make_article("euler", "元の記事"))
+
+    with pytest.raises(ValueError):
+        manager.save_article(make_article("euler", "重複した記事"))
+    with pytest.raises(DocumentExistsError):
+        manager.publish_generated_article(make_article("euler", "重複した記事"), None)
+    assert manager.get_article("euler").title == "元の記事"
+
+def test_stale_registry_overwrite_reads_previous(make_manager, backend, make_article):
+    manager = make_manager(article_counters=True)
+    manager.rebuild_article_counters()
+    _write_behind_registry(manager, backend, make_article("euler", "元の記事", status="draft"))
+
+    manager.save_article(make_article("euler", "公開した記事", status="published"), allow_overwrite=True)
+
+    assert manager.get_article("euler").title == "公開した記事"
+    assert manager.get_article_counts() == {"published": {"algebra": 1}}
+
+def test_stale_registry_bulk_overwrite(make_manager, backend, make_article):
+    manager = make_manager(article_counters=True)
+    manager.rebuild_article_counters()
+    _write_behind_registry(manager, backend, make_article("euler", "元の記事", status="draft"))
+
+    results = manager.save_articles_bulk([make_article("euler", "公開した記事", status="published"),
+                                          make_article("gauss", status="published")],
+                                         allow_overwrite=True)
+
+    assert all(result.ok for result in results)
+    assert manager.get_article("euler").title == "公開した記事"
+    assert manager.get_article_counts() == {"published": {"algebra": 2}}
+
+def test_title_check_sees_articles_saved_by_other_process(make_manager, backend, make_article):
+    manager = make_manager()
+    manager.save_article(make_article("euler", "オイラーの公式"))
+    assert manager.check_topic_exists("オイラー", "algebra")
+    assert not manager.check_topic_exists("ガウス", "algebra")
+
+    FirestoreManager(backend).save_article(make_article("gauss", "ガウス和"))
+
+    assert manager.check_topic_exists("ガウス", "algebra")
+    assert not manager.check_topic_exists("ガウス", "analysis")
+
+def test_refresh_without_watermark_rescans(registry):
+    registry.backend.set("articles", "a", {"title": "タイトル", "category": "algebra"})
+
+    assert registry.has_title_prefix("algebra", "タイ")
+    assert registry.watermark is None
@@ -0,0 +1,48 @@
+"""記事の版履歴（上書き・削除で残す版と、版への巻き戻し）"""
+
+import pytest
+
+from scripts.config import Config
+
+def test_revisions_are_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ARTICLE_REVISIONS", raising=False)
+
+    assert not Config().article_revisions
+
+@pytest.fixture
+def revised(make_manager, make_article):
+    """版を2つ持つ記事（版 #1 は "第1版"、版 #2 は "第2版"、現在は "第3版"）"""
+    manager = make_manager(article_revisions=True)
+    for n in (1, 2, 3):
+        manager.save_article(make_article("euler", f"第{n}版", content_html=f"<p>本文 {n}</p>"),
+                             allow_overwrite=True)
+    return manager
+
+@pytest.mark.parametrize("layout", ["inline", "split"])
+def test_overwrite_and_delete_keep_revisions(make_manager, make_article, layout):
+    manager = make_manager(article_revisions=True, article_body_layout=layout)
+    for n in (1, 2, 3):
+        manager.save_article(make_article("euler", f"第{n}版", content_html=f"<p>本文 {n}</p>"),
+                             allow_overwrite=True)
+    manager.delete_article("euler")
+
+    assert [info["title"] for info in manager.list_revisions("euler")] == ["第3版", "第2版", "第1版"]
+    assert manager.get_revision("euler", 1).content_html == "<p>本文 1</p>"
+
+def test_rollback_keeps_view_count(revised):
+    revised.record_view("euler", 7)
+    revised.rollup_view_counts()
+
+    revised.rollback_article("euler", 1)
+
+    article = revised.get_article("euler")
+    assert (article.title, article.content_html, article.view_count) == ("第1版", "<p>本文 1</p>", 7)
+    assert revised.list_revisions("euler")[0]["title"] == "第3版"
+
+def test_bulk_overwrite_keeps_revisions(revised, make_article):
+    results = revised.save_articles_bulk([make_article("euler", "第4版"), make_article("gauss")],
+                                         allow_overwrite=True)
+
+    assert all(result.ok for result in results)
+    assert revised.list_revisions("euler")[0]["title"] == "第3版"
+    assert revised.list_revisions("gauss") == []
@@ -0,0 +1,52 @@
+"""AsyncFirestoreManager が FirestoreManager と同じ書き込み・読み取りの手順を共用すること"""
+
+import asyncio
+
+import pytest
+
+from scripts.async_backends import ThreadedAsyncBackend
+from scripts.async_firestore_manager import AsyncFirestoreManager
+
+@pytest.fixture
+def make_async(make_manager, backend):
+    def make(**settings):
+        manager = make_manager(**settings)
+        return AsyncFirestoreManager(ThreadedAsyncBackend(backend), manager=manager), manager
+    return make
+
+def test_async_save_updates_shared_registry_index_and_cache(make_async, make_article):
+    async_manager, manager = make_async()
+    manager.registry.ensure_loaded()
+    assert manager.get_article("euler") is None
+
+    asyncio.run(async_manager.save_article(make_article("euler", "オイラーの公式", status="published")))
+
+    assert manager.registry.may_contain_slug("euler")
+    assert manager.get_article("euler").title == "オイラーの公式"
+    assert [a.slug for a in manager.search_articles("オイラー")] == ["euler"]
+    with pytest.raises(ValueError):
+        asyncio.run(async_manager.save_article(make_article("euler", "重複した記事")))
+
+def test_async_overwrite_keeps_view_count(make_async, make_article):
+    async_manager, manager = make_async()
+    manager.save_article(make_article("euler", status="published"))
+    manager.record_view("euler", 3)
+    manager.rollup_view_counts()
+
+    asyncio.run(async_manager.save_article(make_article("euler", "書き直した記事"), allow_overwrite=True))
+
+    article = asyncio.run(async_manager.get_article("euler"))
+    assert (article.title, article.view_count) == ("書き直した記事", 3)
+
+def test_async_writes_maintain_feeds(make_async, make_article):
+    async_manager, manager = make_async(article_feeds=True)
+    manager.rebuild_feeds()
+
+    async def scenario():
+        await async_manager.save_articles([make_article("euler", status="published"),
+                                           make_article("gauss", status="published")])
+        await async_manager.delete_article("euler")
+        return await async_manager.get_all_published_articles()
+
+    assert [a.slug for a in asyncio.run(scenario())] == ["gauss"]
+    assert [a.slug for a in manager.get_articles_by_category("algebra")] == ["gauss"]
@@ -0,0 +1,64 @@
+"""バッチ生成で、公開済みの記事があるトピックを Gemini を呼ばずに処理すること"""
+
+import pytest
+
+import scripts.batch_generate as batch_generate
+from scripts.batch_generate import BatchGenerator
+from scripts.data_models import MathArticle, MathTopic
+
+class RecordingGenerator:
+    """generate_article の呼び出しを記録する記事生成器（Gemini は呼ばない）"""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_article(self, topic, category, title, summary, difficulty_level, niche_score, tags):
+        self.calls.append(title)
+        return MathArticle(title=title, slug=MathArticle.generate_slug(title), category=category,
+                           content_html="<p>生成した本文</p>", summary=summary,
+                           difficulty_level=difficulty_level, niche_score=niche_score, tags=tags)
+
+@pytest.fixture
+def batch(manager, monkeypatch):
+    monkeypatch.setattr(batch_generate, "firestore_manager", manager)
+    monkeypatch.setattr(batch_generate.time, "sleep", lambda seconds: None)
+    batch = BatchGenerator.__new__(BatchGenerator)
+    batch.article_generator = RecordingGenerator()
+    batch.worker_id = "worker"
+    return batch
+
+def _save_topic(manager, title):
+    return manager.save_topic(MathTopic(name="環論", category="algebra", description="概要", title=title,
+                                        summary="要約", difficulty_level=5, niche_score=5, tags=["テスト"]))
+
+def test_published_topic_is_skipped_without_generating(batch, manager, make_article):
+    topic_id = _save_topic(manager, "Ring Theory")
+    manager.save_article(make_article("ring-theory", "Ring Theory"))
+
+    results = batch.run_full_workflow(1)
+
+    assert batch.article_generator.calls == []
+    assert results["skipped_articles"] == [{"topic": "環論", "slug": "ring-theory"}]
+    assert results["failed_articles"] == []
+    topic = manager.get_topics([topic_id])[0]
+    assert (topic.article_generated, topic.article_slug) == (True, "ring-theory")
+
+def test_slug_owned_by_other_article_fails_topic(batch, manager, make_article):
+    topic_id = _save_topic(manager, "Ring Theory!")
+    manager.save_article(make_article("ring-theory", "Ring Theory"))
+
+    results = batch.run_full_workflow(1)
+
+    assert batch.article_generator.calls == []
+    assert [failed["topic"] for failed in results["failed_articles"]] == ["環論"]
+    assert not manager.get_topics([topic_id])[0].article_generated
+    assert [t.topic_id for t in manager.claim_topics("other")] == [topic_id]
+
+def test_new_topic_is_generated_and_published(batch, manager):
+    topic_id = _save_topic(manager, "Ring Theory")
+
+    results = batch.run_full_workflow(1)
+
+    assert batch.article_generator.calls == ["Ring Theory"]
+    assert results["articles_generated"] == 1
+    assert manager.get_topics([topic_id])[0].article_slug == "ring-theory"
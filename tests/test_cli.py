@@ -0,0 +1,137 @@
+"""統合 CLI のディスパッチと常駐デーモンとのソケット往復"""
+
+import io
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from scripts import cli, daemon
+from scripts.cli import Command
+
+@pytest.fixture
+def job(monkeypatch):
+    """テスト用のサブコマンド "echo"（引数を表示し、"read" を渡すと標準入力を読む）"""
+    calls = []
+
+    def main(argv):
+        calls.append(argv)
+        if argv == ["read"]:
+            print(f"入力: {input()}")
+            return None
+        print(" ".join(argv))
+        return False if argv == ["fail"] else None
+
+    monkeypatch.setitem(sys.modules, "tests_echo_job", types.SimpleNamespace(main=main))
+    monkeypatch.setitem(cli.COMMANDS, "echo", Command("tests_echo_job", "テスト用", True))
+    monkeypatch.setitem(cli.COMMANDS, "echo-local",
+                        Command("tests_echo_job", "テスト用", True, daemon_ok=False))
+    return calls
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """submit_job の呼び出しを記録し、raises に入れた例外を送出する"""
+    calls = []
+    state = {"raises": None}
+
+    def submit_job(command, args, socket_path=None):
+        calls.append((command, args))
+        if state["raises"]:
+            raise state["raises"]
+        return 7
+
+    monkeypatch.setattr(daemon, "submit_job", submit_job)
+    return calls, state
+
+def test_runs_locally_without_daemon_flag(job, submitted, capsys):
+    calls, _ = submitted
+
+    assert cli.main(["echo", "a", "b"]) == 0
+
+    assert calls == []
+    assert job == [["a", "b"]]
+    assert capsys.readouterr().out == "a b\n"
+
+def test_false_result_becomes_exit_code_1(job, submitted):
+    assert cli.main(["echo", "fail"]) == 1
+
+def test_daemon_flag_forwards_job(job, submitted):
+    calls, _ = submitted
+
+    assert cli.main(["--daemon", "echo", "a"]) == 7
+
+    assert calls == [("echo", ["a"])]
+    assert job == []
+
+def test_daemon_flag_ignored_for_local_only_commands(job, submitted):
+    calls, _ = submitted
+
+    assert cli.main(["--daemon", "echo-local", "a"]) == 0
+
+    assert calls == []
+    assert job == [["a"]]
+
+@pytest.mark.parametrize("error", [daemon.DaemonUnavailable("sock"), daemon.DaemonRefused("環境変数が異なります")])
+def test_falls_back_to_local_when_daemon_unavailable_or_refuses(job, submitted, error, capsys):
+    calls, state = submitted
+    state["raises"] = error
+
+    assert cli.main(["--daemon", "echo", "a"]) == 0
+
+    assert calls == [("echo", ["a"])]
+    assert job == [["a"]]
+    assert "現在のプロセスで実行します" in capsys.readouterr().err
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    socket_path = str(tmp_path / "d.sock")
+    worker = daemon.WorkerDaemon(socket_path)
+    thread = threading.Thread(target=worker.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "デーモンが起動しませんでした"
+        time.sleep(0.01)
+    yield socket_path
+    daemon.submit_job("shutdown", socket_path=socket_path, stream=io.StringIO())
+    thread.join(5)
+    assert not os.path.exists(socket_path)
+
+def test_socket_round_trip(job, running_daemon):
+    out = io.StringIO()
+
+    assert daemon.submit_job("echo", ["x", "y"], socket_path=running_daemon, stream=out) == 0
+    assert daemon.submit_job("echo", ["fail"], socket_path=running_daemon, stream=io.StringIO()) == 1
+
+    assert "x y\n" in out.getvalue()
+    assert job == [["x", "y"], ["fail"]]
+
+    pong = io.StringIO()
+    assert daemon.submit_job("ping", socket_path=running_daemon, stream=pong) == 0
+    assert "jobs=2" in pong.getvalue()
+
+def test_daemon_refuses_local_only_commands(job, running_daemon):
+    out = io.StringIO()
+
+    assert daemon.submit_job("echo-local", ["a"], socket_path=running_daemon, stream=out) == 2
+    assert job == []
+
+def test_daemon_refuses_different_cwd_or_env(job, running_daemon, tmp_path):
+    with pytest.raises(daemon.DaemonRefused, match="作業ディレクトリ"):
+        daemon.submit_job("echo", ["a"], socket_path=running_daemon, cwd=str(tmp_path))
+
+    env = dict(daemon.job_environment(), STORAGE_BACKEND="memory-elsewhere")
+    with pytest.raises(daemon.DaemonRefused, match="STORAGE_BACKEND"):
+        daemon.submit_job("echo", ["a"], socket_path=running_daemon, env=env)
+
+    assert job == []
+
+def test_daemon_job_cannot_read_stdin(job, running_daemon):
+    out = io.StringIO()
+
+    assert daemon.submit_job("echo", ["read"], socket_path=running_daemon, stream=out) == 1
+    assert "標準入力を読めません" in out.getvalue()
+    assert not isinstance(sys.stdin, daemon._NoStdin)
@@ -0,0 +1,132 @@
+"""FirestoreManager の記事の保存・取得・削除と、トピックのリース"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scripts.data_models import MathTopic
+
+def test_save_and_get_article(manager, make_article):
+    manager.save_article(make_article("euler", "オイラーの公式", status="published"))
+
+    article = manager.get_article("euler")
+    assert article.title == "オイラーの公式"
+    assert article.content_html == "<p>本文</p>"
+    assert [a.slug for a in manager.get_all_published_articles()] == ["euler"]
+
+def test_save_article_rejects_duplicate(manager, make_article):
+    manager.save_article(make_article("euler"))
+
+    with pytest.raises(ValueError):
+        manager.save_article(make_article("euler", "別のタイトル"))
+    assert manager.get_article("euler").title == "euler"
+
+def test_split_layout_round_trip(make_manager, make_article):
+    manager = make_manager(article_body_layout="split")
+    body = "<p>" + "長い本文。" * 1000 + "</p>"
+    manager.save_article(make_article("long", content_html=body))
+
+    assert manager.get_article("long").content_html == body
+    assert manager.get_articles(["long", "missing"])[1] is None
+
+def test_delete_article(manager, make_article):
+    manager.save_article(make_article("euler"))
+
+    assert manager.delete_article("euler")
+    assert manager.get_article("euler") is None
+    assert not manager.delete_article("euler")
+
+def test_rebuild_feeds_empties_categories_without_articles(make_manager, make_article):
+    manager = make_manager(article_feeds=True)
+    manager.rebuild_feeds()
+    manager.save_article(make_article("euler", status="published"))
+    manager.save_article(make_article("circle", category="analysis", status="published"))
+    # フィードを更新せずに削除された記事（ずれ）を再現する
+    manager.backend.delete(manager.articles_collection, "circle")
+
+    totals = manager.rebuild_feeds()
+
+    assert totals["category_analysis"] == 0
+    assert manager.backend.get(manager.feeds_collection, "category_analysis")["cards"] == []
+    assert [c["slug"] for c in manager.backend.get(manager.feeds_collection, "home")["cards"]] == ["euler"]
+    assert manager.get_articles_by_category("analysis") == []
+
+def _topic(name: str, priority: int = 5) -> MathTopic:
+    return MathTopic(name=name, category="number_theory", description="概要", title=f"{name}入門",
+                     summary="要約", difficulty_level=5, niche_score=5, tags=["テスト"], priority=priority)
+
+def _lease_owner(manager, topic_id):
+    return manager.backend.get(manager.topics_collection, topic_id, ["lease_owner"]).get("lease_owner")
+
+def test_reset_topic_status_clears_article_slug(manager):
+    topic_id = manager.save_topic(_topic("ペル方程式"))
+    manager.mark_topic_as_generated(topic_id, "pell")
+    assert manager.get_topics([topic_id])[0].article_slug == "pell"
+
+    manager.update_topic_status(topic_id, generated=False)
+
+    topic = manager.get_topics([topic_id])[0]
+    assert (topic.article_generated, topic.article_slug) == (False, None)
+    assert [t.topic_id for t in manager.get_ungenerated_topics()] == [topic_id]
+
+def test_concurrent_claims_are_disjoint(manager):
+    topic_ids = {manager.save_topic(_topic(f"トピック{i}")) for i in range(6)}
+    claims = {}
+
+    def claim(worker):
+        claims[worker] = {topic.topic_id for topic in manager.claim_topics(worker, count=3)}
+
+    workers = [threading.Thread(target=claim, args=(f"worker-{i}",)) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    claimed = [topic_id for ids in claims.values() for topic_id in ids]
+    assert len(claimed) == len(set(claimed)) == 6
+    assert set(claimed) == topic_ids
+
+def test_claim_prefers_priority_and_skips_leased(manager):
+    low = manager.save_topic(_topic("低", priority=1))
+    high = manager.save_topic(_topic("高", priority=9))
+
+    assert [t.topic_id for t in manager.claim_topics("a", count=1)] == [high]
+    assert [t.topic_id for t in manager.claim_topics("b", count=2)] == [low]
+    assert manager.claim_topics("c", count=2) == []
+
+def test_expired_lease_is_reclaimed(manager):
+    topic_id = manager.save_topic(_topic("ペル方程式"))
+    manager.claim_topics("a")
+    manager.backend.update(manager.topics_collection, topic_id,
+                           {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+
+    assert [t.topic_id for t in manager.claim_topics("b")] == [topic_id]
+    assert _lease_owner(manager, topic_id) == "b"
+    assert manager.renew_leases([topic_id], "a") == {topic_id: False}
+
+def test_non_owner_cannot_renew_or_release(manager):
+    topic_id = manager.save_topic(_topic("ペル方程式"))
+    manager.claim_topics("a")
+
+    assert manager.renew_leases([topic_id], "b") == {topic_id: False}
+    manager.release_topics([topic_id], "b")
+    assert _lease_owner(manager, topic_id) == "a"
+    assert manager.claim_topics("b") == []
+
+    assert manager.renew_leases([topic_id], "a") == {topic_id: True}
+    manager.release_topics([topic_id], "a")
+    assert [t.topic_id for t in manager.claim_topics("b")] == [topic_id]
+
+def test_marking_generated_ends_lease(manager, make_article):
+    marked = manager.save_topic(_topic("ペル方程式"))
+    published = manager.save_topic(_topic("フェルマー数"))
+    manager.claim_topics("a", count=2)
+
+    manager.mark_topic_as_generated(marked, "pell")
+    manager.publish_generated_article(make_article("fermat"), published)
+
+    for topic_id in (marked, published):
+        assert _lease_owner(manager, topic_id) is None
+        assert manager.renew_leases([topic_id], "a") == {topic_id: False}
+    assert manager.claim_topics("b", count=2) == []
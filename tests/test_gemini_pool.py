@@ -0,0 +1,141 @@
+"""Gemini モデルプールのキー振り分けと 429 時の隔離"""
+
+import threading
+
+import pytest
+from google.api_core.exceptions import InternalServerError, ResourceExhausted
+
+from scripts import gemini_pool
+from scripts.gemini_pool import (LEAST_LOADED, MAX_QUARANTINE_SECONDS, GeminiModelPool, KeyedModel,
+                                 is_rate_limit_error)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class FakeModel:
+    """呼び出しを記録し、errors に入れた例外を順に送出するモデル"""
+
+    def __init__(self, name, calls, errors=()):
+        self.name = name
+        self.calls = calls
+        self.errors = list(errors)
+
+    def generate_content(self, prompt):
+        self.calls.append(self.name)
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"{self.name}:{prompt}"
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gemini_pool.time, "sleep", lambda seconds: setattr(clock, "now", clock.now + seconds))
+    return clock
+
+def _pool(calls, clock, errors=None, **kwargs):
+    errors = errors or {}
+    models = [(name, FakeModel(name, calls, errors.get(name, ()))) for name in ("a", "b", "c")]
+    return GeminiModelPool(models, clock=clock, quarantine_seconds=60, **kwargs)
+
+def test_round_robin_rotates_keys(clock):
+    calls = []
+    pool = _pool(calls, clock)
+
+    responses = [pool.generate_content("問") for _ in range(4)]
+
+    assert calls == ["a", "b", "c", "a"]
+    assert responses[1] == "b:問"
+    assert [s["successes"] for s in pool.stats()] == [2, 1, 1]
+
+def test_least_loaded_avoids_busy_key(clock):
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingModel(FakeModel):
+        def generate_content(self, prompt):
+            started.set()
+            release.wait(5)
+            return super().generate_content(prompt)
+
+    pool = GeminiModelPool([("a", BlockingModel("a", calls)), ("b", FakeModel("b", calls))],
+                           strategy=LEAST_LOADED, clock=clock)
+    worker = threading.Thread(target=pool.generate_content, args=("問",))
+    worker.start()
+    started.wait(5)
+
+    assert pool.stats()[0]["in_flight"] == 1
+    assert [pool.generate_content("問") for _ in range(2)] == ["b:問", "b:問"]
+
+    release.set()
+    worker.join(5)
+    assert pool.generate_content("問") == "a:問"
+
+def test_rate_limited_key_is_retried_elsewhere_and_quarantined(clock):
+    calls = []
+    pool = _pool(calls, clock, errors={"a": [ResourceExhausted("quota")]})
+
+    assert pool.generate_content("問") == "b:問"
+
+    assert calls == ["a", "b"]
+    stats = pool.stats()[0]
+    assert (stats["rate_limited"], stats["quarantined_for"]) == (1, 60)
+    assert pool.generate_content("問") == "c:問"
+    assert pool.generate_content("問") == "b:問"
+
+def test_quarantine_grows_exponentially_and_resets_on_success(clock):
+    calls = []
+    pool = GeminiModelPool([("a", FakeModel("a", calls, [ResourceExhausted("quota")] * 6)),
+                            ("b", FakeModel("b", calls))], clock=clock, quarantine_seconds=60)
+
+    durations = []
+    for _ in range(6):
+        assert pool.generate_content("問") == "b:問"
+        durations.append(pool.stats()[0]["quarantined_for"])
+        clock.now += durations[-1]
+
+    assert durations == [60, 120, 240, 480, MAX_QUARANTINE_SECONDS, MAX_QUARANTINE_SECONDS]
+    assert calls == ["a", "b"] * 6
+
+    assert pool.generate_content("問") == "a:問"
+    pool.states[0].model.errors = [ResourceExhausted("quota")]
+    pool.generate_content("問")
+    pool.generate_content("問")
+    assert pool.stats()[0]["quarantined_for"] == 60
+
+def test_other_errors_are_raised_without_quarantine(clock):
+    calls = []
+    pool = _pool(calls, clock, errors={"a": [InternalServerError("quota 429")]})
+
+    with pytest.raises(InternalServerError):
+        pool.generate_content("問")
+
+    stats = pool.stats()[0]
+    assert (stats["failures"], stats["rate_limited"], stats["quarantined_for"]) == (1, 0, 0)
+
+def test_is_rate_limit_error_uses_type_or_status_code():
+    class HttpError(Exception):
+        code = 429
+
+    assert is_rate_limit_error(ResourceExhausted("x"))
+    assert is_rate_limit_error(HttpError("x"))
+    assert not is_rate_limit_error(RuntimeError("429 quota RESOURCE_EXHAUSTED"))
+
+def test_keyed_model_configures_its_key(monkeypatch):
+    import google.generativeai as genai
+
+    configured = []
+    monkeypatch.setattr(gemini_pool, "_configured_key", None)
+    monkeypatch.setattr(genai, "configure", lambda api_key: configured.append(api_key))
+    monkeypatch.setattr(genai, "GenerativeModel",
+                        lambda name: FakeModel(f"{name}@{configured[-1]}", []))
+
+    first, second = KeyedModel("key-1", "gemini"), KeyedModel("key-2", "gemini")
+
+    assert first.generate_content("問") == "gemini@key-1:問"
+    assert first.generate_content("問") == "gemini@key-1:問"
+    assert second.generate_content("問") == "gemini@key-2:問"
+    assert configured == ["key-1", "key-2"]
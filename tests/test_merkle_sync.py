@@ -0,0 +1,71 @@
+"""マニフェストによる差分同期（まとめた転送と、作り直し中の書き込みの記録）"""
+
+import pytest
+
+from scripts.firestore_manager import FirestoreManager
+from scripts.merkle_sync import DIRTY_FIELD, DIRTY_PREFIX, MerkleSync, bucket_of, buckets_collection
+from scripts.storage_backends import MemoryBackend
+
+@pytest.fixture
+def writer(make_manager):
+    """書き込みを同期マニフェストに記録する manager"""
+    return make_manager(sync_manifest=True)
+
+@pytest.fixture
+def sync(writer, backend):
+    return MerkleSync(backend, MemoryBackend(), writer, [writer.articles_collection])
+
+def test_pull_copies_split_articles(writer, sync, make_article):
+    writer.body_layout = "split"
+    for i in range(30):
+        writer.save_article(make_article(f"article-{i}", content_html=f"<p>本文 {i}</p>"))
+    sync.rebuild(sync.remote, writer.articles_collection)
+
+    result = sync.pull()[writer.articles_collection]
+
+    assert (result["copied"], result["failed"]) == (30, 0)
+    assert FirestoreManager(sync.local).get_article("article-7").content_html == "<p>本文 7</p>"
+    assert sync.status()[writer.articles_collection]["changed_buckets"] == 0
+
+def test_rebuild_keeps_marks_written_during_scan(writer, sync, backend, make_article, monkeypatch):
+    writer.save_article(make_article("euler"))
+    paginate = backend.paginate
+
+    def paginate_while_writing(*args, **kwargs):
+        for doc in paginate(*args, **kwargs):
+            yield doc
+            if doc.id == "euler":
+                writer.save_article(make_article("gauss"))
+
+    monkeypatch.setattr(backend, "paginate", paginate_while_writing)
+    sync.rebuild(backend, writer.articles_collection)
+    monkeypatch.undo()
+
+    bucket = bucket_of("gauss", sync.digits)
+    entries = backend.get(buckets_collection(sync.manifest_collection, writer.articles_collection), bucket)
+    assert entries["gauss"].startswith(DIRTY_PREFIX)
+    assert sync.roots(backend, writer.articles_collection)[bucket] is None
+    assert sync.pull()[writer.articles_collection]["copied"] == 2
+
+def test_writes_mark_buckets_without_touching_roots(writer, sync, backend, make_article):
+    writer.save_article(make_article("euler"))
+    sync.rebuild(backend, writer.articles_collection)
+    sync.pull()
+    roots_doc = backend.get(sync.manifest_collection, writer.articles_collection)
+
+    writer.save_article(make_article("gauss"))
+    writer.save_article(make_article("euler", "書き直した記事"), allow_overwrite=True)
+
+    assert backend.get(sync.manifest_collection, writer.articles_collection) == roots_doc
+    changed = {bucket_of(slug, sync.digits) for slug in ("euler", "gauss")}
+    roots = sync.roots(backend, writer.articles_collection)
+    assert {bucket for bucket, root in roots.items() if root is None} == changed
+    assert sync.status()[writer.articles_collection]["changed_buckets"] == len(changed)
+
+    assert sync.pull()[writer.articles_collection]["copied"] == 2
+
+    manifests = buckets_collection(sync.manifest_collection, writer.articles_collection)
+    assert all(DIRTY_FIELD not in backend.get(manifests, bucket) for bucket in changed)
+    assert sync.roots(backend, writer.articles_collection) == sync.roots(sync.local, writer.articles_collection)
+    assert sync.status()[writer.articles_collection]["changed_buckets"] == 0
+    assert FirestoreManager(sync.local).get_article("euler").title == "書き直した記事"
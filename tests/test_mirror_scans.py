@@ -0,0 +1,92 @@
+"""ミラーの鮮度と、ミラーが遅れていても書き込みの元にする走査は本番のバックエンドから読むこと"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from scripts.firestore_manager import FirestoreManager
+from scripts.firestore_mirror import MIRROR_STATE_COLLECTION, FirestoreMirror
+from scripts.migrate_article_bodies import migrate
+from scripts.storage_backends import MemoryBackend, SQLiteBackend, WriteOp
+
+@pytest.fixture
+def stale_mirror(make_manager, backend, make_article):
+    """記事を保存した後、まだ何も複製していない（初回読み込み済みとだけ記録した）ミラーを持つ manager"""
+    make_manager(article_counters=True)
+    writer = FirestoreManager(backend)
+    for slug in ("euler", "gauss"):
+        writer.save_article(make_article(slug, status="published"))
+    mirror = MemoryBackend()
+    mirror.set(MIRROR_STATE_COLLECTION, writer.articles_collection, {"synced_at": datetime.now()})
+    manager = FirestoreManager(backend, mirror=mirror)
+    assert list(manager.iter_articles()) == []
+    return manager
+
+def test_rebuild_counters_reads_primary(stale_mirror):
+    assert stale_mirror.rebuild_article_counters() == {"published": {"algebra": 2}}
+
+def test_migrate_bodies_reads_primary(stale_mirror):
+    assert migrate(stale_mirror, "split")["migrated"] == 2
+    assert stale_mirror.backend.get(stale_mirror.bodies_collection, "euler") is not None
+
+@pytest.fixture
+def mirrored(make_manager, backend, make_article, tmp_path):
+    """記事1件を複製したミラーと、それを読む manager（許容遅れ 300 秒）"""
+    make_manager(mirror_max_age_seconds=300)
+    writer = FirestoreManager(backend)
+    writer.save_article(make_article("euler", status="published"))
+    mirror = FirestoreMirror(backend, SQLiteBackend(str(tmp_path / "mirror.sqlite3")),
+                             [writer.articles_collection])
+    mirror.sync_all()
+    writer.save_article(make_article("gauss", status="published"))
+    return mirror, FirestoreManager(backend, mirror=mirror.local)
+
+def _age(mirror, collection, seconds):
+    mirror.local.update(MIRROR_STATE_COLLECTION, collection,
+                        {"synced_at": datetime.now() - timedelta(seconds=seconds)})
+
+def test_fresh_mirror_serves_reads(mirrored):
+    mirror, manager = mirrored
+
+    assert [r.id for r in manager.iter_articles()] == ["euler"]
+
+def test_stale_mirror_falls_back_to_backend(mirrored):
+    mirror, manager = mirrored
+    _age(mirror, manager.articles_collection, 301)
+
+    assert sorted(r.id for r in manager.iter_articles()) == ["euler", "gauss"]
+    assert manager.get_stats()["total_articles"] == 2
+
+    mirror.sync_all()
+    assert sorted(r.id for r in manager.iter_articles()) == ["euler", "gauss"]
+    assert manager._use_mirror(manager.articles_collection)
+
+def test_unbounded_mirror_age(mirrored, monkeypatch):
+    from scripts.config import config
+
+    mirror, manager = mirrored
+    _age(mirror, manager.articles_collection, 10 ** 6)
+    monkeypatch.setattr(config, "mirror_max_age_seconds", 0)
+
+    assert [r.id for r in manager.iter_articles()] == ["euler"]
+
+class ListeningBackend(MemoryBackend):
+    """購読すると現在の内容を full=True で1度だけ通知するバックエンド"""
+
+    def watch(self, collection, on_change):
+        on_change([WriteOp("set", collection, r.id, r.data) for r in self.paginate(collection, fields=None)],
+                  True)
+        return lambda: None
+
+def test_listener_heartbeat_keeps_mirror_fresh(tmp_path):
+    mirror = FirestoreMirror(ListeningBackend(), SQLiteBackend(str(tmp_path / "mirror.sqlite3")), ["articles"])
+    mirror.heartbeat()
+    assert mirror.state("articles") == {}
+
+    assert mirror.listen()
+    _age(mirror, "articles", 1000)
+    mirror.heartbeat()
+
+    synced_at = mirror.state("articles")["synced_at"]
+    assert datetime.now() - synced_at < timedelta(seconds=5)
+    assert mirror.state("articles")["mode"] == "listen"
@@ -0,0 +1,87 @@
+"""読み取りキャッシュ（LRU・種別ごとの TTL・書き込み時の無効化・ヒット/ミス件数）"""
+
+import pytest
+
+from scripts.config import Config
+from scripts.data_models import MathTopic
+from scripts.read_cache import MISS, ReadCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_cache_is_disabled_by_default(monkeypatch, manager):
+    monkeypatch.delenv("READ_CACHE_MAX_ENTRIES", raising=False)
+
+    assert Config().read_cache_max_entries == 0
+    assert not manager.cache.enabled
+
+def test_lru_evicts_least_recently_used():
+    cache = ReadCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is MISS
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_per_kind():
+    clock = FakeClock()
+    cache = ReadCache(max_entries=10, default_ttl=30, ttls={"article": 300, "list": 60, "topic": 0}, clock=clock)
+    cache.put("article", "記事", kind="article")
+    cache.put("list", ["記事"], kind="list")
+    cache.put("other", "その他")
+    cache.put("topic", "トピック", kind="topic")
+
+    clock.now = 61
+
+    assert cache.get("article") == "記事"
+    assert cache.get("list") is MISS
+    assert cache.get("other") is MISS
+    assert cache.get("topic") is MISS
+    assert len(cache) == 1
+
+def test_hit_and_miss_counters():
+    cache = ReadCache(max_entries=10)
+    loads = []
+    for _ in range(3):
+        cache.get_or_load("key", lambda: loads.append(1) or "値")
+
+    assert len(loads) == 1
+    assert cache.stats() == {"size": 1, "max_entries": 10, "hits": 2, "misses": 1,
+                             "evictions": 0, "hit_rate": pytest.approx(2 / 3)}
+
+@pytest.fixture
+def cached(make_manager):
+    return make_manager(read_cache_max_entries=100)
+
+def test_save_article_invalidates_article_and_lists(cached, make_article):
+    assert cached.get_article("euler") is None
+    assert cached.get_all_published_articles() == []
+
+    cached.save_article(make_article("euler", "オイラー", status="published"))
+
+    assert cached.get_article("euler").title == "オイラー"
+    assert [a.slug for a in cached.get_all_published_articles()] == ["euler"]
+
+    cached.save_article(make_article("euler", "書き直した記事", status="published"), allow_overwrite=True)
+    assert cached.get_article("euler").title == "書き直した記事"
+    assert cached.cache.stats()["hits"] == 0
+
+def test_update_topic_status_invalidates_topic(cached):
+    topic_id = cached.save_topic(MathTopic(name="ペル方程式", category="number_theory", description="概要",
+                                           title="ペル方程式入門", summary="要約", difficulty_level=5,
+                                           niche_score=5, tags=["テスト"]))
+    assert not cached.get_topics([topic_id])[0].article_generated
+    assert not cached.get_topics([topic_id])[0].article_generated
+    assert cached.cache.stats()["hits"] == 1
+
+    cached.update_topic_status(topic_id, generated=True, article_slug="pell")
+
+    assert cached.get_topics([topic_id])[0].article_slug == "pell"
@@ -0,0 +1,24 @@
+"""全文検索インデックス（1文字の検索と、他のプロセスでの削除の反映）"""
+
+from scripts.firestore_manager import FirestoreManager
+
+def test_single_character_query(manager, make_article):
+    manager.save_article(make_article("ring", "可換環", status="published"))
+    manager.save_article(make_article("group", "巡回群", status="published"))
+
+    assert [a.slug for a in manager.search_articles("環")] == ["ring"]
+    assert [a.slug for a in manager.search_articles("可換")] == ["ring"]
+
+def test_reload_drops_articles_deleted_by_other_process(make_manager, backend, make_article):
+    manager = make_manager()
+    for slug in ("ring", "field"):
+        manager.save_article(make_article(slug, "可換環と体", status="published"))
+    assert len(manager.search_articles("可換")) == 2
+    manager.search_index.save()
+
+    FirestoreManager(backend).delete_article("field")
+    other = make_manager()
+
+    assert other.search_articles("群") == []
+    assert len(other.search_index) == 1
+    assert [a.slug for a in other.search_articles("可換")] == ["ring"]
@@ -0,0 +1,47 @@
+"""人気記事ランキング（集計と同じコミットで記録した増分の反映と、保持する記事数の上限）"""
+
+import pytest
+
+from scripts.firestore_manager import TRENDING_PENDING_DOC
+from scripts.trending import TRENDING_STATE_DOC, TrendingRanking
+
+@pytest.fixture
+def viewed(manager, make_article):
+    """閲覧数を記録した3件の公開記事（euler 5回、gauss 3回、riemann 1回）"""
+    for slug, views in (("euler", 5), ("gauss", 3), ("riemann", 1)):
+        manager.save_article(make_article(slug, status="published"))
+        manager.record_view(slug, views)
+    return manager
+
+def test_update_applies_pending_views(viewed):
+    viewed.rollup_view_counts(trending=True)
+
+    ranking = TrendingRanking(viewed).update()
+
+    assert [card["slug"] for card in ranking["cards"]] == ["euler", "gauss", "riemann"]
+    assert viewed.backend.get(viewed.stats_collection, TRENDING_PENDING_DOC) is None
+
+def test_failed_update_keeps_pending_views(viewed, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("ランキングの更新に失敗")
+
+    ranking = TrendingRanking(viewed)
+    viewed.rollup_view_counts(trending=True)
+    with monkeypatch.context() as patch:
+        patch.setattr(ranking, "_ranking", fail)
+        with pytest.raises(RuntimeError):
+            ranking.update()
+    viewed.record_view("riemann", 10)
+    viewed.rollup_view_counts(trending=True)
+
+    cards = ranking.update()["cards"]
+
+    assert [(card["slug"], card["score"]) for card in cards] == [("riemann", 11), ("euler", 5), ("gauss", 3)]
+
+def test_tracked_articles_are_capped(viewed):
+    viewed.rollup_view_counts(trending=True)
+
+    TrendingRanking(viewed, max_tracked=2).update()
+
+    state = viewed.backend.get(viewed.stats_collection, TRENDING_STATE_DOC)
+    assert state["slugs"] == ["euler", "gauss"]
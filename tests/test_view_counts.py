@@ -0,0 +1,57 @@
+"""閲覧数のシャードと集計（rollup_view_counts）"""
+
+import pytest
+
+@pytest.fixture
+def viewed(manager, make_article):
+    """閲覧数を5回記録して集計済みの記事"""
+    manager.save_article(make_article("euler", status="published"))
+    manager.record_view("euler", 5)
+    assert manager.rollup_view_counts() == {"euler": 5}
+    return manager
+
+def test_rollup_moves_shards_into_view_count(viewed):
+    viewed.record_view("euler")
+
+    assert viewed.get_article("euler").view_count == 5
+    assert viewed.get_view_count("euler") == 6
+
+@pytest.mark.parametrize("layout", ["inline", "split"])
+def test_overwrite_keeps_view_count(viewed, make_article, layout):
+    viewed.body_layout = layout
+    stale = make_article("euler", "書き直した記事", status="published")
+    assert stale.view_count == 0
+
+    viewed.save_article(stale, allow_overwrite=True)
+
+    assert viewed.get_article("euler").title == "書き直した記事"
+    assert viewed.get_article("euler").view_count == 5
+    assert stale.view_count == 5
+
+def test_publish_overwrite_keeps_view_count(viewed, make_article):
+    viewed.publish_generated_article(make_article("euler", "再生成した記事"), None, allow_overwrite=True)
+
+    assert viewed.get_view_count("euler") == 5
+
+def test_bulk_overwrite_keeps_view_count(viewed, make_article):
+    results = viewed.save_articles_bulk([make_article("euler", "書き直した記事"), make_article("gauss")],
+                                        allow_overwrite=True)
+
+    assert all(result.ok for result in results)
+    assert [a.view_count for a in viewed.get_articles(["euler", "gauss"])] == [5, 0]
+
+def test_rollup_drops_views_of_deleted_articles(viewed):
+    viewed.record_view("euler", 2)
+    viewed.delete_article("euler")
+
+    assert viewed.rollup_view_counts() == {}
+    assert viewed.get_view_count("euler") == 0
+
+def test_rollup_discards_shards_outside_range(viewed):
+    viewed.backend.increment(viewed.view_shards_collection, "euler:99", {"count": 100})
+    viewed.backend.increment(viewed.view_shards_collection, "euler:x", {"count": 100})
+    viewed.record_view("euler")
+
+    assert viewed.rollup_view_counts() == {"euler": 1}
+    assert viewed.get_view_count("euler") == 6
+    assert viewed.backend.get(viewed.view_shards_collection, "euler:99") is None